@@ -1,84 +1,187 @@
+import time
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from data.scrapers.scraper_utils import scrape_multiple_sources
-import os
-import requests
+from data.scrapers.scraper_utils import iter_multiple_sources
+from data.scrapers.query_cache import QUERY_CACHE
+from data.storage.price_history import get_price_store
+from chat.data_context import build_data_context
+from data.frames import dataframe_fingerprint
+from data.schema import SESSION_MEMORY, format_bytes
+from data.matching import product_price_summary
+from chat.streaming import StreamStats, format_stream_metrics
+from chat.local_query import LOCAL_QUERIES_ENABLED, LOCAL_QUERY_ENGINE
+from telemetry.tracing import record, span, start_trace
 from dotenv import load_dotenv
-import google.generativeai as genai
 
-load_dotenv()
+# Streamlit re-executes this script on every interaction. Heavy backends
+# (plotly via the chart templates, the Gemini SDK) are imported inside the
+# page that needs them and process-wide setup goes through
+# st.cache_resource, so a rerun only pays for the page being shown.
 
-def get_gemini_api_key():
-    """Get Gemini API key from environment or Streamlit secrets"""
-    
-    api_key = os.getenv("GEMINI_API_KEY")
- 
-
-    if not api_key:
-        try:
-            api_key = st.secrets["GEMINI_API_KEY"]
-        except (KeyError, AttributeError):
-            pass
-    
-    return api_key
-
-GEMINI_API_KEY = get_gemini_api_key()
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
-
-OLLAMA_ENDPOINT = "http://localhost:11434/api/generate"
-
-def get_ollama_response(model_name: str, prompt: str, context: str = "") -> str:
-    full_prompt = f"{context}\n\nUser: {prompt}"
-    try:
-        payload = {
-            "model": model_name,
-            "prompt": full_prompt,
-            "stream": False
-        }
-        response = requests.post(OLLAMA_ENDPOINT, json=payload, timeout=30)
-        response.raise_for_status()
-        return response.json().get("response", "No response field in JSON")
-    except requests.exceptions.ConnectionError:
-        return "Oh no! (╯°□°）╯︵ ┻━┻ It seems I can't connect to the local Ollama models. Make sure Ollama is running! For now, you can use my online friend, the Gemini Buddy! ✨"
-    except requests.exceptions.RequestException as e:
-        return f"An error occurred: {e}"
-    except requests.exceptions.JSONDecodeError:
-        return "Error: Could not decode JSON response from Ollama."
-
-def get_gemini_response(prompt: str, history: list):
-    if not GEMINI_API_KEY:
-        return "Gemini API key not configured. Please set it in the .env file. (｡•̀ᴗ•́｡)"
-    try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        chat = model.start_chat(history=history)
-        response = chat.send_message(prompt)
-        return response.text
-    except Exception as e:
-        return f"An error occurred with Gemini: {e}"
-
-def search_products(query: str) -> tuple:
-    df = scrape_multiple_sources(query)
-    os.makedirs("exports", exist_ok=True)
-    csv_path = f"exports/{query}_products.csv"
-    df.to_csv(csv_path, index=False)
+@st.cache_resource
+def load_environment() -> bool:
+    """Load .env once per process rather than on every rerun"""
+    return load_dotenv()
+
+load_environment()
+
+@st.cache_resource
+def start_refresh_scheduler():
+    """Keep popular queries warm in the background for the life of the process"""
+    from data.scrapers.refresh import get_refresh_scheduler
+    return get_refresh_scheduler()
+
+start_refresh_scheduler()
+
+def price_comparison_chart(df: pd.DataFrame):
+    from visualizations.chart_templates import build_price_chart
+
+    currency_display_symbol = df['currency_symbol'].iloc[0] if not df.empty else "₹"
+    return build_price_chart(df, price_col='price_value', title=f"☆ Price Comparison ({currency_display_symbol}) ☆", currency=currency_display_symbol)
+
+def search_products(query: str, refresh: bool = False, max_results: int = 20, on_update=None) -> tuple:
+    df = pd.DataFrame()
+    for df in iter_multiple_sources(query, max_results=max_results, refresh=refresh):
+        if on_update is not None:
+            with span("ui.progress", rows=len(df)):
+                on_update(df)
     
     if df.empty:
         return None, "No products found on the specified websites.", df
+
+    price_store = get_price_store()
+    # Cached results were recorded when first scraped and fallback prices are made up
+    rows_saved = 0
+    if not df.attrs.get('from_cache') and not df.attrs.get('fallback'):
+        with span("history.append"):
+            rows_saved = price_store.append(df, query)
+    with span("history.lowest"):
+        # The rows just queued may not be written yet, so pass this scrape along
+        lowest_30d = price_store.lowest_price(query, days=30, current=df if rows_saved else None)
         
     currency_display_symbol = df['currency_symbol'].iloc[0] if not df.empty else "₹"
 
-    fig = px.bar(df, x='product_name', y='price_value', color='source', title=f"☆ Price Comparison ({currency_display_symbol}) ☆", template="plotly_dark")
+    fig = price_comparison_chart(df)
     
     stats = f"""
     - **(｡◕‿◕｡) Products Found:** {len(df)}
     - **(｡◕‿◕｡) Average Price:** {currency_display_symbol}{df['price_value'].mean():,.2f}
     - **(｡◕‿◕｡) Lowest Price:** {currency_display_symbol}{df['price_value'].min():,.2f}
-    - **(｡◕‿◕｡) CSV saved to:** `{csv_path}`
+    - **(｡◕‿◕｡) Rows added to price history:** {rows_saved} (`{price_store.path}`)
     """
+    if lowest_30d:
+        stats += f"    - **(｡◕‿◕｡) Lowest in 30 days:** {lowest_30d['currency'] or currency_display_symbol}{lowest_30d['price']:,.2f} ({lowest_30d['source']})\n"
     return fig, stats, df
 
+def current_session_id() -> str:
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else "local"
+
+def answer_locally(prompt: str):
+    """Answer from the scraped data without a model call, or None if the question needs the model"""
+    if not LOCAL_QUERIES_ENABLED:
+        return None
+    return LOCAL_QUERY_ENGINE.answer(st.session_state.scraped_data, prompt, query=st.session_state.get("scraped_query"))
+
+def show_chat_message(msg: dict):
+    with st.chat_message(msg["role"]):
+        st.write(msg["content"])
+        if msg.get("table") is not None:
+            st.dataframe(msg["table"], hide_index=True)
+        if msg.get("metrics"):
+            st.caption(format_stream_metrics(msg["metrics"]))
+
+def show_local_query_rate():
+    if not LOCAL_QUERIES_ENABLED:
+        return
+    stats = LOCAL_QUERY_ENGINE.snapshot()
+    asked = stats["hits"] + stats["misses"]
+    if asked:
+        st.caption(f"Answered without a model: {stats['hits']} of {asked} questions ({stats['hit_rate']:.0%})")
+
+def show_memory_report(container):
+    session = SESSION_MEMORY.session(current_session_id())
+    total = SESSION_MEMORY.aggregate()
+    container.caption(
+        f"Memory: this session {format_bytes(session['bytes'])} ({session['rows']:,} rows) · "
+        f"all sessions {format_bytes(total['bytes'])} across {total['sessions']}"
+    )
+
+PERF_TRACES_KEPT = 5
+
+def trace_request(name: str, **attrs):
+    """Trace one search or chat turn when the Performance panel is on (or APP_TRACING=1)"""
+    return start_trace(name, force=st.session_state.get("perf_panel", False), **attrs)
+
+def keep_trace(trace) -> None:
+    if trace is not None and st.session_state.get("perf_panel", False):
+        st.session_state.perf_traces = (st.session_state.get("perf_traces", []) + [trace])[-PERF_TRACES_KEPT:]
+
+EXPORT_LABELS = {"csv": "CSV", "excel": "Excel", "json": "JSON", "parquet": "Parquet (zstd)", "arrow": "Arrow IPC (zstd)"}
+EXPORT_JOBS_KEPT = 5
+
+def show_export_panel(df: pd.DataFrame, name: str):
+    """Start exports of the current results as background jobs and offer the files when done"""
+    from data.storage.exports import EXPORT_JOBS
+
+    with st.expander("Export ☆"):
+        col1, col2 = st.columns([3, 1])
+        fmt = col1.selectbox("Format", list(EXPORT_LABELS), format_func=EXPORT_LABELS.get, key="export_format")
+        if col2.button("Export", key="export_start"):
+            job = EXPORT_JOBS.submit(df, fmt, name=name)
+            st.session_state.export_jobs = (st.session_state.get("export_jobs", []) + [job.id])[-EXPORT_JOBS_KEPT:]
+        jobs = EXPORT_JOBS.jobs(st.session_state.get("export_jobs", []))
+        # Poll only while something is still being written
+        polling = any(not j.finished for j in jobs)
+        st.fragment(run_every=1.0 if polling else None)(show_export_jobs)(polling)
+
+def show_export_jobs(polling: bool = False):
+    from pathlib import Path
+    from data.storage.exports import EXPORT_JOBS
+
+    running = False
+    for job in reversed(EXPORT_JOBS.jobs(st.session_state.get("export_jobs", []))):
+        label = f"{EXPORT_LABELS[job.format]} · {job.total_rows:,} rows"
+        if job.status == "done" and Path(job.path).exists():
+            # The file is read when the button is clicked, not on every rerun
+            st.download_button(f"⬇ {job.filename} ({format_bytes(job.size_bytes)}, {job.elapsed:.1f}s)",
+                               data=Path(job.path).read_bytes, file_name=job.filename, mime=job.mime,
+                               key=f"export_download_{job.id}")
+        elif job.status == "failed":
+            st.error(f"{label}: export failed ({job.error})")
+        elif job.status == "cancelled":
+            st.caption(f"{label}: cancelled")
+        elif not job.finished:
+            st.progress(job.progress, text=f"{label} · {job.rows_done:,} written")
+            running = True
+    if polling and not running:
+        # The fragment keeps its run_every until the page reruns, so rerun it to stop polling
+        st.rerun(scope="app")
+
+def show_performance_panel(container):
+    from telemetry.export import jsonl_lines, prometheus_text
+
+    traces = st.session_state.get("perf_traces", [])
+    with container.expander("Performance", expanded=True):
+        if not traces:
+            st.caption("Run a search or ask a question to see where the time goes.")
+        else:
+            labels = [f"{t.name} {t.attrs.get('query', '')} ({t.duration * 1000:,.0f} ms)".replace("  ", " ") for t in traces]
+            choice = st.selectbox("Request", range(len(traces)), index=len(traces) - 1, format_func=lambda i: labels[i])
+            trace = traces[choice]
+            rows = [{
+                "stage": "· " * depth + s.name,
+                "ms": round(s.duration * 1000, 1),
+                "% of request": round(100 * s.duration / trace.duration, 1) if trace.duration else None,
+                "thread": s.thread,
+                "details": ", ".join(f"{k}={v}" for k, v in s.attrs.items()),
+            } for depth, s in trace.rows()]
+            st.dataframe(pd.DataFrame(rows), hide_index=True)
+        st.download_button("Stage histograms (Prometheus)", prometheus_text(), file_name="stage_metrics.prom", mime="text/plain")
+        st.download_button("Stage histograms (JSON lines)", jsonl_lines(), file_name="stage_metrics.jsonl", mime="application/x-ndjson")
+
 def load_css():
     st.markdown("""
     <style>
@@ -93,6 +196,10 @@ load_css()
 
 st.sidebar.title("Menu")
 page = st.sidebar.radio("Select", ["Product Analysis", "Chat with Data (Ollama)", "Gemini Buddy"])
+# Filled in at the end of the run, after this run's search has been stored
+memory_panel = st.sidebar.empty()
+st.sidebar.checkbox("Performance panel", key="perf_panel")
+perf_panel = st.sidebar.container()
 
 if "gemini_messages" not in st.session_state:
     st.session_state.gemini_messages = []
@@ -107,13 +214,32 @@ if page == "Product Analysis":
     st.title("✨ DataWeaver ✨")
     st.header("Product Price Analysis (｡◕‿◕｡)")
     query_input = st.text_input("Search for a product:", placeholder="Enter product name...")
+    max_results = st.slider("Results to fetch", min_value=20, max_value=200, value=20, step=20)
+    refresh_cache = st.checkbox("Bypass cache (fetch fresh prices)", value=False)
     if st.button("Search ＼(^o^)／"):
         if query_input:
             with st.spinner("Weaving data... (～￣▽￣)～"):
-                fig, stats, df = search_products(query_input)
+                progress_chart = st.empty()
+                progress_table = st.empty()
+                updates = []
+
+                def show_progress(partial_df):
+                    updates.append(len(partial_df))
+                    progress_chart.plotly_chart(price_comparison_chart(partial_df), use_container_width=True, key=f"progress_chart_{len(updates)}")
+                    progress_table.dataframe(partial_df)
+
+                with trace_request("search", query=query_input) as trace:
+                    fig, stats, df = search_products(query_input, refresh=refresh_cache, max_results=max_results, on_update=show_progress)
+                keep_trace(trace)
+                progress_chart.empty()
+                progress_table.empty()
                 st.session_state.scraped_data = df
+                st.session_state.scraped_query = query_input
+                SESSION_MEMORY.track(current_session_id(), "scraped_data", df)
                 st.session_state.data_chat_messages = [] 
                 st.session_state.gemini_messages = []
+                st.session_state.pop("gemini_chat", None)
+                st.session_state.pop("ollama_chat", None)
                 
                 if fig:
                     st.plotly_chart(fig, use_container_width=True)
@@ -124,13 +250,35 @@ if page == "Product Analysis":
                     with col2:
                         st.subheader("Raw Data ☆")
                         st.dataframe(df)
+                    with span("match.products", rows=len(df)):
+                        products = product_price_summary(df)
+                    if len(products) < len(df):
+                        st.subheader("Matched products ☆")
+                        st.caption(f"{len(df)} listings grouped into {len(products)} products across sources")
+                        st.dataframe(products, hide_index=True)
                     st.success("Data woven! Navigate to the chat pages to ask questions. ＼(^o^)／")
+                    if df.attrs.get('stale'):
+                        age_min = (time.time() - df.attrs['cached_at']) / 60
+                        st.info(f"Showing prices cached {age_min:,.0f} min ago; fresh prices are being fetched in the background.")
+                    cache_stats = QUERY_CACHE.stats
+                    st.caption(
+                        f"Cache: {cache_stats['memory_hits']} memory hits · {cache_stats['disk_hits']} disk hits · "
+                        f"{cache_stats['stale_hits']} stale hits · "
+                        f"{cache_stats['misses']} misses · {cache_stats['evictions']} evictions "
+                        f"({QUERY_CACHE.hit_rate():.0%} hit rate)"
+                    )
                 else:
                     st.warning(stats)
         else:
             st.warning("Please enter a product name to search. (´･ω･`)")
 
+    if st.session_state.scraped_data is not None and not st.session_state.scraped_data.empty:
+        show_export_panel(st.session_state.scraped_data, st.session_state.get("scraped_query", "product_data"))
+
 elif page == "Chat with Data (Ollama)":
+    from chat.ollama_chat import OllamaChatSession
+    from chat.ollama_scheduler import OLLAMA_SCHEDULER
+
     st.title("Chat with Your Data (｡◕‿◕｡)")
     
     ollama_model_input = st.text_input(
@@ -139,48 +287,84 @@ elif page == "Chat with Data (Ollama)":
         placeholder="e.g., qwen2.5-coder:7b"
     )
     st.session_state.ollama_model = ollama_model_input 
+    if "ollama_chat" not in st.session_state:
+        st.session_state.ollama_chat = OllamaChatSession(current_session_id())
+    queue = OLLAMA_SCHEDULER.snapshot()
+    st.caption(f"Model slots: {queue['active']}/{queue['max_concurrency']} busy · {queue['waiting']} waiting · "
+               f"mean queue wait {queue['mean_wait_s']:.2f}s")
+
+    show_local_query_rate()
 
     if st.session_state.scraped_data is not None:
         for msg in st.session_state.data_chat_messages:
-            st.chat_message(msg["role"]).write(msg["content"])
+            show_chat_message(msg)
 
         if prompt := st.chat_input("Ask about the data..."):
             st.session_state.data_chat_messages.append({"role": "user", "content": prompt})
             st.chat_message("user").write(prompt)
 
-            with st.spinner("Ollama is analyzing... (ง •̀_•́)ง"):
-                df_markdown = st.session_state.scraped_data.to_markdown()
-                data_context = f"Here is the data you are analyzing:\n\n{df_markdown}\n\nNow, please answer the user's question based on this data."
-                
-                response = get_ollama_response(st.session_state.ollama_model, prompt, context=data_context)
-                st.session_state.data_chat_messages.append({"role": "assistant", "content": response})
-                st.chat_message("assistant").write(response)
+            with trace_request("chat.ollama") as trace:
+                scraped_data = st.session_state.scraped_data
+                local = answer_locally(prompt)
+                # Before record_turn too, so a locally answered first question is part of the conversation
+                st.session_state.ollama_chat.ensure_dataset(build_data_context(scraped_data), dataframe_fingerprint(scraped_data))
+                if local is not None:
+                    reply = {"role": "assistant", "content": local.text, "table": local.table, "metrics": {"local_s": local.seconds}}
+                    show_chat_message(reply)
+                    st.session_state.ollama_chat.record_turn(prompt, local.as_markdown())
+                else:
+                    with st.chat_message("assistant"):
+                        stream_stats = StreamStats()
+                        response = st.write_stream(st.session_state.ollama_chat.stream(st.session_state.ollama_model, prompt, stats=stream_stats))
+                        metrics = stream_stats.as_dict()
+                        st.caption(format_stream_metrics(metrics))
+                    record("llm.stream", metrics["total_s"], start=stream_stats.started_at, tokens=metrics["tokens"])
+                    record("llm.first_token", metrics["ttft_s"], start=stream_stats.started_at)
+                    reply = {"role": "assistant", "content": response, "metrics": metrics}
+            keep_trace(trace)
+            st.session_state.data_chat_messages.append(reply)
     else:
         st.warning("Please weave some data first on the 'Product Analysis' page. ＼(^o^)／")
 
 elif page == "Gemini Buddy":
+    from chat.gemini_chat import GeminiChatManager
+
+    if "gemini_chat" not in st.session_state:
+        st.session_state.gemini_chat = GeminiChatManager()
+
     st.title("Your Gemini Buddy (｡◕‿◕｡)")
+    show_local_query_rate()
     for msg in st.session_state.gemini_messages:
-        st.chat_message(msg["role"]).write(msg["content"])
+        show_chat_message(msg)
 
     if prompt := st.chat_input("Send a message..."):
-        st.session_state.gemini_messages.append({"role": "user", "content": prompt})
         st.chat_message("user").write(prompt)
 
-        with st.spinner("Gemini is thinking... ( ´ ω ` )"):
-            gemini_history = []
-            context_added = False
-            if st.session_state.scraped_data is not None:
-                df_markdown = st.session_state.scraped_data.to_markdown()
-                context = f"CONTEXT: Here is some data the user just scraped. Use it to answer their questions.\n\n{df_markdown}"
-                gemini_history.append({"role": "user", "parts": [context]})
-                gemini_history.append({"role": "model", "parts": ["Got it! I have the data. What would you like to know? (｡◕‿◕｡)"]})
-                context_added = True
-
-            for msg in st.session_state.gemini_messages:
-                role = "user" if msg["role"] == "user" else "model"
-                gemini_history.append({"role": role, "parts": [msg["content"]]})
-            
-            response = get_gemini_response(prompt, gemini_history)
-            st.session_state.gemini_messages.append({"role": "assistant", "content": response})
-            st.chat_message("assistant").write(response)
+        with trace_request("chat.gemini") as trace:
+            scraped_data = st.session_state.scraped_data
+            st.session_state.gemini_messages.append({"role": "user", "content": prompt})
+            local = answer_locally(prompt) if scraped_data is not None else None
+            # Before record_turn too, so a locally answered first question is part of the conversation
+            if scraped_data is not None and not scraped_data.empty:
+                st.session_state.gemini_chat.ensure_dataset(build_data_context(scraped_data), dataframe_fingerprint(scraped_data))
+            else:
+                st.session_state.gemini_chat.ensure_dataset(None, None)
+            if local is not None:
+                reply = {"role": "assistant", "content": local.text, "table": local.table, "metrics": {"local_s": local.seconds}}
+                show_chat_message(reply)
+                st.session_state.gemini_chat.record_turn(prompt, local.as_markdown())
+            else:
+                with st.chat_message("assistant"):
+                    stream_stats = StreamStats()
+                    response = st.write_stream(st.session_state.gemini_chat.stream(prompt, stats=stream_stats))
+                    metrics = stream_stats.as_dict()
+                    st.caption(format_stream_metrics(metrics))
+                record("llm.stream", metrics["total_s"], start=stream_stats.started_at, tokens=metrics["tokens"])
+                record("llm.first_token", metrics["ttft_s"], start=stream_stats.started_at)
+                reply = {"role": "assistant", "content": response, "metrics": metrics}
+        keep_trace(trace)
+        st.session_state.gemini_messages.append(reply)
+
+show_memory_report(memory_panel)
+if st.session_state.perf_panel:
+    show_performance_panel(perf_panel)
@@ -0,0 +1,80 @@
+"""Compare per-row and columnar parsing of SerpAPI shopping_results.
+
+parse_shopping_results switches to the columnar pass at COLUMNAR_MIN_ITEMS;
+this shows where the crossover lies. Run from the repository root:
+
+    python -m benchmarks.bench_parse_shopping --items 20 1000 5000 20000
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+
+import numpy as np
+
+from data.scrapers.serpapi_google_shopping import parse_shopping_results_columnar, parse_shopping_results_rowwise
+
+PRICE_FORMATS = [
+    "₹{a:,}.00",
+    "₹{a:,}",
+    "${a:,}.99",
+    "£{a}",
+    "₹{a:,}.00 – ₹{b:,}",
+    "Rs. {a}",
+    "€{a:,}.50",
+]
+
+
+def make_shopping_results(n: int, seed: int = 7) -> list:
+    """Synthetic shopping_results items shaped like SerpAPI's response"""
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        a = rng.randint(199, 150000)
+        item = {
+            "position": i + 1,
+            "title": f"Product {i % 997} Model {i}",
+            "price": rng.choice(PRICE_FORMATS).format(a=a, b=a + rng.randint(100, 5000)),
+            "source": rng.choice(["Amazon.in", "Flipkart", "Croma", "Reliance Digital", "Tata CLiQ"]),
+        }
+        if rng.random() < 0.8:
+            item["rating"] = round(rng.uniform(1.0, 5.0), 1)
+        if rng.random() < 0.7:
+            item["reviews"] = rng.randint(0, 50000)
+        items.append(item)
+    return items
+
+
+def best_of(func, items, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        # Silence the per-row warning prints so they don't dominate the timing
+        with contextlib.redirect_stdout(io.StringIO()):
+            func(items)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=[20, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'items':>8} {'per-row ms':>12} {'columnar ms':>12} {'speed-up':>9}")
+    for n in args.items:
+        items = make_shopping_results(n)
+        with contextlib.redirect_stdout(io.StringIO()):
+            rowwise = parse_shopping_results_rowwise(items)
+            columnar = parse_shopping_results_columnar(items)
+        assert np.allclose(rowwise["price_value"].to_numpy(), columnar["price_value"].to_numpy())
+        assert (rowwise["currency_symbol"].to_numpy() == columnar["currency_symbol"].to_numpy()).all()
+
+        row_time = best_of(parse_shopping_results_rowwise, items, args.repeat)
+        columnar_time = best_of(parse_shopping_results_columnar, items, args.repeat)
+        print(f"{n:>8,} {row_time * 1000:12.2f} {columnar_time * 1000:12.2f} {row_time / columnar_time:8.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,308 @@
+"""Offline micro-benchmarks for the parsing, enrichment, context and chart hot paths.
+
+Each case runs against synthetic frames or the recorded SerpAPI payloads in
+benchmarks/fixtures at every requested size, and records the best wall time
+and the tracemalloc peak. Results can be saved as a baseline and later runs
+compared against it. Run from the repository root:
+
+    python -m benchmarks.suite --save benchmarks/baseline.json
+    python -m benchmarks.suite --compare benchmarks/baseline.json --threshold 0.25
+    python -m benchmarks.suite --sizes 10 1000 --cases parse_shopping_results enhance_product_data
+    python -m benchmarks.suite --record "wireless earbuds"   # needs SERPAPI_API_KEY
+"""
+import argparse
+import contextlib
+import gc
+import io
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "fixtures"
+DEFAULT_SIZES = [10, 1_000, 100_000, 1_000_000]
+
+
+def load_recorded_results() -> List[dict]:
+    """shopping_results from every recorded payload in the fixtures directory"""
+    items = []
+    for path in sorted(FIXTURES_DIR.glob("serpapi_*.json")):
+        items.extend(json.loads(path.read_text(encoding="utf-8")).get("shopping_results", []))
+    if not items:
+        raise FileNotFoundError(f"No recorded SerpAPI payloads in {FIXTURES_DIR}")
+    return items
+
+
+def recorded_results(n: int) -> List[dict]:
+    """`n` shopping_results items, cycling through the recorded payloads"""
+    items = load_recorded_results()
+    return [items[i % len(items)] for i in range(n)]
+
+
+def make_product_frame(n: int, seed: int = 7) -> pd.DataFrame:
+    """Seeded synthetic product frame with the columns the scrapers produce"""
+    from data.synthetic import generate_catalog
+
+    df = generate_catalog("Phone", n, seed=seed)
+    df["price_inr"] = df["price_value"]
+    return df
+
+
+@dataclass
+class Case:
+    name: str
+    setup: Callable[[int], object]
+    run: Callable[[object], object]
+    max_size: Optional[int] = None
+
+
+def _setup_price_strings(n: int) -> List[str]:
+    return [item.get("price", "") for item in recorded_results(n)]
+
+
+def _extract_rowwise(prices: List[str]):
+    from data.scrapers.serpapi_google_shopping import extract_price_and_currency
+    return [extract_price_and_currency(p) for p in prices]
+
+
+def _extract_vectorized(prices: List[str]):
+    from data.scrapers.serpapi_google_shopping import extract_prices_and_currencies
+    return extract_prices_and_currencies(pd.Series(prices, dtype=object))
+
+
+def _parse_rowwise(items: List[dict]):
+    from data.scrapers.serpapi_google_shopping import parse_shopping_results_rowwise
+    return parse_shopping_results_rowwise(items)
+
+
+def _parse(items: List[dict]):
+    from data.scrapers.serpapi_google_shopping import parse_shopping_results
+    return parse_shopping_results(items)
+
+
+def _parse_columnar(items: List[dict]):
+    from data.scrapers.serpapi_google_shopping import parse_shopping_results_columnar
+    return parse_shopping_results_columnar(items)
+
+
+def _enhance(df: pd.DataFrame):
+    from data.scrapers.fallback_scraper import enhance_product_data
+    return enhance_product_data(df.copy())
+
+
+def _setup_enhanced(n: int) -> pd.DataFrame:
+    from data.scrapers.fallback_scraper import enhance_product_data
+    return enhance_product_data(make_product_frame(n))
+
+
+def _trending(df: pd.DataFrame):
+    from data.scrapers.fallback_scraper import get_trending_products
+    return get_trending_products(df.copy(), n=5)
+
+
+def _export(fmt: str) -> Callable[[pd.DataFrame], str]:
+    def run(df: pd.DataFrame) -> str:
+        from data.scrapers.fallback_scraper import export_results
+        with tempfile.TemporaryDirectory() as tmp:
+            return export_results(df, format=fmt, output_dir=tmp)
+    return run
+
+
+def _data_context(df: pd.DataFrame):
+    # The private builder, because build_data_context memoizes by content
+    from chat.data_context import DEFAULT_TOKEN_BUDGET, _build
+    return _build(df, DEFAULT_TOKEN_BUDGET, 15)
+
+
+def _chart(df: pd.DataFrame):
+    from visualizations import chart_templates
+    with chart_templates._figure_cache_lock:
+        chart_templates._figure_cache.clear()
+    return chart_templates.create_price_comparison_chart(df)
+
+
+def _match(df: pd.DataFrame):
+    from data.matching import product_price_summary
+    return product_price_summary(df)
+
+
+LOCAL_QUESTIONS = ["cheapest phone", "average price on Flipkart", "items under 20k sorted by rating",
+                   "which store is cheapest?", "how many listings rated 4+ with 100+ reviews"]
+
+
+def _local_queries(df: pd.DataFrame):
+    from chat.local_query import LocalQueryEngine
+    engine = LocalQueryEngine()
+    return [engine.answer(df, q, query="phone") for q in LOCAL_QUESTIONS]
+
+
+def _setup_listing_pages(n: int) -> List[tuple]:
+    from data.scrapers.html_engine import FIXTURES_DIR
+    pages = [(path.stem, path.read_bytes()) for path in sorted(FIXTURES_DIR.glob("*.html"))]
+    return [pages[i % len(pages)] for i in range(n)]
+
+
+def _parse_listing_pages(pages: List[tuple]):
+    from data.scrapers.html_parse import parse_listing_page
+    return [parse_listing_page(key, page) for key, page in pages]
+
+
+def _generate(n: int):
+    from data.synthetic import generate_catalog
+    return generate_catalog("Phone", n, seed=7)
+
+
+CASES = [
+    Case("extract_price_and_currency", _setup_price_strings, _extract_rowwise),
+    Case("extract_prices_and_currencies", _setup_price_strings, _extract_vectorized),
+    Case("parse_shopping_results_rowwise", recorded_results, _parse_rowwise),
+    Case("parse_shopping_results", recorded_results, _parse),
+    Case("parse_shopping_results_columnar", recorded_results, _parse_columnar),
+    Case("enhance_product_data", make_product_frame, _enhance),
+    Case("get_trending_products", _setup_enhanced, _trending),
+    Case("export_results[csv]", make_product_frame, _export("csv")),
+    Case("export_results[json]", make_product_frame, _export("json")),
+    Case("export_results[parquet]", make_product_frame, _export("parquet")),
+    Case("export_results[arrow]", make_product_frame, _export("arrow")),
+    # openpyxl writes under 10k rows/s, so larger sizes only measure openpyxl
+    Case("export_results[excel]", make_product_frame, _export("excel"), max_size=10_000),
+    Case("build_data_context", make_product_frame, _data_context),
+    Case("create_price_comparison_chart", make_product_frame, _chart),
+    Case("product_price_summary", make_product_frame, _match),
+    Case("generate_catalog", lambda n: n, _generate),
+    Case("local_query", make_product_frame, _local_queries),
+    # Rows are saved search result pages here; about 5 ms each
+    Case("parse_listing_pages", _setup_listing_pages, _parse_listing_pages, max_size=1_000),
+]
+
+
+def measure(case: Case, n: int, repeat: int) -> Dict:
+    data = case.setup(n)
+    # A single run at 1M rows already takes seconds and is far above timer noise
+    repeat = max(1, min(repeat, 1_000_000 // max(n, 1)))
+    timings = []
+    # Silence the parsers' warning prints so they don't dominate the timing
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            case.run(data)
+            timings.append(time.perf_counter() - start)
+
+        # A separate traced run, since tracemalloc slows allocation-heavy code
+        gc.collect()
+        tracemalloc.start()
+        try:
+            case.run(data)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {"seconds": min(timings), "median_seconds": float(np.median(timings)), "peak_bytes": peak, "rows": n}
+
+
+def environment() -> Dict:
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+    }
+
+
+def compare(results: Dict, baseline: Dict, threshold: float, min_seconds: float) -> List[str]:
+    """Cases that got slower or used more memory than the baseline by more than `threshold`"""
+    regressions = []
+    for key, current in results.items():
+        before = baseline.get("results", {}).get(key)
+        if before is None:
+            continue
+        # Sub-millisecond timings are mostly noise
+        if max(before["seconds"], current["seconds"]) >= min_seconds and \
+                current["seconds"] > before["seconds"] * (1 + threshold):
+            regressions.append(f"{key}: time {before['seconds'] * 1000:.2f} -> {current['seconds'] * 1000:.2f} ms "
+                               f"({current['seconds'] / before['seconds']:.2f}x)")
+        if before["peak_bytes"] and current["peak_bytes"] > before["peak_bytes"] * (1 + threshold):
+            regressions.append(f"{key}: peak memory {before['peak_bytes'] / 1e6:.2f} -> "
+                               f"{current['peak_bytes'] / 1e6:.2f} MB ({current['peak_bytes'] / before['peak_bytes']:.2f}x)")
+    return regressions
+
+
+def record_payload(query: str) -> Path:
+    """Save a live SerpAPI response for `query` as a new fixture"""
+    from data.scrapers.serpapi_google_shopping import fetch_shopping_results, get_api_key
+
+    api_key = get_api_key()
+    if not api_key:
+        raise SystemExit("SERPAPI_API_KEY is needed to record a payload")
+    items = fetch_shopping_results(query, api_key, 100)
+    slug = "_".join(query.lower().split())
+    path = FIXTURES_DIR / f"serpapi_google_shopping_{slug}.json"
+    payload = {"search_parameters": {"engine": "google_shopping", "q": query}, "shopping_results": items}
+    path.write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8")
+    return path
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--cases", nargs="+", help="only run these cases")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per case and size; the best is kept")
+    parser.add_argument("--save", help="write results to this baseline file")
+    parser.add_argument("--compare", help="compare against this baseline file")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown or memory growth (0.25 = 25%%)")
+    parser.add_argument("--min-ms", type=float, default=1.0, help="ignore time regressions below this many ms")
+    parser.add_argument("--record", metavar="QUERY", help="record a live SerpAPI payload as a fixture and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        print(f"Recorded {record_payload(args.record)}")
+        return 0
+
+    cases = [c for c in CASES if not args.cases or c.name in args.cases]
+    unknown = set(args.cases or []) - {c.name for c in CASES}
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(sorted(unknown))}")
+
+    results = {}
+    print(f"{'case':<32} {'rows':>10} {'best':>12} {'rows/s':>14} {'peak mem':>12}")
+    for case in cases:
+        for n in args.sizes:
+            if case.max_size is not None and n > case.max_size:
+                continue
+            result = measure(case, n, args.repeat)
+            results[f"{case.name}@{n}"] = result
+            print(f"{case.name:<32} {n:>10,} {result['seconds'] * 1000:>9.2f} ms "
+                  f"{n / result['seconds']:>14,.0f} {result['peak_bytes'] / 1e6:>9.2f} MB", flush=True)
+
+    report = {"environment": environment(), "results": results}
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"\nSaved baseline to {args.save}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        if baseline.get("environment", {}).get("machine") != report["environment"]["machine"]:
+            print("\nNote: the baseline was recorded on a different machine type")
+        regressions = compare(results, baseline, args.threshold, args.min_ms / 1000)
+        if regressions:
+            print(f"\nREGRESSIONS (> {args.threshold:.0%} over baseline):")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print(f"\nNo regressions beyond {args.threshold:.0%} of {args.compare}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+import pandas as pd
+
+from data.frames import dataframe_fingerprint
+from telemetry.tracing import span, traced
+
+DEFAULT_TOKEN_BUDGET = int(os.getenv("DATA_CONTEXT_TOKENS", "1500"))
+
+# Columns worth showing to the model, in display order. Derived scores,
+# timestamps and the like are left out.
+CONTEXT_COLUMNS = ["product_name", "price_value", "price_inr", "price_usd", "source", "rating", "reviews"]
+PRICE_COLUMNS = ["price_value", "price_inr", "price_usd"]
+MAX_NAME_LENGTH = 80
+
+_cache: "OrderedDict[tuple, str]" = OrderedDict()
+_cache_lock = threading.Lock()
+_CACHE_SIZE = 32
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token for English/markdown)"""
+    return len(text) // 4 + 1
+
+
+def _price_column(df: pd.DataFrame) -> Optional[str]:
+    return next((c for c in PRICE_COLUMNS if c in df.columns), None)
+
+
+def _prune(df: pd.DataFrame) -> pd.DataFrame:
+    columns = [c for c in CONTEXT_COLUMNS if c in df.columns]
+    df = df[columns].copy()
+    if "product_name" in df.columns:
+        df["product_name"] = df["product_name"].astype(str).str.slice(0, MAX_NAME_LENGTH)
+    if "rating" in df.columns:
+        df["rating"] = df["rating"].round(1)
+    return df
+
+
+def _source_summary(df: pd.DataFrame, price_col: str) -> pd.DataFrame:
+    agg = {"listings": (price_col, "size"),
+           "min_price": (price_col, "min"),
+           "median_price": (price_col, "median"),
+           "max_price": (price_col, "max")}
+    if "rating" in df.columns:
+        agg["avg_rating"] = ("rating", "mean")
+    summary = df.groupby("source", observed=True).agg(**agg).sort_values("listings", ascending=False)
+    return summary.round(2)
+
+
+def _select_rows(df: pd.DataFrame, price_col: Optional[str], k: int) -> pd.DataFrame:
+    """Cheapest, best-rated and a deterministic sample of the rest, k rows each"""
+    if k <= 0:
+        return df.iloc[0:0]
+    parts: List[pd.DataFrame] = []
+    if price_col:
+        parts.append(df.nsmallest(k, price_col))
+    if "rating" in df.columns:
+        parts.append(df.nlargest(k, "rating"))
+    parts.append(df.sample(min(k, len(df)), random_state=0))
+    rows = pd.concat(parts)
+    return rows[~rows.index.duplicated()]
+
+
+@traced("context.render")
+def _render(df: pd.DataFrame, rows: pd.DataFrame, price_col: Optional[str],
+            summary: Optional[pd.DataFrame]) -> str:
+    lines = [f"Dataset: {len(df)} product listings."]
+    if "currency_symbol" in df.columns and df["currency_symbol"].nunique() == 1:
+        lines.append(f"All prices are in {df['currency_symbol'].iloc[0]}.")
+    lines.append("Columns: " + ", ".join(f"{c} ({df[c].dtype})" for c in rows.columns))
+
+    if price_col:
+        prices = df[price_col]
+        lines.append(f"Overall price: min {prices.min():,.2f}, median {prices.median():,.2f}, "
+                     f"mean {prices.mean():,.2f}, max {prices.max():,.2f}.")
+    if summary is not None and not summary.empty:
+        lines += ["", "Per-source summary:", summary.to_markdown()]
+    if not rows.empty:
+        shown = f"{len(rows)} of {len(df)}" if len(rows) < len(df) else f"all {len(df)}"
+        lines += ["", f"Representative listings ({shown}; cheapest, best rated and a sample):",
+                  rows.to_markdown(index=False)]
+    return "\n".join(lines)
+
+
+def _build(df: pd.DataFrame, token_budget: int, top_k: int) -> str:
+    price_col = _price_column(df)
+    pruned = _prune(df)
+    summary = _source_summary(pruned, price_col) if price_col and "source" in pruned.columns else None
+
+    if len(pruned) <= top_k:
+        k = len(pruned)
+        rows = pruned
+    else:
+        k = top_k
+        rows = _select_rows(pruned, price_col, k)
+
+    text = _render(df, rows, price_col, summary)
+    while estimate_tokens(text) > token_budget and k > 0:
+        k //= 2
+        rows = _select_rows(pruned, price_col, k)
+        text = _render(df, rows, price_col, summary)
+
+    # Still over budget with no rows left: keep only the largest sources
+    while estimate_tokens(text) > token_budget and summary is not None and len(summary) > 1:
+        summary = summary.iloc[: len(summary) // 2]
+        text = _render(df, rows, price_col, summary)
+    return text
+
+
+def build_data_context(df: pd.DataFrame, token_budget: int = DEFAULT_TOKEN_BUDGET, top_k: int = 15) -> str:
+    """Compact description of a scraped DataFrame that fits in `token_budget` tokens.
+
+    Results are memoized by the DataFrame's content hash, so the work is done
+    once per scrape rather than once per chat message.
+    """
+    if df is None or df.empty:
+        return "Dataset: no product listings."
+
+    key = (dataframe_fingerprint(df), token_budget, top_k)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    with span("context.build", rows=len(df)):
+        text = _build(df, token_budget, top_k)
+    with _cache_lock:
+        _cache[key] = text
+        while len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+    return text
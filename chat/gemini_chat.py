@@ -0,0 +1,207 @@
+import functools
+import os
+from typing import Iterator, Optional
+
+import google.generativeai as genai
+import streamlit as st
+from dotenv import load_dotenv
+
+from .data_context import estimate_tokens
+from .streaming import StreamStats
+
+load_dotenv()
+
+GEMINI_MODEL = "gemini-1.5-flash"
+GEMINI_HISTORY_TOKENS = int(os.getenv("GEMINI_HISTORY_TOKENS", "6000"))
+CONTEXT_ACK = "Got it! I have the data. What would you like to know? (｡◕‿◕｡)"
+
+NO_KEY_MESSAGE = "Gemini API key not configured. Please set it in the .env file. (｡•̀ᴗ•́｡)"
+
+def get_gemini_api_key():
+    """Get Gemini API key from environment or Streamlit secrets"""
+
+    api_key = os.getenv("GEMINI_API_KEY")
+
+
+    if not api_key:
+        try:
+            api_key = st.secrets["GEMINI_API_KEY"]
+        except (KeyError, AttributeError, FileNotFoundError):
+            pass
+
+    return api_key
+
+@functools.lru_cache(maxsize=1)
+def configure_gemini():
+    """Resolve the API key and configure the SDK once per process"""
+    api_key = get_gemini_api_key()
+    if api_key:
+        genai.configure(api_key=api_key)
+    return api_key
+
+@functools.lru_cache(maxsize=4)
+def get_gemini_model(model_name: str = GEMINI_MODEL):
+    """Shared, stateless model object; chat state lives in ChatSession"""
+    return genai.GenerativeModel(model_name)
+
+def get_gemini_response(prompt: str, history: list):
+    if not configure_gemini():
+        return NO_KEY_MESSAGE
+    try:
+        model = get_gemini_model()
+        chat = model.start_chat(history=history)
+        response = chat.send_message(prompt)
+        return response.text
+    except Exception as e:
+        return f"An error occurred with Gemini: {e}"
+
+def stream_gemini_response(prompt: str, history: list, stats: Optional[StreamStats] = None) -> Iterator[str]:
+    """Yield Gemini's answer chunk by chunk as it is generated.
+
+    Closing the generator early stops reading the stream and marks `stats`
+    as cancelled.
+    """
+    stats = stats if stats is not None else StreamStats()
+    if not configure_gemini():
+        stats.finish()
+        yield NO_KEY_MESSAGE
+        return
+
+    finished = False
+    try:
+        model = get_gemini_model()
+        chat = model.start_chat(history=history)
+        response = chat.send_message(prompt, stream=True)
+        for chunk in response:
+            text = chunk.text
+            if text:
+                stats.mark_chunk()
+                yield text
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None and usage.candidates_token_count:
+            stats.tokens = usage.candidates_token_count
+        finished = True
+    except Exception as e:
+        finished = True
+        yield f"An error occurred with Gemini: {e}"
+    finally:
+        stats.finish(cancelled=not finished)
+
+def _content_text(content) -> str:
+    return "".join(part.text for part in content.parts)
+
+def _summarize_turns(turns: list) -> str:
+    """Cheap extractive summary of dropped turns: the questions the user asked"""
+    questions = [_content_text(c) for c in turns if c.role == "user"]
+    summary = "; ".join(q.strip().replace("\n", " ")[:120] for q in questions)
+    return f"(Earlier in this conversation the user asked: {summary[:600]})"
+
+class GeminiChatManager:
+    """Keeps one live Gemini ChatSession per Streamlit session.
+
+    The model and session survive reruns, so each message is a single
+    `send_message` call instead of rebuilding the model and replaying the
+    whole conversation. The session restarts when the dataset changes, and
+    once the history exceeds `token_budget` the oldest turns are folded into
+    a one-line summary, keeping prompt size bounded for long conversations.
+    """
+
+    def __init__(self, token_budget: int = GEMINI_HISTORY_TOKENS, model_name: str = GEMINI_MODEL):
+        self.token_budget = token_budget
+        self.model_name = model_name
+        self.dataset_key: Optional[str] = None
+        self.chat = None
+        self._model = None
+        self._primer_len = 0
+
+    def _primer(self, data_context: Optional[str]) -> list:
+        if not data_context:
+            return []
+        context = f"CONTEXT: Here is some data the user just scraped. Use it to answer their questions.\n\n{data_context}"
+        return [{"role": "user", "parts": [context]}, {"role": "model", "parts": [CONTEXT_ACK]}]
+
+    def reset(self, data_context: Optional[str] = None, dataset_key: Optional[str] = None) -> None:
+        if self._model is None:
+            self._model = get_gemini_model(self.model_name)
+        primer = self._primer(data_context)
+        self._primer_len = len(primer)
+        self.chat = self._model.start_chat(history=primer)
+        self.dataset_key = dataset_key
+
+    def clear(self) -> None:
+        """Forget the live session; the next message starts a new one"""
+        self.chat = None
+        self.dataset_key = None
+
+    def ensure_dataset(self, data_context: Optional[str], dataset_key: Optional[str]) -> None:
+        """Start a fresh session if there is none yet or the data has changed"""
+        if self.chat is None or dataset_key != self.dataset_key:
+            self.reset(data_context, dataset_key)
+
+    def record_turn(self, prompt: str, reply: str) -> None:
+        """Add a turn answered elsewhere (e.g. by the local query engine) to the live session"""
+        if self.chat is not None:
+            self.chat.history = list(self.chat.history) + [{"role": "user", "parts": [prompt]},
+                                                           {"role": "model", "parts": [reply]}]
+
+    def history_tokens(self) -> int:
+        return sum(estimate_tokens(_content_text(c)) for c in self.chat.history)
+
+    def _apply_window(self) -> None:
+        history = list(self.chat.history)
+        if len(history) <= self._primer_len + 2 or self.history_tokens() <= self.token_budget:
+            return
+
+        primer, turns = history[:self._primer_len], history[self._primer_len:]
+        primer_tokens = sum(estimate_tokens(_content_text(c)) for c in primer)
+        # Keep the most recent user/model pairs that fit in what's left of the budget
+        kept, used = [], primer_tokens
+        for i in range(len(turns) - 2, -1, -2):
+            pair = turns[i:i + 2]
+            cost = sum(estimate_tokens(_content_text(c)) for c in pair)
+            if kept and used + cost > self.token_budget:
+                break
+            kept = pair + kept
+            used += cost
+
+        dropped = turns[:len(turns) - len(kept)]
+        summary = [{"role": "user", "parts": [_summarize_turns(dropped)]},
+                   {"role": "model", "parts": ["Noted."]}] if dropped else []
+        self.chat.history = primer + summary + kept
+
+    def stream(self, prompt: str, stats: Optional[StreamStats] = None) -> Iterator[str]:
+        """Send only `prompt` on the live session and yield the reply as it streams"""
+        stats = stats if stats is not None else StreamStats()
+        if not configure_gemini():
+            stats.finish()
+            yield NO_KEY_MESSAGE
+            return
+
+        finished = False
+        try:
+            if self.chat is None:
+                self.reset()
+            self._apply_window()
+            response = self.chat.send_message(prompt, stream=True)
+            for chunk in response:
+                text = chunk.text
+                if text:
+                    stats.mark_chunk()
+                    yield text
+            usage = getattr(response, "usage_metadata", None)
+            if usage is not None and usage.candidates_token_count:
+                stats.tokens = usage.candidates_token_count
+            finished = True
+        except Exception as e:
+            finished = True
+            self._discard_last_turn()
+            yield f"An error occurred with Gemini: {e}"
+        finally:
+            if not finished:
+                # Cancelled mid-stream: drop the half-finished turn from the session
+                self._discard_last_turn()
+            stats.finish(cancelled=not finished)
+
+    def _discard_last_turn(self) -> None:
+        if self.chat is not None and self.chat.last is not None:
+            self.chat.rewind()
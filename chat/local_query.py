@@ -0,0 +1,656 @@
+"""Answer simple questions about the scraped data without an LLM round trip.
+
+Questions such as "cheapest product", "average price on Flipkart" or "items
+under 20k sorted by rating" are parsed with regular expressions into a
+LocalQuery and run as vectorized pandas filters, group-bys and sorts. That
+takes milliseconds instead of a multi-second model call over the data
+context. The parser only answers when it understands every word of the
+question. Anything else ("which one should I buy?") returns None and goes to
+the model as before. LOCAL_QUERY_ENGINE counts how often the fast path is
+taken.
+
+    answer = LOCAL_QUERY_ENGINE.answer(df, "average price on flipkart", query="laptop")
+    if answer is None:
+        ...  # ask the model
+"""
+import logging
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from telemetry.tracing import observe
+from .data_context import PRICE_COLUMNS
+
+LOCAL_QUERIES_ENABLED = os.getenv("CHAT_LOCAL_QUERIES", "1").lower() in ("1", "true", "yes", "on")
+
+# Rows shown when a question asks for several listings without saying how many
+LIST_LIMIT = 10
+PLURAL_LIMIT = 5
+
+_AMOUNT = r"(\d+(?:\.\d+)?)\s*(k|thousand|l|lakhs?|lacs?)?\b"
+_RATING = r"([0-5](?:\.\d+)?)"
+_LOWER = r"above|over|more than|greater than|higher than|at least|min(?:imum)?|starting (?:at|from)|>=?"
+_UPPER = r"under|below|less than|cheaper than|lower than|at most|max(?:imum)?|up ?to|within|not more than|<=?"
+_SOURCE_NOUN = r"sources?|stores?|sites?|sellers?|retailers?|websites?|platforms?|shops?"
+_METRIC = r"prices?|priced|costs?|ratings?|rated|stars?|reviews?|reviewed"
+_DESC = r"descending|desc|high(?:est)? to low(?:est)?|(?:highest|largest|best|most expensive) first"
+_ASC = r"ascending|asc|low(?:est)? to high(?:est)?|(?:lowest|smallest|cheapest) first"
+
+_MULTIPLIERS = {"k": 1e3, "thousand": 1e3, "l": 1e5, "lakh": 1e5, "lakhs": 1e5, "lac": 1e5, "lacs": 1e5}
+
+# Fixed phrases naming a sort order: (regex, metric, ascending)
+_SUPERLATIVES = [
+    (r"cheapest|least expensive|most affordable|lowest[\s-]cost", "price", True),
+    (r"most expensive|priciest|costliest|most costly", "price", False),
+    (r"most popular", "reviews", False),
+    (r"best value(?: for money)?|value for money|best deals?|best bang for (?:the |your )?buck", "value", False),
+]
+# "<direction> <metric>", e.g. "lowest price", "top rated", "most reviewed"
+_DIRECTED = re.compile(r"\b(lowest|minimum|min|least|fewest|worst|highest|maximum|max|most|best|top|greatest)"
+                       rf"[\s-]+({_METRIC}|review count)\b")
+_ASCENDING_WORDS = {"lowest", "minimum", "min", "least", "fewest", "worst"}
+
+_AGGREGATES = [
+    (r"\b(?:average|avg|mean)\b", "mean"),
+    (r"\b(?:median|typical)\b", "median"),
+    (r"\b(?:how many|number of|count of|count)\b", "count"),
+    (r"\b(?:price range|range of prices|range)\b", "range"),
+]
+
+# "how many stores", "number of different sellers": distinct sources, not listings
+_SOURCE_COUNT = re.compile(rf"\b(?:how many|number of|count of|count)\s+(?:different\s+|distinct\s+|unique\s+)?"
+                           rf"(?:{_SOURCE_NOUN})\b")
+
+_GROUP_BY = re.compile(rf"\b(?:per|by|for each|each|across|between|for every|every)\s+(?:the\s+)?(?:{_SOURCE_NOUN})\b"
+                       rf"|\bcompare\s+(?:the\s+)?(?:prices?\s+)?(?:across\s+|between\s+|of\s+)?(?:the\s+)?(?:{_SOURCE_NOUN})\b"
+                       rf"|\b(?:which|what)\s+(?:{_SOURCE_NOUN})\b")
+
+_FILLER = set("""
+a an the is are was were be been of for on in at from to by with and as than then
+me my i i'm we our you your us please just also only all any some there here now currently today
+what what's whats which who where how do does did can could would will has have having get got
+show list find give display tell see view look looking want need buy bought
+this one ones
+product products item items listing listings option options deal deals result results thing things
+price prices priced cost costs costing rating ratings rated star stars review reviews reviewed
+available sold sell sells selling offered listed
+store stores source sources site sites seller sellers shop shops retailer retailers
+platform platforms website websites data dataset scraped overall total whole entire much many
+""".split())
+
+# "or" needs OR filters the parser does not build, and pronouns point at an earlier turn,
+# so questions with leftover ones go to the model
+_REFERENTIAL = set("or it its it's them they that these those".split())
+
+_PLURAL_NOUNS = {"products", "items", "listings", "options", "deals", "results", "ones", "things"}
+
+# Words that make a question a matter of judgement, so it goes to the model
+_OPEN_ENDED = set("""
+why should recommend recommendation recommendations suggest suggestion explain worth better best good bad
+compare comparison versus vs difference differences opinion think feel summarize summary trend trends
+analysis analyze analyse insight insights pros cons features specs quality reliable
+""".split())
+
+
+@dataclass
+class LocalQuery:
+    """What a question asks for, as understood by parse_question"""
+    # top: best rows by a metric; aggregate: one number; nunique: distinct sources;
+    # by_source: per-source table; list: filtered rows
+    intent: str
+    metric: str = "price"
+    ascending: bool = True
+    aggregate: Optional[str] = None
+    limit: Optional[int] = None
+    sort_metric: Optional[str] = None
+    sources: List[str] = field(default_factory=list)
+    name_terms: List[str] = field(default_factory=list)
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    min_rating: Optional[float] = None
+    max_rating: Optional[float] = None
+    min_reviews: Optional[int] = None
+    max_reviews: Optional[int] = None
+
+
+@dataclass
+class LocalAnswer:
+    text: str
+    table: Optional[pd.DataFrame]
+    intent: str
+    # Listings left after the question's filters
+    rows: int
+    seconds: float = 0.0
+
+    def as_markdown(self) -> str:
+        """The answer as plain text, e.g. for a model's conversation history"""
+        if self.table is None or self.table.empty:
+            return self.text
+        return f"{self.text}\n\n{self.table.to_markdown(index=False)}"
+
+
+def _amount(number: str, unit: Optional[str]) -> float:
+    return float(number) * _MULTIPLIERS.get(unit or "", 1.0)
+
+
+def _normalize(question: str) -> str:
+    text = question.casefold()
+    text = re.sub(r"(?<=\d),(?=\d)", "", text)
+    text = re.sub(r"₹|\$|\brs\.?(?=\s|\d|$)|\binr\b|\brupees?\b", " ", text)
+    # Sentence punctuation, but not the dot in "4.5" or "amazon.in"
+    text = re.sub(r"[?!,;:()]|\.(?=\s|$)", " ", text)
+    return " ".join(text.split())
+
+
+def _take(pattern, text: str):
+    """First match of `pattern` and `text` with the match blanked out"""
+    match = re.search(pattern, text)
+    if match is None:
+        return None, text
+    return match, text[:match.start()] + " " + text[match.end():]
+
+
+def _source_aliases(sources: List[str]) -> List[tuple]:
+    aliases = []
+    for source in sources:
+        name = str(source).casefold()
+        aliases.append((name, source))
+        base = re.sub(r"\.(?:co\.in|in|com)$", "", name)
+        if base != name:
+            aliases.append((base, source))
+    # Longest first, so "tata cliq" wins over a shorter alias inside it
+    return sorted(aliases, key=lambda a: -len(a[0]))
+
+
+def _comparison(op: str) -> str:
+    return "upper" if re.fullmatch(_UPPER, op) else "lower"
+
+
+def parse_question(question: str, sources: List[str], names: Optional[pd.Series] = None,
+                   query: Optional[str] = None) -> Optional[LocalQuery]:
+    """Parse `question` into a LocalQuery, or None if any part of it is not understood
+
+    `sources` are the source names in the data and `names` the product
+    names; other words found in names filter by name. Words of the search
+    `query` itself ("laptop") are ignored.
+    """
+    text = _normalize(question)
+    if not text:
+        return None
+    q = LocalQuery(intent="list")
+
+    for match in re.findall(r"\"([^\"]+)\"|'([^']+)'", question.casefold()):
+        q.name_terms.append((match[0] or match[1]).strip())
+    text = re.sub(r"\"[^\"]+\"|'[^']+'", " ", text) if q.name_terms else text
+
+    for alias, source in _source_aliases(sources):
+        pattern = rf"(?<![\w.]){re.escape(alias)}(?![\w.])"
+        while re.search(pattern, text):
+            if source not in q.sources:
+                q.sources.append(source)
+            text = re.sub(pattern, " ", text, count=1)
+
+    # Review counts, then ratings, then prices: "5+ reviews" is not a rating and "over 4 stars" not a price
+    for pattern in (rf"\b(?:with\s+)?({_LOWER}|{_UPPER})\s*{_AMOUNT}\s*\+?\s*reviews?\b",
+                    rf"\breviews?\s+({_LOWER}|{_UPPER})\s*{_AMOUNT}"):
+        match, text = _take(pattern, text)
+        if match:
+            value = int(_amount(match.group(2), match.group(3)))
+            if _comparison(match.group(1)) == "upper":
+                q.max_reviews = value
+            else:
+                q.min_reviews = value
+    if q.min_reviews is None and q.max_reviews is None:
+        match, text = _take(rf"\b{_AMOUNT}\s*\+?\s*(?:or more\s+)?reviews?\b", text)
+        if match:
+            q.min_reviews = int(_amount(match.group(1), match.group(2)))
+
+    for pattern in (rf"\b(?:rated|rating|ratings|stars?)\s+(?:of\s+)?({_LOWER}|{_UPPER})\s*{_RATING}(?:\s*stars?)?",
+                    rf"\b({_LOWER}|{_UPPER})\s*{_RATING}\s*(?:stars?|rating|rated)\b"):
+        match, text = _take(pattern, text)
+        if match:
+            value = float(match.group(2))
+            if _comparison(match.group(1)) == "upper":
+                q.max_rating = value
+            else:
+                q.min_rating = value
+    if q.min_rating is None:
+        match, text = _take(rf"\b(?:rated\s+)?{_RATING}\s*(?:\+|(?:and|or)\s+(?:above|up|more|higher|over))\s*"
+                            r"(?:stars?|rating|rated)?(?!\w)"
+                            rf"|\b(?:rated\s+)?{_RATING}\s*stars?(?:\s+(?:and|or)\s+(?:above|up|more|higher|over))?\b", text)
+        if match:
+            q.min_rating = float(match.group(1) or match.group(2))
+
+    match, text = _take(rf"\b(?:between|from)\s+{_AMOUNT}\s+(?:and|to)\s+{_AMOUNT}|\b{_AMOUNT}\s*(?:-|to)\s*{_AMOUNT}", text)
+    if match:
+        groups = [g for g in match.groups()]
+        numbers = [(groups[i], groups[i + 1]) for i in range(0, 8, 2) if groups[i] is not None]
+        low, high = sorted(_amount(*n) for n in numbers[:2])
+        q.min_price, q.max_price = low, high
+    for _ in range(2):
+        match, text = _take(rf"\b({_LOWER}|{_UPPER})\s*{_AMOUNT}|\bbudget\s+(?:of\s+)?{_AMOUNT}", text)
+        if not match:
+            break
+        if match.group(4) is not None:
+            q.max_price = _amount(match.group(4), match.group(5))
+        elif _comparison(match.group(1)) == "upper":
+            q.max_price = _amount(match.group(2), match.group(3))
+        else:
+            q.min_price = _amount(match.group(2), match.group(3))
+
+    match, text = _take(r"\b(top|first|show|list|give me|find)\s+(\d{1,3})\b"
+                        r"|\b(\d{1,3})\s+(?=(?:cheapest|most|best|highest|lowest|top|priciest|least|worst|costliest"
+                        r"|products?|items?|options?|listings?|deals?|ones)\b)", text)
+    top_n = bool(match) and match.group(1) == "top"
+    if match:
+        q.limit = max(1, int(match.group(2) or match.group(3)))
+    else:
+        # "cheapest 5": keep the superlative, take the count
+        match = re.search(r"\b(?:cheapest|priciest|costliest|(?:best|top|highest|lowest)[\s-]rated|most[\s-]reviewed)"
+                          r"\s+(\d{1,3})\b", text)
+        if match:
+            q.limit = max(1, int(match.group(1)))
+            text = text[:match.start(1)] + " " + text[match.end(1):]
+
+    group, text = _take(_GROUP_BY, text)
+
+    match, text = _take(rf"\b(?:sorted|sort|order|ordered|rank|ranked)\s+by\s+({_METRIC}|value)\b"
+                        rf"|\bby\s+({_METRIC}|value)\b", text)
+    if match:
+        q.sort_metric = _metric_of(match.group(1) or match.group(2))
+    direction = None
+    match, text = _take(rf"\b(?:{_DESC})\b", text)
+    if match:
+        direction = False
+    else:
+        match, text = _take(rf"\b(?:{_ASC})\b", text)
+        if match:
+            direction = True
+
+    superlative = None
+    for pattern, metric, ascending in _SUPERLATIVES:
+        match, text = _take(rf"\b(?:{pattern})\b", text)
+        if match:
+            superlative = (metric, ascending)
+            break
+    if superlative is None:
+        match, text = _take(_DIRECTED, text)
+        if match:
+            metric = _metric_of(match.group(2))
+            ascending = match.group(1) in _ASCENDING_WORDS
+            # The best price is the lowest one
+            if metric == "price" and match.group(1) in ("best", "top", "worst"):
+                ascending = match.group(1) != "worst"
+            superlative = (metric, ascending)
+
+    aggregate = None
+    match, text = _take(_SOURCE_COUNT, text)
+    if match:
+        aggregate = "nunique"
+    for pattern, name in ([] if aggregate else _AGGREGATES):
+        match, text = _take(pattern, text)
+        if match:
+            aggregate = name
+            break
+
+    metric_words = re.findall(rf"\b(?:{_METRIC})\b", text)
+    mentioned = _metric_of(metric_words[0]) if metric_words else None
+
+    if superlative is None and top_n and mentioned in ("rating", "reviews"):
+        # "top 5 rated", "top 10 reviewed"
+        superlative = (mentioned, False)
+
+    leftover = _leftover_terms(text, names, query)
+    if leftover is None:
+        return None
+    terms, plural = leftover
+    q.name_terms += terms
+
+    if aggregate == "nunique" and not group:
+        q.intent = "nunique"
+    elif group:
+        q.intent = "by_source"
+        aggregate = None if aggregate == "nunique" else aggregate
+        q.aggregate = aggregate or ("median" if superlative else "summary")
+        q.metric = superlative[0] if superlative else (mentioned or "price")
+        q.ascending = superlative[1] if superlative else (direction if direction is not None else True)
+    elif aggregate:
+        q.intent = "aggregate"
+        q.aggregate = aggregate
+        q.metric = mentioned or (superlative[0] if superlative else "price")
+    elif superlative:
+        q.intent = "top"
+        q.metric, q.ascending = superlative
+        if q.limit is None:
+            q.limit = PLURAL_LIMIT if plural else 1
+    elif q.sort_metric or _has_filter(q) or re.search(r"\b(?:show|list|display|find)\b", _normalize(question)):
+        q.intent = "list"
+        q.metric = q.sort_metric or mentioned or "price"
+        q.ascending = direction if direction is not None else q.metric == "price"
+        if q.limit is None:
+            q.limit = LIST_LIMIT
+    else:
+        return None
+    return q
+
+
+def _metric_of(word: str) -> str:
+    if word.startswith(("rat", "star")):
+        return "rating"
+    if word.startswith("review"):
+        return "reviews"
+    if word == "value":
+        return "value"
+    return "price"
+
+
+def _has_filter(q: LocalQuery) -> bool:
+    return bool(q.sources or q.name_terms) or any(v is not None for v in (
+        q.min_price, q.max_price, q.min_rating, q.max_rating, q.min_reviews, q.max_reviews))
+
+
+def _leftover_terms(text: str, names: Optional[pd.Series], query: Optional[str]) -> Optional[tuple]:
+    """Words not consumed by the patterns: name filters, or None if any is not understood"""
+    query_words: Set[str] = set(re.findall(r"\w+", (query or "").casefold()))
+    terms, plural = [], False
+    for token in re.findall(r"[\w][\w'+.-]*", text):
+        token = token.strip(".-'")
+        if not token or token in _FILLER:
+            plural = plural or token in _PLURAL_NOUNS
+            continue
+        if token in _OPEN_ENDED or token in _REFERENTIAL or token.isdigit():
+            return None
+        if token in query_words or (token.endswith("s") and token[:-1] in query_words):
+            plural = plural or token not in query_words
+            continue
+        if names is None:
+            return None
+        if _contains(names, token).any():
+            terms.append(token)
+        elif token.endswith("s") and len(token) > 3 and _contains(names, token[:-1]).any():
+            terms.append(token[:-1])
+            plural = True
+        else:
+            return None
+    return terms, plural
+
+
+def _contains(names: pd.Series, term: str) -> pd.Series:
+    return names.str.contains(term, case=False, regex=False)
+
+
+def _sources(df: pd.DataFrame) -> List[str]:
+    if "source" not in df.columns:
+        return []
+    if isinstance(df["source"].dtype, pd.CategoricalDtype):
+        return [str(s) for s in df["source"].cat.categories]
+    return [str(s) for s in df["source"].dropna().unique()]
+
+
+def _price_column(df: pd.DataFrame) -> Optional[str]:
+    return next((c for c in PRICE_COLUMNS if c in df.columns), None)
+
+
+def _metric_values(df: pd.DataFrame, metric: str, price_col: Optional[str]) -> Optional[pd.Series]:
+    if metric == "price":
+        return df[price_col] if price_col else None
+    if metric == "value":
+        if "value_score" in df.columns:
+            return df["value_score"]
+        if price_col and {"rating", "reviews"} <= set(df.columns):
+            # Same formula as enhance_product_data
+            return df["rating"].astype(np.float64) * df["reviews"] / df[price_col]
+        return None
+    return df[metric] if metric in df.columns else None
+
+
+def _money(value: float, currency: str) -> str:
+    return f"{currency}{value:,.0f}" if abs(value) >= 100 else f"{currency}{value:,.2f}"
+
+
+class _Formatter:
+    def __init__(self, df: pd.DataFrame, price_col: Optional[str]):
+        self.price_col = price_col
+        symbols = df["currency_symbol"] if "currency_symbol" in df.columns else None
+        self.currency = str(symbols.iloc[0]) if symbols is not None and len(df) and symbols.nunique() == 1 else ""
+
+    def value(self, metric: str, value: float) -> str:
+        if metric == "price":
+            return _money(value, self.currency)
+        if metric == "rating":
+            return f"{value:.1f}★"
+        if metric == "reviews":
+            return f"{value:,.0f} reviews"
+        return f"{value:,.3g}"
+
+    def filters(self, q: LocalQuery) -> str:
+        parts = []
+        if q.name_terms:
+            parts.append("matching " + " and ".join(f"'{t}'" for t in q.name_terms))
+        if q.sources:
+            parts.append("on " + " or ".join(q.sources))
+        if q.min_price is not None and q.max_price is not None:
+            parts.append(f"between {_money(q.min_price, self.currency)} and {_money(q.max_price, self.currency)}")
+        elif q.max_price is not None:
+            parts.append(f"under {_money(q.max_price, self.currency)}")
+        elif q.min_price is not None:
+            parts.append(f"over {_money(q.min_price, self.currency)}")
+        if q.min_rating is not None:
+            parts.append(f"rated {q.min_rating:g}+")
+        if q.max_rating is not None:
+            parts.append(f"rated at most {q.max_rating:g}")
+        if q.min_reviews is not None:
+            parts.append(f"with {q.min_reviews:,}+ reviews")
+        if q.max_reviews is not None:
+            parts.append(f"with at most {q.max_reviews:,} reviews")
+        return (" " + ", ".join(parts)) if parts else ""
+
+    def table(self, rows: pd.DataFrame, extra: Optional[pd.Series] = None) -> pd.DataFrame:
+        columns = [c for c in ("product_name", self.price_col, "source", "rating", "reviews") if c and c in rows.columns]
+        table = rows[columns].reset_index(drop=True)
+        if extra is not None:
+            table["value_score"] = extra.round(4).to_numpy()
+        return table
+
+
+_METRIC_NAMES = {"price": "price", "rating": "rating", "reviews": "review count", "value": "value score"}
+_TOP_WORDS = {("price", True): "cheapest", ("price", False): "most expensive",
+              ("rating", False): "best-rated", ("rating", True): "lowest-rated",
+              ("reviews", False): "most-reviewed", ("reviews", True): "least-reviewed",
+              ("value", False): "best-value", ("value", True): "lowest-value"}
+
+
+def _filter(df: pd.DataFrame, q: LocalQuery, price_col: Optional[str]) -> Optional[pd.DataFrame]:
+    mask = np.ones(len(df), dtype=bool)
+    if q.sources:
+        if "source" not in df.columns:
+            return None
+        mask &= df["source"].isin(q.sources).to_numpy()
+    if q.name_terms:
+        if "product_name" not in df.columns:
+            return None
+        for term in q.name_terms:
+            mask &= _contains(df["product_name"], term).to_numpy(dtype=bool, na_value=False)
+    bounds = ((q.min_price, q.max_price, price_col), (q.min_rating, q.max_rating, "rating"),
+              (q.min_reviews, q.max_reviews, "reviews"))
+    for low, high, column in bounds:
+        if low is None and high is None:
+            continue
+        if column is None or column not in df.columns:
+            return None
+        values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        if low is not None:
+            mask &= values >= low
+        if high is not None:
+            mask &= values <= high
+    return df[mask].reset_index(drop=True)
+
+
+def run_query(df: pd.DataFrame, q: LocalQuery) -> Optional[LocalAnswer]:
+    """Evaluate a parsed question over `df`; None if the data lacks a needed column"""
+    price_col = _price_column(df)
+    rows = _filter(df, q, price_col)
+    if rows is None:
+        return None
+    fmt = _Formatter(df, price_col)
+    where = fmt.filters(q)
+    if q.intent == "nunique":
+        return _distinct_sources(rows, q, where)
+    values = _metric_values(rows, q.metric, price_col)
+    if values is None:
+        return None
+    if rows.empty:
+        return LocalAnswer(f"No listings{where}.", None, q.intent, 0)
+
+    if q.intent == "aggregate":
+        return _aggregate(rows, values, q, fmt, where)
+    if q.intent == "by_source":
+        return _by_source(rows, values, q, fmt, where)
+
+    if q.intent == "list":
+        order = values.sort_values(ascending=q.ascending, kind="stable", na_position="last")
+    else:
+        order = values.dropna()
+        order = order.nsmallest(q.limit) if q.ascending else order.nlargest(q.limit)
+    top = rows.loc[order.index[:q.limit]]
+    if q.intent == "top" and q.sort_metric and q.sort_metric != q.metric:
+        # "5 cheapest sorted by rating": pick by the superlative, then order by the sort key
+        resort = _metric_values(top, q.sort_metric, price_col)
+        if resort is not None:
+            top = top.loc[resort.sort_values(ascending=q.sort_metric == "price", kind="stable").index]
+    table = fmt.table(top, values.loc[top.index] if q.metric == "value" else None)
+
+    if q.intent == "list":
+        shown = f"; showing the first {len(top)}" if len(top) < len(rows) else ""
+        order_by = f", sorted by {_METRIC_NAMES[q.metric]} ({'lowest' if q.ascending else 'highest'} first)"
+        return LocalAnswer(f"Found {len(rows):,} listings{where}{order_by}{shown}.", table, q.intent, len(rows))
+
+    word = _TOP_WORDS[(q.metric, q.ascending)]
+    if len(top) == 1:
+        best = top.iloc[0]
+        details = [fmt.value("price", best[price_col])] if price_col else []
+        if q.metric not in ("price", "value") or not details:
+            details.append(fmt.value(q.metric, values.loc[top.index[0]]))
+        on = f" on {best['source']}" if "source" in top.columns and len(q.sources) != 1 else ""
+        text = f"The {word} listing{where} is **{best.get('product_name', 'unnamed')}** at {', '.join(details)}{on}."
+        return LocalAnswer(text, table, q.intent, len(rows))
+    return LocalAnswer(f"The {len(top)} {word} listings{where}:", table, q.intent, len(rows))
+
+
+def _aggregate(rows: pd.DataFrame, values: pd.Series, q: LocalQuery, fmt: _Formatter, where: str) -> LocalAnswer:
+    name = _METRIC_NAMES[q.metric]
+    count = f"{len(rows):,} listing{'s' if len(rows) != 1 else ''}"
+    if q.aggregate == "count":
+        text = f"There {'is' if len(rows) == 1 else 'are'} {count}{where}."
+    elif q.aggregate == "range":
+        text = (f"The {name} of {count}{where} ranges from {fmt.value(q.metric, values.min())} "
+                f"to {fmt.value(q.metric, values.max())}.")
+    else:
+        value = values.mean() if q.aggregate == "mean" else values.median()
+        label = "average" if q.aggregate == "mean" else "median"
+        text = f"The {label} {name} of {count}{where} is {fmt.value(q.metric, value)}."
+    return LocalAnswer(text, None, q.intent, len(rows))
+
+
+def _distinct_sources(rows: pd.DataFrame, q: LocalQuery, where: str) -> Optional[LocalAnswer]:
+    if "source" not in rows.columns:
+        return None
+    counts = rows["source"].astype(str).value_counts()
+    if counts.empty:
+        return LocalAnswer(f"No sources list anything{where}.", None, q.intent, 0)
+    table = counts.rename_axis("source").reset_index(name="listings")
+    sources = f"source{'s' if len(counts) != 1 else ''}"
+    text = f"{len(counts)} {sources} {'list' if len(counts) != 1 else 'lists'} {len(rows):,} listings{where}."
+    return LocalAnswer(text, table, q.intent, len(rows))
+
+
+def _by_source(rows: pd.DataFrame, values: pd.Series, q: LocalQuery, fmt: _Formatter, where: str) -> Optional[LocalAnswer]:
+    if "source" not in rows.columns:
+        return None
+    frame = pd.DataFrame({"source": rows["source"], "value": values.astype(np.float64)})
+    if fmt.price_col:
+        frame["price"] = rows[fmt.price_col].astype(np.float64)
+    if "rating" in rows.columns:
+        frame["rating"] = rows["rating"].astype(np.float64)
+    grouped = frame.groupby("source", observed=True)
+    table = pd.DataFrame({"listings": grouped.size()})
+    if "price" in frame.columns:
+        table["min_price"] = grouped["price"].min()
+        table["median_price"] = grouped["price"].median()
+        table["avg_price"] = grouped["price"].mean()
+    if "rating" in frame.columns:
+        table["avg_rating"] = grouped["rating"].mean()
+
+    how = {"mean": "mean", "median": "median", "count": "size", "range": "median", "summary": "median"}[q.aggregate]
+    key = grouped["value"].agg(how) if how != "size" else grouped.size()
+    name = _METRIC_NAMES[q.metric]
+    if q.metric not in ("price", "rating"):
+        table[f"{q.aggregate if how != 'size' else 'count'}_{q.metric}"] = key
+    ascending = q.ascending if q.aggregate in ("median", "summary") else q.metric == "price"
+    if how == "size":
+        ascending = False
+    order = key.sort_values(ascending=ascending, kind="stable").index
+    table = table.loc[order].round(2).reset_index()
+    table["source"] = table["source"].astype(str)
+
+    first = order[0]
+    if how == "size":
+        text = f"Listings per source{where}; {first} has the most ({int(key[first]):,})."
+    else:
+        label = "average" if how == "mean" else "median"
+        extreme = "lowest" if ascending else "highest"
+        text = f"{first} has the {extreme} {label} {name}{where} ({fmt.value(q.metric, key[first])}) of {len(key)} sources."
+    return LocalAnswer(text, table, q.intent, len(rows))
+
+
+class LocalQueryEngine:
+    """parse_question + run_query with hit/miss counters for the fast path"""
+
+    def __init__(self):
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "errors": 0}
+        self.intents: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def answer(self, df: Optional[pd.DataFrame], question: str, query: Optional[str] = None) -> Optional[LocalAnswer]:
+        """Answer `question` from `df`, or None if it should go to the model"""
+        if df is None or df.empty or not question.strip():
+            return None
+        started = time.perf_counter()
+        answer = None
+        try:
+            names = df["product_name"] if "product_name" in df.columns else None
+            sources = _sources(df)
+            parsed = parse_question(question, sources, names, query)
+            if parsed is not None:
+                answer = run_query(df, parsed)
+        except Exception as e:
+            logging.warning(f"Local query failed for {question!r}: {e}")
+            with self._lock:
+                self.stats["errors"] += 1
+        seconds = time.perf_counter() - started
+        observe("chat.local_query", seconds, start=started, hit=answer is not None,
+                intent=answer.intent if answer else None)
+        with self._lock:
+            self.stats["hits" if answer is not None else "misses"] += 1
+            if answer is not None:
+                self.intents[answer.intent] = self.intents.get(answer.intent, 0) + 1
+        if answer is not None:
+            answer.seconds = seconds
+        return answer
+
+    def hit_rate(self) -> float:
+        total = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / total if total else 0.0
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "hit_rate": self.hit_rate(), "intents": dict(self.intents)}
+
+
+LOCAL_QUERY_ENGINE = LocalQueryEngine()
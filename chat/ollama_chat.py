@@ -0,0 +1,214 @@
+import json
+import os
+import time
+from typing import Callable, Dict, Iterator, List, Optional
+
+import requests
+
+from clients.http_client import get_client
+from telemetry.tracing import observe
+from .data_context import estimate_tokens
+from .ollama_scheduler import OLLAMA_SCHEDULER, SchedulerBusy
+from .streaming import StreamStats
+
+OLLAMA_GENERATE_PATH = "/api/generate"
+OLLAMA_CHAT_PATH = "/api/chat"
+# Keep the model resident between turns so follow-ups skip the load and reuse the cached prompt prefix
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+OLLAMA_HISTORY_TOKENS = int(os.getenv("OLLAMA_HISTORY_TOKENS", "4000"))
+
+CONNECTION_ERROR_MESSAGE = "Oh no! (╯°□°）╯︵ ┻━┻ It seems I can't connect to the local Ollama models. Make sure Ollama is running! For now, you can use my online friend, the Gemini Buddy! ✨"
+BUSY_MESSAGE = "The local model is busy answering other questions right now (´･ω･`) Please try again in a moment!"
+
+def get_ollama_response(model_name: str, prompt: str, context: str = "", session_id: str = "default") -> str:
+    full_prompt = f"{context}\n\nUser: {prompt}"
+    try:
+        payload = {
+            "model": model_name,
+            "prompt": full_prompt,
+            "stream": False,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+        }
+        with OLLAMA_SCHEDULER.slot(session_id):
+            response = get_client("ollama").post(OLLAMA_GENERATE_PATH, json=payload, timeout=(3.05, 30))
+        response.raise_for_status()
+        return response.json().get("response", "No response field in JSON")
+    except SchedulerBusy:
+        return BUSY_MESSAGE
+    except requests.exceptions.ConnectionError:
+        return CONNECTION_ERROR_MESSAGE
+    except requests.exceptions.JSONDecodeError:
+        return "Error: Could not decode JSON response from Ollama."
+    except requests.exceptions.RequestException as e:
+        return f"An error occurred: {e}"
+
+def _record_done(chunk: Dict, stats: StreamStats, sent_at: float) -> None:
+    """Copy the timings Ollama reports in its final chunk into `stats`"""
+    if chunk.get("eval_count") is not None:
+        stats.tokens = chunk["eval_count"]
+    if chunk.get("eval_duration"):
+        stats.generation_seconds = chunk["eval_duration"] / 1e9
+    if chunk.get("load_duration") is not None:
+        stats.load_seconds = chunk["load_duration"] / 1e9
+    if chunk.get("prompt_eval_duration") is not None:
+        stats.prompt_tokens = chunk.get("prompt_eval_count", 0)
+        stats.prompt_eval_seconds = chunk["prompt_eval_duration"] / 1e9
+        observe("ollama.prompt_eval", stats.prompt_eval_seconds, start=sent_at + (stats.load_seconds or 0.0),
+                tokens=stats.prompt_tokens)
+
+def _stream(path: str, payload: Dict, text_of: Callable[[Dict], str], stats: StreamStats, session_id: str,
+            connect_timeout: float, read_timeout: float, reply: Optional[List[str]] = None) -> Iterator[str]:
+    """Send one streaming request through the scheduler and yield the generated text
+
+    Errors are yielded as text. Returns True once Ollama reports the reply done.
+    """
+    done = False
+    finished = False
+    try:
+        with OLLAMA_SCHEDULER.slot(session_id) as waited:
+            stats.queue_seconds = waited
+            sent_at = time.perf_counter()
+            response = get_client("ollama").post(path, json=payload, stream=True,
+                                                 timeout=(connect_timeout, read_timeout))
+            try:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get("error"):
+                        yield f"An error occurred: {chunk['error']}"
+                        break
+                    text = text_of(chunk)
+                    if text:
+                        stats.mark_chunk()
+                        if reply is not None:
+                            reply.append(text)
+                        yield text
+                    if chunk.get("done"):
+                        _record_done(chunk, stats, sent_at)
+                        done = True
+                        break
+            finally:
+                response.close()
+        finished = True
+    except SchedulerBusy:
+        finished = True
+        yield BUSY_MESSAGE
+    except requests.exceptions.ConnectionError:
+        finished = True
+        yield CONNECTION_ERROR_MESSAGE
+    except json.JSONDecodeError:
+        finished = True
+        yield "Error: Could not decode JSON response from Ollama."
+    except requests.exceptions.RequestException as e:
+        finished = True
+        yield f"An error occurred: {e}"
+    finally:
+        stats.finish(cancelled=not finished)
+    return done
+
+def _generate_text(chunk: Dict) -> str:
+    return chunk.get("response", "")
+
+def _chat_text(chunk: Dict) -> str:
+    return (chunk.get("message") or {}).get("content", "")
+
+def stream_ollama_response(model_name: str, prompt: str, context: str = "",
+                           stats: Optional[StreamStats] = None,
+                           connect_timeout: float = 3.05, read_timeout: float = 60.0,
+                           session_id: str = "default") -> Iterator[str]:
+    """Yield response text as Ollama generates it.
+
+    `read_timeout` bounds the gap between chunks, not the whole answer, so
+    long replies no longer hit a fixed deadline. Closing the generator early
+    (e.g. the user navigates away) closes the HTTP stream and marks `stats`
+    as cancelled. The request waits for a slot in OLLAMA_SCHEDULER first.
+    """
+    stats = stats if stats is not None else StreamStats()
+    payload = {
+        "model": model_name,
+        "prompt": f"{context}\n\nUser: {prompt}",
+        "stream": True,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+    }
+    yield from _stream(OLLAMA_GENERATE_PATH, payload, _generate_text, stats, session_id,
+                       connect_timeout, read_timeout)
+
+class OllamaChatSession:
+    """One conversation with the shared Ollama instance, kept across reruns.
+
+    Every turn is an /api/chat request that starts with the same system
+    message holding the data context, followed by the turns so far, and
+    asks Ollama to keep the model loaded. Ollama reuses its KV cache for the
+    longest prompt prefix it has already evaluated, so a follow-up question
+    costs the new turn rather than the whole dataset again (compare
+    `prompt_tokens` in the stream stats). The conversation restarts when
+    the dataset changes. Once the history exceeds `token_budget` the oldest
+    turns are dropped down to three quarters of it, so the cached prefix is
+    invalidated only every few turns.
+    """
+
+    def __init__(self, session_id: str = "default", token_budget: int = OLLAMA_HISTORY_TOKENS):
+        self.session_id = session_id
+        self.token_budget = token_budget
+        self.dataset_key: Optional[str] = None
+        self.messages: List[Dict] = []
+
+    def reset(self, data_context: Optional[str] = None, dataset_key: Optional[str] = None) -> None:
+        self.messages = []
+        if data_context:
+            self.messages.append({"role": "system", "content": (
+                f"Here is the data you are analyzing:\n\n{data_context}\n\n"
+                "Answer the user's questions based on this data.")})
+        self.dataset_key = dataset_key
+
+    def ensure_dataset(self, data_context: Optional[str], dataset_key: Optional[str]) -> None:
+        """Start over if the data has changed"""
+        if dataset_key != self.dataset_key or not self.messages:
+            self.reset(data_context, dataset_key)
+
+    def history_tokens(self) -> int:
+        return sum(estimate_tokens(m["content"]) for m in self.messages)
+
+    def _apply_window(self) -> None:
+        if self.history_tokens() <= self.token_budget:
+            return
+        system = self.messages[:1] if self.messages and self.messages[0]["role"] == "system" else []
+        turns = self.messages[len(system):]
+        target = self.token_budget * 3 // 4
+        used = sum(estimate_tokens(m["content"]) for m in system + turns)
+        while len(turns) > 2 and used > target:
+            used -= sum(estimate_tokens(m["content"]) for m in turns[:2])
+            turns = turns[2:]
+        self.messages = system + turns
+
+    def record_turn(self, prompt: str, reply: str) -> None:
+        """Add a turn answered elsewhere (e.g. by the local query engine) so follow-ups can refer to it
+
+        Dropped with the rest of the conversation if the dataset has changed.
+        """
+        if self.messages:
+            self.messages.append({"role": "user", "content": prompt})
+            self.messages.append({"role": "assistant", "content": reply})
+
+    def stream(self, model_name: str, prompt: str, stats: Optional[StreamStats] = None,
+               connect_timeout: float = 3.05, read_timeout: float = 60.0) -> Iterator[str]:
+        """Send `prompt` as the next turn and yield the reply as it streams
+
+        Only completed replies become part of the conversation.
+        """
+        stats = stats if stats is not None else StreamStats()
+        self._apply_window()
+        payload = {
+            "model": model_name,
+            "messages": self.messages + [{"role": "user", "content": prompt}],
+            "stream": True,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+        }
+        reply: List[str] = []
+        done = yield from _stream(OLLAMA_CHAT_PATH, payload, _chat_text, stats, self.session_id,
+                                  connect_timeout, read_timeout, reply=reply)
+        if done:
+            self.messages.append({"role": "user", "content": prompt})
+            self.messages.append({"role": "assistant", "content": "".join(reply)})
@@ -0,0 +1,133 @@
+"""Admission control for the shared local Ollama process.
+
+Ollama serves OLLAMA_NUM_PARALLEL requests at a time and silently queues
+the rest, so without a limit here every user's time to first token grows
+with the total load and nobody can see why. OllamaScheduler admits at most
+`max_concurrency` requests (set OLLAMA_MAX_CONCURRENCY to the server's
+OLLAMA_NUM_PARALLEL) and queues the rest per session, granting freed slots
+round-robin across sessions so one user's burst cannot starve the others.
+
+    with OLLAMA_SCHEDULER.slot(session_id) as waited:
+        ...  # one request to Ollama; `waited` is the queue wait in seconds
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, Optional
+
+from telemetry.tracing import observe
+
+
+class SchedulerBusy(Exception):
+    """Raised when the queue is full or the wait for a slot timed out"""
+
+
+class _Ticket:
+    __slots__ = ("session", "granted", "enqueued")
+
+    def __init__(self, session: str):
+        self.session = session
+        self.granted = threading.Event()
+        self.enqueued = time.perf_counter()
+
+
+class OllamaScheduler:
+    def __init__(self, max_concurrency: int = 1, max_waiting: int = 64, queue_timeout: float = 120.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_waiting = max_waiting
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        # Waiting tickets per session; the session at the front is served next
+        self._queues: "OrderedDict[str, Deque[_Ticket]]" = OrderedDict()
+        self._waiting = 0
+        self._lock = threading.Lock()
+        self.stats = {"admitted": 0, "queued": 0, "rejected": 0, "timed_out": 0, "wait_s_total": 0.0, "wait_s_max": 0.0}
+
+    @contextmanager
+    def slot(self, session_id: str = "default", timeout: Optional[float] = None) -> Iterator[float]:
+        """Hold one of the concurrency slots for the enclosed request"""
+        ticket = _Ticket(session_id)
+        with self._lock:
+            if self._active < self.max_concurrency and not self._waiting:
+                self._active += 1
+                ticket.granted.set()
+            elif self._waiting >= self.max_waiting:
+                self.stats["rejected"] += 1
+                raise SchedulerBusy(f"{self._waiting} requests are already waiting for the model")
+            else:
+                self._queues.setdefault(session_id, deque()).append(ticket)
+                self._waiting += 1
+                self.stats["queued"] += 1
+
+        if not ticket.granted.wait(self.queue_timeout if timeout is None else timeout):
+            with self._lock:
+                # The slot may have been handed over between the timeout and taking the lock
+                if not ticket.granted.is_set():
+                    self._remove(ticket)
+                    self.stats["timed_out"] += 1
+                    raise SchedulerBusy("Timed out waiting for the model")
+
+        waited = time.perf_counter() - ticket.enqueued
+        with self._lock:
+            self.stats["admitted"] += 1
+            self.stats["wait_s_total"] += waited
+            self.stats["wait_s_max"] = max(self.stats["wait_s_max"], waited)
+        observe("ollama.queue_wait", waited, start=ticket.enqueued)
+        try:
+            yield waited
+        finally:
+            self._release()
+
+    def _remove(self, ticket: _Ticket) -> None:
+        queue = self._queues.get(ticket.session)
+        if queue is not None and ticket in queue:
+            queue.remove(ticket)
+            self._waiting -= 1
+            if not queue:
+                del self._queues[ticket.session]
+
+    def _release(self) -> None:
+        with self._lock:
+            if not self._queues:
+                self._active -= 1
+                return
+            # Hand the slot straight to the next session in round-robin order
+            session, queue = next(iter(self._queues.items()))
+            ticket = queue.popleft()
+            self._waiting -= 1
+            if queue:
+                self._queues.move_to_end(session)
+            else:
+                del self._queues[session]
+            ticket.granted.set()
+
+    def position(self, session_id: str) -> int:
+        """Requests that will be served before this session's next queued one"""
+        with self._lock:
+            ahead = 0
+            for session, queue in self._queues.items():
+                if session == session_id:
+                    return ahead
+                ahead += 1
+            return self._waiting
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            admitted = self.stats["admitted"]
+            return {
+                "active": self._active,
+                "max_concurrency": self.max_concurrency,
+                "waiting": self._waiting,
+                "sessions_waiting": len(self._queues),
+                "mean_wait_s": self.stats["wait_s_total"] / admitted if admitted else 0.0,
+                **{k: v for k, v in self.stats.items() if k != "wait_s_total"},
+            }
+
+
+OLLAMA_SCHEDULER = OllamaScheduler(
+    max_concurrency=int(os.getenv("OLLAMA_MAX_CONCURRENCY", "1")),
+    max_waiting=int(os.getenv("OLLAMA_MAX_WAITING", "64")),
+    queue_timeout=float(os.getenv("OLLAMA_QUEUE_TIMEOUT", "120")),
+)
@@ -0,0 +1,86 @@
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+
+@dataclass
+class StreamStats:
+    """Timing for one streamed LLM response"""
+    started_at: float = field(default_factory=time.perf_counter)
+    first_token_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    chunks: int = 0
+    # Token count reported by the backend, when it provides one
+    tokens: Optional[int] = None
+    # Decode time reported by the backend, in seconds
+    generation_seconds: Optional[float] = None
+    # Time spent waiting for a free model slot before the request was sent
+    queue_seconds: Optional[float] = None
+    # Prompt tokens the backend actually evaluated (a reused prefix is not counted) and how long that took
+    prompt_tokens: Optional[int] = None
+    prompt_eval_seconds: Optional[float] = None
+    # Time the backend spent loading the model for this request
+    load_seconds: Optional[float] = None
+    cancelled: bool = False
+
+    def mark_chunk(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        self.chunks += 1
+
+    def finish(self, cancelled: bool = False) -> None:
+        self.finished_at = time.perf_counter()
+        self.cancelled = cancelled
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        if self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        tokens = self.tokens if self.tokens is not None else self.chunks
+        seconds = self.generation_seconds
+        if seconds is None and self.first_token_at is not None and self.finished_at is not None:
+            seconds = self.finished_at - self.first_token_at
+        if not tokens or not seconds:
+            return None
+        return tokens / seconds
+
+    def as_dict(self) -> Dict:
+        return {
+            "ttft_s": self.time_to_first_token,
+            "tokens": self.tokens if self.tokens is not None else self.chunks,
+            "tokens_per_s": self.tokens_per_second,
+            "total_s": (self.finished_at - self.started_at) if self.finished_at else None,
+            "queue_s": self.queue_seconds,
+            "prompt_tokens": self.prompt_tokens,
+            "prompt_eval_s": self.prompt_eval_seconds,
+            "load_s": self.load_seconds,
+            "cancelled": self.cancelled,
+        }
+
+
+def format_stream_metrics(metrics: Dict) -> str:
+    """One-line summary of StreamStats.as_dict() for display under a reply"""
+    parts = []
+    if metrics.get("local_s") is not None:
+        parts.append(f"answered locally in {metrics['local_s'] * 1000:.1f} ms")
+    if metrics.get("queue_s") and metrics["queue_s"] >= 0.01:
+        parts.append(f"queued {metrics['queue_s']:.2f}s")
+    if metrics.get("load_s") and metrics["load_s"] >= 0.1:
+        parts.append(f"model load {metrics['load_s']:.1f}s")
+    if metrics.get("prompt_eval_s") is not None:
+        parts.append(f"prompt {metrics.get('prompt_tokens') or 0} tok in {metrics['prompt_eval_s']:.2f}s")
+    if metrics.get("ttft_s") is not None:
+        parts.append(f"first token {metrics['ttft_s']:.2f}s")
+    if metrics.get("tokens_per_s") is not None:
+        parts.append(f"{metrics['tokens_per_s']:.1f} tok/s")
+    if metrics.get("tokens"):
+        parts.append(f"{metrics['tokens']} tokens")
+    if metrics.get("total_s") is not None:
+        parts.append(f"{metrics['total_s']:.1f}s total")
+    if metrics.get("cancelled"):
+        parts.append("cancelled")
+    return " · ".join(parts)
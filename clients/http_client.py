@@ -0,0 +1,198 @@
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with full jitter for retryable failures"""
+    max_attempts: int = 3
+    backoff_base: float = 0.5
+    backoff_max: float = 8.0
+    retry_statuses: Tuple[int, ...] = (429, 500, 502, 503, 504)
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised without touching the network while a circuit breaker is open"""
+
+
+class CircuitBreaker:
+    """Fail fast after repeated failures, then let one probe through after a cool-down.
+
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half-open after `reset_timeout` seconds;
+    half-open -> closed on the first success, back to open on failure.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+
+class PooledClient:
+    """A keep-alive `requests.Session` with retries and an optional circuit breaker"""
+
+    def __init__(self, name: str, base_url: str = "", pool_size: int = 10,
+                 retry: Optional[RetryPolicy] = None, breaker: Optional[CircuitBreaker] = None,
+                 timeout: Tuple[float, float] = (3.05, 30.0)):
+        self.name = name
+        self.base_url = base_url.rstrip("/")
+        self.retry = retry or RetryPolicy()
+        self.breaker = breaker
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def url(self, path: str) -> str:
+        if path.startswith(("http://", "https://")):
+            return path
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def request(self, method: str, path: str, **kwargs) -> requests.Response:
+        """Send a request, retrying connection errors, timeouts and retryable statuses.
+
+        With `stream=True` only the connection and headers are retried; once
+        the body starts flowing the caller owns the response.
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        url = self.url(path)
+        last_error: Optional[Exception] = None
+
+        for attempt in range(self.retry.max_attempts):
+            if self.breaker is not None and not self.breaker.allow():
+                raise CircuitOpenError(f"{self.name} circuit is open; not calling {url}")
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                last_error = e
+                if self.breaker is not None:
+                    self.breaker.record_failure()
+            except requests.exceptions.RequestException:
+                # Not retried (bad URL, redirect loop, broken body), but it must still
+                # end a half-open probe, or the breaker never lets another call through
+                if self.breaker is not None:
+                    self.breaker.record_failure()
+                raise
+            else:
+                if response.status_code not in self.retry.retry_statuses:
+                    if self.breaker is not None:
+                        self.breaker.record_success()
+                    return response
+                if self.breaker is not None:
+                    # 429 counts too: it must end a half-open probe, and a shop that keeps
+                    # rate limiting us should be left alone for a while
+                    self.breaker.record_failure()
+                if attempt == self.retry.max_attempts - 1:
+                    return response
+                response.close()
+                last_error = requests.exceptions.HTTPError(f"{response.status_code} from {url}", response=response)
+
+            if self.breaker is not None and self.breaker.state == "open":
+                raise CircuitOpenError(f"{self.name} circuit opened after: {last_error}")
+            if attempt < self.retry.max_attempts - 1:
+                delay = self.retry.delay(attempt)
+                logging.warning(f"{self.name}: attempt {attempt + 1} failed ({last_error}); retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+        raise last_error
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+
+def _build_client(name: str) -> PooledClient:
+    pool_size = int(os.getenv("HTTP_POOL_SIZE", "10"))
+    if name == "ollama":
+        return PooledClient(
+            "ollama",
+            base_url=os.getenv("OLLAMA_HOST", "http://localhost:11434"),
+            pool_size=pool_size,
+            retry=RetryPolicy(max_attempts=2, backoff_base=0.25),
+            breaker=CircuitBreaker(failure_threshold=3, reset_timeout=float(os.getenv("OLLAMA_BREAKER_RESET", "30"))),
+            timeout=(3.05, 60.0),
+        )
+    if name == "serpapi":
+        return PooledClient(
+            "serpapi",
+            base_url=os.getenv("SERPAPI_ENDPOINT", "https://serpapi.com"),
+            pool_size=pool_size,
+            retry=RetryPolicy(max_attempts=3, backoff_base=0.5),
+            breaker=CircuitBreaker(failure_threshold=5, reset_timeout=60.0),
+            timeout=(3.05, 30.0),
+        )
+    if name.startswith("site:"):
+        # Scraped shops: back off for a while once a site starts refusing us
+        return PooledClient(
+            name,
+            pool_size=pool_size,
+            retry=RetryPolicy(max_attempts=2, backoff_base=1.0),
+            breaker=CircuitBreaker(failure_threshold=3, reset_timeout=float(os.getenv("SCRAPER_BREAKER_RESET", "300"))),
+            timeout=(3.05, 15.0),
+        )
+    return PooledClient(name, pool_size=pool_size)
+
+
+_clients: Dict[str, PooledClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(name: str) -> PooledClient:
+    """Process-wide client for `name`, shared across Streamlit reruns and sessions"""
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = _build_client(name)
+        return _clients[name]
@@ -0,0 +1,11 @@
+import hashlib
+
+import pandas as pd
+
+
+def dataframe_fingerprint(df: pd.DataFrame) -> str:
+    """Content hash of a DataFrame, stable across copies of the same data"""
+    digest = hashlib.sha1()
+    digest.update(",".join(map(str, df.columns)).encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,317 @@
+"""Streaming price statistics that update in time proportional to each new batch.
+
+Each (query, source) group, plus a per-query "all sources" group, keeps:
+
+- RunningMoments: count, mean, variance (Welford, merged batch-wise), min, max
+- P2Quantile: the P-square median estimate (Jain & Chlamtac), O(1) memory
+- TrendingPool: a bounded candidate pool for top-k trending listings
+
+Listings are keyed by (source, product_name). Scraping the same listing again
+refreshes its trending entry but does not count it again in the price
+statistics, which reflect each listing's first sighting.
+
+`enhance_product_data`, `get_price_insights` and `get_trending_products`
+use these when they are passed a `stats` engine, rather than rescanning
+everything scraped so far.
+"""
+import bisect
+import heapq
+import math
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from data.scrapers.query_cache import normalize_query
+
+# trending_score = 0.4 * value_score + 0.4 * popularity_score + 0.2 * price_normalized
+TRENDING_WEIGHTS = {"value_score": 0.4, "popularity_score": 0.4, "price_normalized": 0.2}
+
+
+def price_column(df: pd.DataFrame) -> str:
+    return 'price_inr' if 'price_inr' in df.columns else 'price_value'
+
+
+LISTING_KEY = ['source', 'product_name']
+
+
+def listing_keys(df: pd.DataFrame) -> np.ndarray:
+    """64-bit hashes of each row's (source, product_name), or of its position without those columns"""
+    if not set(LISTING_KEY).issubset(df.columns):
+        return np.arange(len(df), dtype=np.uint64)
+    key = df[LISTING_KEY].astype(str)
+    return pd.util.hash_pandas_object(key, index=False).to_numpy(dtype=np.uint64)
+
+
+class RunningMoments:
+    """Count, mean, sample variance, min and max, merged one batch at a time"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, values) -> None:
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        m = len(values)
+        if m == 0:
+            return
+        batch_mean = values.mean()
+        batch_m2 = ((values - batch_mean) ** 2).sum()
+        # Chan et al.'s pairwise combination of two Welford states
+        total = self.n + m
+        delta = batch_mean - self.mean
+        self.mean += delta * m / total
+        self.m2 += batch_m2 + delta * delta * self.n * m / total
+        self.n = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance) if self.n > 1 else math.nan
+
+
+class P2Quantile:
+    """P-square estimate of the p-quantile using five markers and O(1) memory"""
+
+    def __init__(self, p: float = 0.5):
+        self.p = p
+        self._initial: List[float] = []
+        self.heights: Optional[List[float]] = None
+        self.positions: Optional[List[float]] = None
+        self.desired: Optional[List[float]] = None
+        self.increments = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def update(self, values) -> None:
+        for x in np.asarray(values, dtype=np.float64):
+            if not math.isnan(x):
+                self.add(float(x))
+
+    def add(self, x: float) -> None:
+        if self.heights is None:
+            self._initial.append(x)
+            if len(self._initial) == 5:
+                p = self.p
+                self.heights = sorted(self._initial)
+                self.positions = [0.0, 1.0, 2.0, 3.0, 4.0]
+                self.desired = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+            return
+
+        q, n = self.heights, self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = bisect.bisect_right(q, x, 1, 4) - 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < candidate < q[i + 1]:
+                    candidate = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = candidate
+                n[i] += d
+
+    def value(self) -> float:
+        if self.heights is not None:
+            return self.heights[2]
+        if not self._initial:
+            return math.nan
+        return float(np.quantile(self._initial, self.p))
+
+
+class TrendingPool:
+    """Bounded pool of candidates for the top-k trending listings
+
+    trending_score = base + 0.2 * (price - mean) / std, where `base` only
+    depends on the listing itself. The shared mean/std shift as batches
+    arrive, so the pool keeps `pool_size` candidates (several times the k
+    served) and re-ranks them with the current mean/std on every update.
+    The result is exact while the price distribution is stable and an
+    approximation of a full recomputation while it drifts. Entries are keyed
+    by listing, so a listing scraped again replaces its earlier entry.
+    """
+
+    def __init__(self, pool_size: int = 50):
+        self.pool_size = pool_size
+        self._entries: Dict[int, Tuple[float, float, int, dict]] = {}
+        self._seq = 0
+
+    @staticmethod
+    def _score(base: float, price: float, mean: float, std: float) -> float:
+        if not std or math.isnan(std):
+            return base
+        return base + TRENDING_WEIGHTS["price_normalized"] * (price - mean) / std
+
+    def keys(self) -> np.ndarray:
+        return np.fromiter(self._entries, dtype=np.uint64, count=len(self._entries))
+
+    def update(self, keys: np.ndarray, records: List[dict], bases: np.ndarray, prices: np.ndarray,
+               mean: float, std: float) -> None:
+        entries = self._entries
+        for key, record, base, price in zip(keys.tolist(), records, bases, prices):
+            entries[key] = (float(base), float(price), self._seq, record)
+            self._seq += 1
+        if len(entries) > self.pool_size:
+            kept = heapq.nlargest(self.pool_size, entries.items(), key=lambda kv: self._score(kv[1][0], kv[1][1], mean, std))
+            self._entries = dict(kept)
+
+    def floor(self, mean: float, std: float) -> float:
+        """Score a new candidate must beat to enter a full pool"""
+        if len(self._entries) < self.pool_size:
+            return -math.inf
+        return min(self._score(e[0], e[1], mean, std) for e in self._entries.values())
+
+    def top(self, n: int, mean: float, std: float) -> List[dict]:
+        ranked = heapq.nlargest(n, self._entries.values(), key=lambda e: self._score(e[0], e[1], mean, std))
+        return [dict(e[3], trending_score=float(self._score(e[0], e[1], mean, std))) for e in ranked]
+
+
+class GroupStats:
+    def __init__(self, pool_size: int):
+        self.prices = RunningMoments()
+        self.median = P2Quantile(0.5)
+        self.trending = TrendingPool(pool_size)
+        self.best_value: Optional[Tuple[float, str]] = None
+
+    def update(self, batch: pd.DataFrame, price_col: str, keys: np.ndarray, new: np.ndarray) -> None:
+        """Fold `batch` in; only rows flagged in `new` count towards the price statistics"""
+        prices = batch[price_col].to_numpy(dtype=np.float64)
+        self.prices.update(prices[new])
+        self.median.update(prices[new])
+        if {'rating', 'reviews'}.issubset(batch.columns):
+            self._update_trending(batch, prices, keys)
+
+    def _update_trending(self, batch: pd.DataFrame, prices: np.ndarray, keys: np.ndarray) -> None:
+        rating = batch['rating'].to_numpy(dtype=np.float64)
+        reviews = batch['reviews'].to_numpy(dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            value = rating * reviews / prices
+        popularity = rating * np.log1p(reviews)
+        base = np.nan_to_num(TRENDING_WEIGHTS["value_score"] * value
+                             + TRENDING_WEIGHTS["popularity_score"] * popularity, nan=-np.inf)
+
+        finite_value = np.nan_to_num(value, nan=-np.inf, posinf=-np.inf)
+        if len(finite_value) and np.isfinite(finite_value.max()):
+            i = int(finite_value.argmax())
+            if self.best_value is None or finite_value[i] > self.best_value[0]:
+                self.best_value = (float(finite_value[i]), str(batch['product_name'].iloc[i]))
+
+        # Only batch rows that beat the pool's current floor can enter it, plus
+        # rows refreshing a listing already in it; only those become records
+        mean, std = self.prices.mean, self.prices.std
+        scores = base
+        if std and not math.isnan(std):
+            scores = base + TRENDING_WEIGHTS["price_normalized"] * (prices - mean) / std
+        pooled = np.isin(keys, self.trending.keys())
+        keep = np.flatnonzero((np.isfinite(scores) & (scores > self.trending.floor(mean, std))) | pooled)
+        size = self.trending.pool_size
+        if len(keep) > size:
+            top = keep[np.argpartition(-scores[keep], size - 1)[:size]]
+            keep = np.union1d(top, np.flatnonzero(pooled))
+        if len(keep) == 0:
+            return
+        columns = {c: batch[c].to_numpy()[keep] for c in ('product_name', 'source', 'rating', 'reviews') if c in batch.columns}
+        records = [{c: values[j].item() if hasattr(values[j], 'item') else values[j] for c, values in columns.items()}
+                   for j in range(len(keep))]
+        for record, price in zip(records, prices[keep]):
+            record['price'] = float(price)
+            if record.get('rating') is not None:
+                # float32 ratings would otherwise come back as 4.400000095367432
+                record['rating'] = round(float(record['rating']), 2)
+        self.trending.update(keys[keep], records, base[keep], prices[keep], mean, std)
+
+    def insights(self) -> Dict:
+        return {
+            'avg_price': self.prices.mean if self.prices.n else math.nan,
+            'median_price': self.median.value(),
+            'price_range': (self.prices.min, self.prices.max) if self.prices.n else (math.nan, math.nan),
+            'best_value': self.best_value[1] if self.best_value else None,
+            'total_products': self.prices.n,
+        }
+
+
+class IncrementalAnalytics:
+    """Streaming price statistics per query, overall and per source"""
+
+    ALL_SOURCES = None
+
+    def __init__(self, pool_size: int = 50):
+        self.pool_size = pool_size
+        self._groups: Dict[Tuple[str, Optional[str]], GroupStats] = {}
+        # Listing keys already counted, per query; a set keeps the check proportional to the batch
+        self._seen: Dict[str, Set[int]] = {}
+        self._lock = threading.Lock()
+
+    def _group(self, query: str, source: Optional[str]) -> GroupStats:
+        key = (normalize_query(query), source)
+        if key not in self._groups:
+            self._groups[key] = GroupStats(self.pool_size)
+        return self._groups[key]
+
+    def update(self, query: str, batch: pd.DataFrame) -> None:
+        """Fold a new batch of listings into the query's statistics
+
+        Listings seen before for the query only refresh their trending entry.
+        """
+        if batch.empty:
+            return
+        price_col = price_column(batch)
+        batch = batch[pd.to_numeric(batch[price_col], errors='coerce') > 0]
+        keys = listing_keys(batch)
+        # The last row wins when a batch lists the same listing twice
+        unique = ~pd.Series(keys).duplicated(keep='last').to_numpy()
+        batch, keys = batch[unique], keys[unique]
+        with self._lock:
+            seen = self._seen.setdefault(normalize_query(query), set())
+            batch_keys = keys.tolist()
+            new = np.fromiter((key not in seen for key in batch_keys), dtype=bool, count=len(batch_keys))
+            seen.update(batch_keys)
+            self._group(query, self.ALL_SOURCES).update(batch, price_col, keys, new)
+            if 'source' in batch.columns:
+                for source, rows in batch.groupby('source', observed=True, sort=False).indices.items():
+                    self._group(query, str(source)).update(batch.iloc[rows], price_col, keys[rows], new[rows])
+
+    def normalize(self, query: str, prices: pd.Series, source: Optional[str] = None) -> pd.Series:
+        """z-scores of `prices` against everything seen for the query so far"""
+        with self._lock:
+            moments = self._group(query, source).prices
+            mean, std = moments.mean, moments.std
+        return (prices.astype(np.float64) - mean) / std
+
+    def insights(self, query: str, source: Optional[str] = None) -> Dict:
+        with self._lock:
+            return self._group(query, source).insights()
+
+    def trending(self, query: str, n: int = 5, source: Optional[str] = None) -> List[Dict]:
+        with self._lock:
+            group = self._group(query, source)
+            return group.trending.top(n, group.prices.mean, group.prices.std)
+
+    def queries(self) -> List[str]:
+        with self._lock:
+            return sorted({q for q, source in self._groups if source is self.ALL_SOURCES})
+
+
+PRICE_ANALYTICS = IncrementalAnalytics()
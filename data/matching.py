@@ -0,0 +1,251 @@
+"""Group listings of the same physical product across sellers.
+
+Titles are normalized and cut into character 3-gram shingles, and each
+distinct title gets a MinHash signature. The signatures for a batch are
+computed in one vectorized pass. Locality-sensitive hashing over
+signature bands gives candidate pairs without comparing every listing with
+every other, so the work grows roughly linearly with the number of listings.
+Candidate pairs are then checked in one vectorized pass: estimated
+Jaccard similarity, matching storage variant (128GB vs 256GB) and a price
+sanity ratio. Pairs that pass are joined with union-find.
+
+    groups = match_listings(df)
+    summary = product_price_summary(df, groups)
+"""
+import re
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+_PRIME = np.uint64((1 << 31) - 1)
+_NON_WORD = re.compile(r"[^\w\s]+")
+# "128 GB" and "128GB" should produce the same shingles
+_UNITS = re.compile(r"(\d+(?:\.\d+)?)\s*(gb|tb|mb|mah|inch|inches|hz|w|mm|cm|kg|ml)\b")
+_STORAGE = re.compile(r"(\d+)(gb|tb)\b")
+STOPWORDS = frozenset({"a", "an", "and", "the", "with", "for", "of", "by", "in", "on", "new", "latest", "buy", "online"})
+
+
+def normalize_title(title: str) -> str:
+    """Casefolded, punctuation-free title with units glued to numbers and tokens sorted"""
+    text = _UNITS.sub(r"\1\2", _NON_WORD.sub(" ", str(title).casefold()))
+    return " ".join(sorted(t for t in text.split() if t not in STOPWORDS))
+
+
+def storage_variant(normalized: str) -> int:
+    """Largest storage size in GB named in a normalized title, 0 if none"""
+    sizes = [int(n) * (1024 if unit == "tb" else 1) for n, unit in _STORAGE.findall(normalized)]
+    return max(sizes) if sizes else 0
+
+
+def shingles(normalized: str, k: int = 3) -> np.ndarray:
+    text = f" {normalized} "
+    grams = {text[i:i + k] for i in range(max(1, len(text) - k + 1))}
+    return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+
+class MinHasher:
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.a = rng.integers(1, int(_PRIME), num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, int(_PRIME), num_perm, dtype=np.uint64)
+
+    def signatures(self, shingle_sets: Sequence[np.ndarray]) -> np.ndarray:
+        """(len(shingle_sets), num_perm) signature matrix, computed in one pass"""
+        lengths = np.fromiter((len(s) for s in shingle_sets), dtype=np.int64, count=len(shingle_sets))
+        if len(lengths) == 0:
+            return np.empty((0, self.num_perm), dtype=np.uint64)
+        ids = np.concatenate(shingle_sets) % _PRIME
+        # Hash every shingle under every permutation, then take the minimum per title
+        hashed = (self.a[:, None] * ids[None, :] + self.b[:, None]) % _PRIME
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        return np.minimum.reduceat(hashed, offsets, axis=1).T
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent: List[int] = []
+
+    def add(self, n: int) -> None:
+        self.parent.extend(range(len(self.parent), len(self.parent) + n))
+
+    def find(self, x: int) -> int:
+        parent = self.parent
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    def union(self, x: int, y: int) -> None:
+        rx, ry = self.find(x), self.find(y)
+        if rx != ry:
+            self.parent[max(rx, ry)] = min(rx, ry)
+
+
+class ProductIndex:
+    """Incremental MinHash/LSH index that assigns listings to product groups
+
+    The index works on distinct normalized titles, so a title repeated by
+    many sellers or scrapes costs one dictionary lookup. Listings can be
+    added in batches, e.g. one scrape at a time across the price history.
+    Groups only ever merge, so call `groups()` for up-to-date ids.
+    """
+
+    def __init__(self, threshold: float = 0.6, num_perm: int = 64, bands: int = 16,
+                 max_price_ratio: Optional[float] = 3.0, max_bucket_peers: int = 4, seed: int = 1,
+                 chunk_size: int = 512):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.max_price_ratio = max_price_ratio
+        self.max_bucket_peers = max_bucket_peers
+        self.chunk_size = chunk_size
+        self.hasher = MinHasher(num_perm, seed)
+        self._band_mult = np.random.default_rng(seed + 1).integers(1, 2 ** 63, self.rows, dtype=np.uint64) | np.uint64(1)
+        self._buckets: Dict[tuple, List[int]] = {}
+        self._nodes: Dict[str, int] = {}
+        # Per title node, grown by doubling so a batch never copies the whole history
+        self._signatures = np.empty((0, num_perm), dtype=np.uint64)
+        self._variants = np.empty(0, dtype=np.int64)
+        self._price_sum = np.empty(0, dtype=np.float64)
+        self._price_count = np.empty(0, dtype=np.int64)
+        self._listing_nodes: List[np.ndarray] = []
+        self._uf = _UnionFind()
+
+    @property
+    def size(self) -> int:
+        """Listings indexed so far"""
+        return sum(len(nodes) for nodes in self._listing_nodes)
+
+    @property
+    def nodes(self) -> int:
+        """Distinct normalized titles indexed so far"""
+        return len(self._nodes)
+
+    def _reserve(self, n: int) -> None:
+        used = len(self._nodes)
+        capacity = len(self._variants)
+        if used + n <= capacity:
+            return
+        capacity = max(used + n, 2 * capacity, 64)
+        for name in ("_signatures", "_variants", "_price_sum", "_price_count"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:used] = old[:used]
+            setattr(self, name, new)
+
+    def add(self, titles: Sequence[str], prices: Optional[Sequence[float]] = None) -> np.ndarray:
+        """Index a batch of listings and return their group ids"""
+        normalized = [normalize_title(t) for t in titles]
+        prices = np.full(len(normalized), np.nan) if prices is None else np.asarray(prices, dtype=np.float64)
+
+        first_new = len(self._nodes)
+        fresh = [t for t in dict.fromkeys(normalized) if t not in self._nodes]
+        self._reserve(len(fresh))
+        for title in fresh:
+            self._nodes[title] = len(self._nodes)
+        nodes = np.fromiter((self._nodes[t] for t in normalized), dtype=np.int64, count=len(normalized))
+
+        known = ~np.isnan(prices)
+        np.add.at(self._price_sum, nodes[known], prices[known])
+        np.add.at(self._price_count, nodes[known], 1)
+        self._listing_nodes.append(nodes)
+
+        self._uf.add(len(fresh))
+        # Chunked so the (num_perm x shingles) hash matrix stays a few MB
+        for start in range(0, len(fresh), self.chunk_size):
+            chunk = fresh[start:start + self.chunk_size]
+            ids = np.arange(first_new + start, first_new + start + len(chunk))
+            self._signatures[ids] = self.hasher.signatures([shingles(t) for t in chunk])
+            self._variants[ids] = [storage_variant(t) for t in chunk]
+            self._link(ids)
+        return np.fromiter((self._uf.find(n) for n in nodes.tolist()), dtype=np.int64, count=len(nodes))
+
+    def _link(self, ids: np.ndarray) -> None:
+        """Bucket new title nodes by LSH band and merge verified candidate pairs"""
+        band_keys = (self._signatures[ids].reshape(len(ids), self.bands, self.rows) * self._band_mult).sum(axis=2)
+        left, right = [], []
+        peers = self.max_bucket_peers
+        for node, keys in zip(ids.tolist(), band_keys.tolist()):
+            for band, key in enumerate(keys):
+                bucket = self._buckets.setdefault((band, key), [])
+                for other in bucket[-peers:]:
+                    left.append(other)
+                    right.append(node)
+                bucket.append(node)
+        if not left:
+            return
+
+        # A pair sharing several bands is verified once
+        width = np.int64(len(self._nodes))
+        pairs = np.unique(np.array(left, dtype=np.int64) * width + np.array(right, dtype=np.int64))
+        left, right = pairs // width, pairs % width
+        signatures, variants = self._signatures, self._variants
+        ok = (signatures[left] == signatures[right]).mean(axis=1) >= self.threshold
+        ok &= (variants[left] == variants[right]) | (variants[left] == 0) | (variants[right] == 0)
+        if self.max_price_ratio is not None:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                mean_price = self._price_sum / self._price_count
+                lo = np.fmin(mean_price[left], mean_price[right])
+                hi = np.fmax(mean_price[left], mean_price[right])
+                ok &= ~(hi / lo > self.max_price_ratio)
+        for a, b in zip(left[ok].tolist(), right[ok].tolist()):
+            self._uf.union(a, b)
+
+    def groups(self) -> np.ndarray:
+        """Current group id for every listing indexed so far, in insertion order"""
+        if not self._listing_nodes:
+            return np.empty(0, dtype=np.int64)
+        roots = np.fromiter((self._uf.find(n) for n in range(len(self._nodes))), dtype=np.int64, count=len(self._nodes))
+        return roots[np.concatenate(self._listing_nodes)]
+
+
+def _price_column(df: pd.DataFrame) -> Optional[str]:
+    return next((c for c in ("price_value", "price_inr", "price_usd") if c in df.columns), None)
+
+
+def match_listings(df: pd.DataFrame, title_col: str = "product_name", price_col: Optional[str] = None,
+                   **index_kwargs) -> pd.Series:
+    """Product group id for each listing, aligned with df.index"""
+    if df.empty:
+        return pd.Series([], index=df.index, dtype=np.int64, name="product_group")
+    price_col = price_col or _price_column(df)
+    index = ProductIndex(**index_kwargs)
+    groups = index.add(df[title_col].astype(str).tolist(),
+                       df[price_col].to_numpy(dtype=np.float64) if price_col else None)
+    # Renumber 0..k-1 in order of first appearance
+    return pd.Series(pd.factorize(groups)[0], index=df.index, name="product_group")
+
+
+def product_price_summary(df: pd.DataFrame, groups: Optional[pd.Series] = None,
+                          title_col: str = "product_name", price_col: Optional[str] = None) -> pd.DataFrame:
+    """Per matched product: listings, sellers and min/median/max price, cheapest first"""
+    price_col = price_col or _price_column(df)
+    if df.empty or price_col is None:
+        return pd.DataFrame(columns=["product", "listings", "sources", "min_price", "median_price",
+                                     "max_price", "spread_pct", "cheapest_source"])
+    if groups is None:
+        groups = match_listings(df, title_col=title_col, price_col=price_col)
+
+    frame = pd.DataFrame({
+        "group": groups.to_numpy(),
+        "title": df[title_col].astype(str).to_numpy(),
+        "price": df[price_col].to_numpy(dtype=np.float64),
+        "source": df["source"].astype(str).to_numpy() if "source" in df.columns else "",
+    })
+    grouped = frame.groupby("group", sort=False)
+    summary = grouped.agg(listings=("price", "size"), sources=("source", "nunique"),
+                          min_price=("price", "min"), median_price=("price", "median"), max_price=("price", "max"))
+    cheapest = frame.loc[grouped["price"].idxmin().to_numpy()].set_index("group")
+    summary["cheapest_source"] = cheapest["source"]
+    # The most common title names the product; ties go to the shortest
+    titles = frame.assign(length=frame["title"].str.len()).groupby(["group", "title"], sort=False) \
+        .agg(count=("price", "size"), length=("length", "first")).reset_index() \
+        .sort_values(["count", "length"], ascending=[False, True]).drop_duplicates("group").set_index("group")
+    summary.insert(0, "product", titles["title"])
+    summary["spread_pct"] = ((summary["max_price"] / summary["min_price"] - 1) * 100).round(1)
+    return summary.sort_values(["listings", "min_price"], ascending=[False, True]).reset_index(drop=True)
@@ -0,0 +1,135 @@
+import sys
+import threading
+import weakref
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+# Compact dtypes for scraped product frames. float32 keeps about 7
+# significant digits, which is exact to the paisa/cent below 100,000 and
+# within a rupee up to the 1,000,000 plausibility cap in the parsers.
+CATEGORY_COLUMNS = ["source", "currency_symbol", "availability_score"]
+FLOAT32_COLUMNS = ["price_value", "price_inr", "price_usd", "rating"]
+INT32_COLUMNS = ["reviews"]
+INTERNED_COLUMNS = ["product_name"]
+
+# Where pandas' default string dtype is Arrow-backed, names are already stored
+# contiguously without a Python object per row, which beats interning unless
+# titles repeat heavily. Otherwise names go into object columns, interned.
+_DEFAULT_STRING_DTYPE = pd.Series(["a"]).dtype
+ARROW_STRINGS = getattr(_DEFAULT_STRING_DTYPE, "storage", None) == "pyarrow"
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def apply_product_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast a product frame to the compact schema, returning a new frame
+
+    Columns that are missing are skipped, so this works for SerpAPI results,
+    generated fallback data and the multi-source scraper alike. `attrs` are
+    carried over.
+    """
+    if df.empty:
+        return df
+    out = df.copy(deep=False)
+    for col in CATEGORY_COLUMNS:
+        if col in out.columns and not isinstance(out[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype("category")
+    for col in FLOAT32_COLUMNS:
+        if col in out.columns and out[col].dtype != np.float32:
+            out[col] = pd.to_numeric(out[col], errors='coerce').astype(np.float32)
+    for col in INT32_COLUMNS:
+        if col in out.columns and out[col].dtype != np.int32:
+            values = pd.to_numeric(out[col], errors='coerce')
+            out[col] = values.astype("Int32" if values.isna().any() else np.int32)
+    for col in INTERNED_COLUMNS:
+        if col not in out.columns:
+            continue
+        if ARROW_STRINGS:
+            if out[col].dtype != _DEFAULT_STRING_DTYPE:
+                out[col] = out[col].astype(_DEFAULT_STRING_DTYPE)
+        else:
+            # Repeated titles across pages, sessions and cache hits share one string object
+            out[col] = pd.Series([_intern(v) for v in out[col].to_numpy()], index=out.index, dtype=object)
+    out.attrs = dict(df.attrs)
+    return out
+
+
+def column_nbytes(series: pd.Series) -> int:
+    """Bytes held by a column, counting each shared Python object once"""
+    if series.dtype == object:
+        values = series.to_numpy()
+        unique = {id(v): v for v in values}
+        return int(values.nbytes + sum(sys.getsizeof(v) for v in unique.values()))
+    return int(series.memory_usage(index=False, deep=True))
+
+
+def memory_report(df: Optional[pd.DataFrame]) -> Dict:
+    """Row count and bytes per column for a frame (zeros for None)"""
+    if df is None:
+        return {"rows": 0, "bytes": 0, "columns": {}}
+    columns = {col: column_nbytes(df[col]) for col in df.columns}
+    index_bytes = int(df.index.memory_usage(deep=True))
+    return {"rows": len(df), "bytes": sum(columns.values()) + index_bytes, "columns": columns}
+
+
+def format_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB"):
+        if n < 1024:
+            return f"{n:,.0f} {unit}" if unit == "B" else f"{n:,.1f} {unit}"
+        n /= 1024
+    return f"{n:,.1f} GB"
+
+
+class SessionMemoryTracker:
+    """Memory held by the frames each session keeps, per session and in aggregate
+
+    Reports are computed when a frame is tracked and dropped automatically
+    once the frame is garbage collected, e.g. when a session ends or replaces
+    its results.
+    """
+
+    def __init__(self):
+        self._reports: Dict[tuple, Dict] = {}
+        self._owners: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+
+    def track(self, session_id: str, name: str, df: Optional[pd.DataFrame]) -> Dict:
+        key = (session_id, name)
+        report = memory_report(df)
+        with self._lock:
+            if df is None:
+                self._reports.pop(key, None)
+                self._owners.pop(key, None)
+                return report
+            self._reports[key] = report
+            self._owners[key] = id(df)
+        weakref.finalize(df, self._discard, key, id(df))
+        return report
+
+    def _discard(self, key: tuple, owner: int) -> None:
+        with self._lock:
+            if self._owners.get(key) == owner:
+                self._reports.pop(key, None)
+                self._owners.pop(key, None)
+
+    def session(self, session_id: str) -> Dict:
+        with self._lock:
+            reports = [r for (sid, _), r in self._reports.items() if sid == session_id]
+        return {"rows": sum(r["rows"] for r in reports), "bytes": sum(r["bytes"] for r in reports)}
+
+    def aggregate(self) -> Dict:
+        with self._lock:
+            reports = list(self._reports.items())
+        sessions = {sid for (sid, _), _ in reports}
+        return {
+            "sessions": len(sessions),
+            "rows": sum(r["rows"] for _, r in reports),
+            "bytes": sum(r["bytes"] for _, r in reports),
+        }
+
+
+SESSION_MEMORY = SessionMemoryTracker()
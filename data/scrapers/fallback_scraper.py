@@ -1,15 +1,19 @@
 import requests
 import pandas as pd
 import numpy as np
-import random
 import logging
-import time  
 from datetime import datetime
 from typing import Dict, List, Optional, Union
 from pathlib import Path
 import plotly.graph_objects as go
 import plotly.express as px
 from .serpapi_google_shopping import search_google_shopping
+from .source_runner import ScraperSource, run_sources
+from data.schema import apply_product_schema
+from data.synthetic import CatalogGenerator, source_profiles
+from .html_engine import get_html_scraper
+from data.incremental_stats import IncrementalAnalytics, PRICE_ANALYTICS
+from data.storage.exports import DEFAULT_CHUNK_ROWS, EXPORT_FORMATS, write_export
 
 def validate_product_data(df: pd.DataFrame) -> pd.DataFrame:
     """Validate and clean product data"""
@@ -28,13 +32,22 @@ def validate_product_data(df: pd.DataFrame) -> pd.DataFrame:
     
     return df
 
-def enhance_product_data(df: pd.DataFrame) -> pd.DataFrame:
-    """Add additional statistics and metrics to the product data"""
+def enhance_product_data(df: pd.DataFrame, stats: Optional[IncrementalAnalytics] = None,
+                          query: Optional[str] = None) -> pd.DataFrame:
+    """Add additional statistics and metrics to the product data
+
+    With `stats` and `query`, the batch is folded into the running statistics
+    for that query and prices are normalized against everything seen so far.
+    """
     if df.empty:
         return df
     
     df = validate_product_data(df)    
-    df['price_normalized'] = (df['price_inr'] - df['price_inr'].mean()) / df['price_inr'].std()
+    if stats is not None and query is not None:
+        stats.update(query, df)
+        df['price_normalized'] = stats.normalize(query, df['price_inr'])
+    else:
+        df['price_normalized'] = (df['price_inr'] - df['price_inr'].mean()) / df['price_inr'].std()
     df['value_score'] = (df['rating'] * df['reviews']) / df['price_inr']
     df['timestamp'] = datetime.now()
     df['availability_score'] = np.random.choice(['High', 'Medium', 'Low'], size=len(df))
@@ -57,8 +70,15 @@ def visualize_price_distribution(df: pd.DataFrame) -> Optional[Union[go.Figure,
                  height=400)
     return fig
 
-def get_price_insights(df: pd.DataFrame) -> Dict:
-    """Generate statistical insights about prices"""
+def get_price_insights(df: pd.DataFrame, stats: Optional[IncrementalAnalytics] = None,
+                       query: Optional[str] = None) -> Dict:
+    """Generate statistical insights about prices
+
+    With `stats` and `query`, insights cover every batch folded into the
+    running statistics (the median is a P-square estimate) without rescanning.
+    """
+    if stats is not None and query is not None:
+        return stats.insights(query)
     if df.empty:
         return {}
         
@@ -70,8 +90,11 @@ def get_price_insights(df: pd.DataFrame) -> Dict:
         'total_products': len(df)
     }
 
-def get_trending_products(df: pd.DataFrame, n: int = 5) -> List[Dict]:
+def get_trending_products(df: pd.DataFrame, n: int = 5, stats: Optional[IncrementalAnalytics] = None,
+                          query: Optional[str] = None) -> List[Dict]:
     """Get trending products based on multiple metrics"""
+    if stats is not None and query is not None:
+        return stats.trending(query, n)
     if df.empty:
         return []
     
@@ -86,64 +109,53 @@ def get_trending_products(df: pd.DataFrame, n: int = 5) -> List[Dict]:
     trending = df.nlargest(n, 'trending_score')
     return trending.to_dict('records')
 
-def export_results(df: pd.DataFrame, format: str = 'csv', output_dir: str = None) -> str:
-    """Export results to various formats and return the file path"""
+def export_results(df: pd.DataFrame, format: str = 'csv', output_dir: str = None,
+                   chunk_rows: int = DEFAULT_CHUNK_ROWS) -> str:
+    """Export results to csv, excel, json, parquet or arrow and return the file path
+
+    Written chunk by chunk; use EXPORT_JOBS.submit to run an export in the background.
+    """
     if df.empty:
         raise ValueError("No data to export")
+    if format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported format: {format}")
         
     timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
     output_dir = output_dir or Path.cwd()
     output_path = Path(output_dir)
     
     try:
-        filename = f'product_data_{timestamp}'
-        if format == 'csv':
-            filepath = output_path / f'{filename}.csv'
-            df.to_csv(filepath, index=False)
-        elif format == 'excel':
-            filepath = output_path / f'{filename}.xlsx'
-            df.to_excel(filepath, index=False)
-        elif format == 'json':
-            filepath = output_path / f'{filename}.json'
-            df.to_json(filepath, orient='records')
-        else:
-            raise ValueError(f"Unsupported format: {format}")
-            
-        return str(filepath)
+        filepath = output_path / f'product_data_{timestamp}.{EXPORT_FORMATS[format][0]}'
+        return write_export(df, format, filepath, chunk_rows=chunk_rows)
     except Exception as e:
         logging.error(f"Error exporting data: {str(e)}")
         raise
 
-def multi_source_scraper(query: str = "laptop", max_results: int = 20) -> pd.DataFrame:
+def multi_source_scraper(query: str = "laptop", max_results: int = 20,
+                         per_source_timeout: float = 8.0, deadline: float = 15.0) -> pd.DataFrame:
     """Combined scraper with fallback and multiple sources"""
     logging.info(f"Starting scraping for query: {query}")
     
     try:
         # Try Google Shopping first
         df = search_google_shopping(query, max_results)
+        if 'price_inr' not in df.columns and 'price_value' in df.columns:
+            df['price_inr'] = df['price_value']
         
-        
-        if df.empty:
+        # Generated sample rows only stand in until a real source answers
+        if df.empty or df.attrs.get('fallback'):
             
+            run = run_sources(query, SCRAPER_SOURCES,
+                              per_source_timeout=per_source_timeout,
+                              deadline=deadline)
+            if run.partial:
+                logging.warning(f"Returning partial results; timed out: {', '.join(run.timed_out)}")
+
             dfs = []
-            sources = [
-                (scrape_direct_websites, "Direct Websites"),
-                (scrape_price_comparison_sites, "Price Comparison"),
-                (scrape_social_commerce, "Social Commerce"),
-                (scrape_international_sites, "International"),
-                (scrape_fallback_data, "Fallback")
-            ]
-            
-            for scraper_func, source_name in sources:
-                try:
-                    df = scraper_func(query)
-                    if not df.empty:
-                        df['source'] = source_name
-                        dfs.append(df)
-                    time.sleep(random.uniform(0.5, 1.5))
-                except Exception as e:
-                    logging.error(f"Error scraping {source_name}: {str(e)}")
-                    continue
+            for source in SCRAPER_SOURCES:
+                if source.name in run.frames:
+                    # The HTML scrapers name the site each listing came from
+                    dfs.append(run.frames[source.name])
             
             if dfs:
                 df = pd.concat(dfs, ignore_index=True)
@@ -155,68 +167,45 @@ def multi_source_scraper(query: str = "laptop", max_results: int = 20) -> pd.Dat
 
         df = df.dropna(subset=['price_inr'])
         df = df[df['price_inr'] > 0]
-        df = enhance_product_data(df)
+        df = enhance_product_data(df, stats=PRICE_ANALYTICS, query=query)
         
         logging.info(f"Successfully retrieved {len(df)} products")
-        return df.head(max_results)
+        return apply_product_schema(df.head(max_results))
         
     except Exception as e:
         logging.error(f"Error in multi-source scraper: {str(e)}")
-        return scrape_fallback_data(query)
+        return apply_product_schema(scrape_fallback_data(query))
 
 def scrape_direct_websites(query: str) -> pd.DataFrame:
     """Scrape from direct e-commerce websites"""
-    sample_data = {
-        'product_name': [f"{query} Pro", f"{query} Lite", f"{query} Plus"],
-        'price_inr': [random.randint(15000, 80000) for _ in range(3)],
-        'rating': [round(random.uniform(3.5, 5.0), 1) for _ in range(3)],
-        'reviews': [random.randint(50, 1000) for _ in range(3)],
-        'source': ['Direct Store'] * 3
-    }
-    return pd.DataFrame(sample_data)
+    return get_html_scraper().scrape(query, category="direct")
 
 def scrape_price_comparison_sites(query: str) -> pd.DataFrame:
     """Scrape from price comparison websites"""
-    sample_data = {
-        'product_name': [f"{query} Standard", f"{query} Premium"],
-        'price_inr': [random.randint(20000, 90000) for _ in range(2)],
-        'rating': [round(random.uniform(3.5, 5.0), 1) for _ in range(2)],
-        'reviews': [random.randint(50, 1000) for _ in range(2)],
-        'source': ['Price Compare'] * 2
-    }
-    return pd.DataFrame(sample_data)
+    return get_html_scraper().scrape(query, category="price_comparison")
 
 def scrape_social_commerce(query: str) -> pd.DataFrame:
     """Scrape from social commerce platforms"""
-    sample_data = {
-        'product_name': [f"{query} Basic", f"{query} Advanced"],
-        'price_inr': [random.randint(10000, 70000) for _ in range(2)],
-        'rating': [round(random.uniform(3.5, 5.0), 1) for _ in range(2)],
-        'reviews': [random.randint(50, 1000) for _ in range(2)],
-        'source': ['Social Shop'] * 2
-    }
-    return pd.DataFrame(sample_data)
+    return get_html_scraper().scrape(query, category="social")
 
 def scrape_international_sites(query: str) -> pd.DataFrame:
     """Scrape from international websites"""
-    sample_data = {
-        'product_name': [f"{query} Global", f"{query} International"],
-        'price_inr': [random.randint(25000, 100000) for _ in range(2)],
-        'rating': [round(random.uniform(3.5, 5.0), 1) for _ in range(2)],
-        'reviews': [random.randint(50, 1000) for _ in range(2)],
-        'source': ['International'] * 2
-    }
-    return pd.DataFrame(sample_data)
+    return get_html_scraper().scrape(query, category="international")
 
 def scrape_fallback_data(query: str) -> pd.DataFrame:
-    """Generate sample product data"""
-    sample_data = {
-        'product_name': [f"{query} Type {i}" for i in range(1, 6)],
-        'price_inr': [random.randint(1000, 50000) for _ in range(5)],
-        'source': ['Sample Store'] * 5
-    }
-    return pd.DataFrame(sample_data)
+    """Generate sample product data, used when no site returned listings"""
+    generator = CatalogGenerator(query, n_products=10, sources=source_profiles(["Sample Store"]))
+    df = generator.listings(5, price_col="price_inr")
+    df.attrs['fallback'] = True
+    return df
+
 
+SCRAPER_SOURCES = [
+    ScraperSource(scrape_direct_websites, "Direct Websites", "direct-stores"),
+    ScraperSource(scrape_price_comparison_sites, "Price Comparison", "price-comparison"),
+    ScraperSource(scrape_social_commerce, "Social Commerce", "social-commerce"),
+    ScraperSource(scrape_international_sites, "International", "international"),
+]
 
 
 logging.basicConfig(
@@ -0,0 +1,402 @@
+"""Scrape the search result pages of the sites declared in data.scrapers.sites.
+
+Pages are fetched through one pooled keep-alive client per domain
+(clients.http_client) behind the shared per-domain rate limiter. Sites
+marked `render` go through a single headless Chrome instead, and only
+those; the browser is off unless SCRAPER_BROWSER=1. Parsing runs in a
+pool of worker processes, so lxml does not hold the GIL against the
+Streamlit server. Sites are scraped concurrently.
+
+    scraper = get_html_scraper()
+    df = scraper.scrape("laptop", category="direct")
+    print(scraper.report())       # pages/s and parse ms/page per site
+
+Set SCRAPER_FIXTURES_DIR to read saved pages instead of the network. The
+benchmark and recorder work from benchmarks/fixtures/html:
+
+    python -m data.scrapers.html_engine bench
+    python -m data.scrapers.html_engine record ebay "usb c cable"
+    python -m data.scrapers.html_engine scrape laptop --offline
+"""
+import argparse
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote_plus
+
+import pandas as pd
+
+from clients.http_client import get_client
+from data.schema import apply_product_schema
+from telemetry.tracing import observe, propagate, span
+from .html_parse import Row, parse_listing_page
+from .sites import SITES, SiteSpec, sites_for
+from .source_runner import DEFAULT_RATE_LIMITER
+
+FIXTURES_DIR = Path(__file__).resolve().parents[2] / "benchmarks" / "fixtures" / "html"
+LISTING_COLUMNS = ["product_name", "price_value", "price_inr", "currency_symbol", "source", "rating", "reviews", "url"]
+
+USER_AGENT = os.getenv("SCRAPER_USER_AGENT", "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 "
+                                             "(KHTML, like Gecko) Chrome/124.0 Safari/537.36")
+HEADERS = {"User-Agent": USER_AGENT, "Accept": "text/html,application/xhtml+xml", "Accept-Language": "en-IN,en;q=0.9"}
+
+PARSE_WORKERS = int(os.getenv("SCRAPER_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))
+# A whole render, browser wait included; kept under run_sources' 8s per-source timeout
+RENDER_TIMEOUT = float(os.getenv("SCRAPER_RENDER_TIMEOUT", "6"))
+
+
+@dataclass
+class SiteStats:
+    pages: int = 0
+    listings: int = 0
+    bytes: int = 0
+    errors: int = 0
+    fetch_s: float = 0.0
+    parse_s: float = 0.0
+    # From the first request to the last parsed page, summed over scrapes
+    wall_s: float = 0.0
+
+    def add(self, other: "SiteStats") -> None:
+        for name, value in asdict(other).items():
+            setattr(self, name, getattr(self, name) + value)
+
+    @property
+    def pages_per_second(self) -> Optional[float]:
+        return self.pages / self.wall_s if self.wall_s else None
+
+    @property
+    def parse_ms_per_page(self) -> Optional[float]:
+        return self.parse_s / self.pages * 1000 if self.pages else None
+
+
+class BrowserRenderer:
+    """One headless Chrome, shared by the sites whose results are built by JavaScript
+
+    Selenium drivers are not thread-safe, so pages are rendered one at a
+    time. The browser starts on first use, stays up for later pages and is
+    quit at interpreter exit. If it cannot start, later renders fail fast
+    instead of retrying driver resolution. `timeout` bounds a whole render,
+    including the wait for the browser, and should stay under the scrape's
+    per-source timeout.
+    """
+
+    def __init__(self, timeout: float = RENDER_TIMEOUT):
+        self.timeout = timeout
+        self._driver = None
+        self._start_error: Optional[Exception] = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        from selenium import webdriver
+
+        options = webdriver.ChromeOptions()
+        for arg in ("--headless=new", "--disable-gpu", "--no-sandbox", "--disable-dev-shm-usage",
+                    f"--user-agent={USER_AGENT}"):
+            options.add_argument(arg)
+        # Images are most of a listing page's weight and are never parsed
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        driver = webdriver.Chrome(options=options)
+        atexit.register(self.close)
+        return driver
+
+    def render(self, url: str, wait_xpath: str) -> bytes:
+        """Page source once an element matching `wait_xpath` exists, or after the timeout"""
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        deadline = time.monotonic() + self.timeout
+        if not self._lock.acquire(timeout=self.timeout):
+            raise TimeoutError(f"Headless browser busy for {self.timeout:.0f}s; not rendering {url}")
+        try:
+            if self._start_error is not None:
+                raise RuntimeError(f"Headless browser unavailable: {self._start_error}")
+            if self._driver is None:
+                try:
+                    self._driver = self._start()
+                except Exception as e:
+                    self._start_error = e
+                    raise
+            try:
+                self._driver.set_page_load_timeout(max(0.5, deadline - time.monotonic()))
+                self._driver.get(url)
+                WebDriverWait(self._driver, max(0.1, deadline - time.monotonic())).until(
+                    expected_conditions.presence_of_element_located((By.XPATH, wait_xpath)))
+            except TimeoutException:
+                logging.warning(f"No listings rendered within {self.timeout:.0f}s at {url}")
+            return self._driver.page_source.encode("utf-8")
+        finally:
+            self._lock.release()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._driver is not None:
+                self._driver.quit()
+                self._driver = None
+
+
+_parse_pool: Optional[ProcessPoolExecutor] = None
+_parse_pool_lock = threading.Lock()
+
+
+def new_parse_pool(workers: int) -> ProcessPoolExecutor:
+    # spawn rather than fork: forking the multi-threaded Streamlit server can deadlock the child
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+
+def get_parse_pool() -> Optional[ProcessPoolExecutor]:
+    """Process-wide parse pool, started on first use; None when SCRAPER_PARSE_WORKERS=0"""
+    global _parse_pool
+    if PARSE_WORKERS <= 0:
+        return None
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            _parse_pool = new_parse_pool(PARSE_WORKERS)
+        return _parse_pool
+
+
+def _discard_parse_pool(pool: ProcessPoolExecutor) -> None:
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is pool:
+            _parse_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def fixture_path(directory: Path, site_key: str, page: int = 1) -> Path:
+    return Path(directory) / (f"{site_key}.html" if page == 1 else f"{site_key}_p{page}.html")
+
+
+class HtmlScraper:
+    """Fetch, parse and tabulate listing pages; keeps per-site throughput stats"""
+
+    def __init__(self, max_pages: int = 1, fixtures_dir: Optional[str] = None,
+                 renderer: Optional[BrowserRenderer] = None, pool: Optional[ProcessPoolExecutor] = None,
+                 parse_inline: bool = False):
+        self.max_pages = max(1, max_pages)
+        self.fixtures_dir = Path(fixtures_dir) if fixtures_dir else None
+        self.renderer = renderer
+        self._pool = pool
+        self.parse_inline = parse_inline
+        self._stats: Dict[str, SiteStats] = {}
+        self._lock = threading.Lock()
+
+    def fetch(self, spec: SiteSpec, query: str, page: int = 1) -> Tuple[bytes, str]:
+        """Raw HTML of one search result page and its URL; empty when there is no such page"""
+        url = spec.search_url.format(query=quote_plus(query), page=page)
+        if self.fixtures_dir is not None:
+            path = fixture_path(self.fixtures_dir, spec.key, page)
+            return (path.read_bytes() if path.exists() else b""), url
+        DEFAULT_RATE_LIMITER.acquire(spec.domain)
+        if spec.render:
+            if self.renderer is None:
+                raise RuntimeError(f"{spec.name} needs a headless browser, which is disabled (set SCRAPER_BROWSER=1)")
+            return self.renderer.render(url, spec.item), url
+        response = get_client(f"site:{spec.domain}").get(url, headers=HEADERS)
+        if response.status_code == 404:
+            return b"", url
+        response.raise_for_status()
+        return response.content, url
+
+    def parse(self, spec: SiteSpec, page: bytes, url: str) -> Tuple[List[Row], float]:
+        pool = None if self.parse_inline else (self._pool or get_parse_pool())
+        if pool is None:
+            return parse_listing_page(spec.key, page, url)
+        try:
+            return pool.submit(parse_listing_page, spec.key, page, url).result()
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool next time
+            logging.warning("Parse worker pool broke; parsing this page in-process")
+            if pool is not self._pool:
+                _discard_parse_pool(pool)
+            return parse_listing_page(spec.key, page, url)
+
+    def _scrape_site(self, query: str, spec: SiteSpec) -> List[Row]:
+        stats = SiteStats()
+        rows: List[Row] = []
+        started = time.perf_counter()
+        try:
+            for page in range(1, self.max_pages + 1):
+                fetch_started = time.perf_counter()
+                with span("html.fetch", site=spec.key, page=page) as s:
+                    body, url = self.fetch(spec, query, page)
+                    s.set(bytes=len(body))
+                stats.fetch_s += time.perf_counter() - fetch_started
+                if not body:
+                    break
+                page_rows, seconds = self.parse(spec, body, url)
+                observe("html.parse", seconds, site=spec.key, listings=len(page_rows))
+                stats.pages += 1
+                stats.bytes += len(body)
+                stats.parse_s += seconds
+                if not page_rows:
+                    break
+                rows += page_rows
+        except Exception as e:
+            stats.errors += 1
+            logging.warning(f"Scraping {spec.name} failed: {e}")
+        stats.wall_s = time.perf_counter() - started
+        stats.listings = len(rows)
+        with self._lock:
+            self._stats.setdefault(spec.key, SiteStats()).add(stats)
+        if stats.pages:
+            logging.info(f"{spec.name}: {stats.pages} pages, {stats.listings} listings, "
+                         f"{stats.pages_per_second:.1f} pages/s, parse {stats.parse_ms_per_page:.1f} ms/page")
+        return rows
+
+    def scrape(self, query: str, category: Optional[str] = None, sites: Optional[List[str]] = None) -> pd.DataFrame:
+        """Listings for `query` from the given sites, or every site in `category` (default: all)"""
+        specs = [SITES[key] for key in sites] if sites else (sites_for(category) if category else list(SITES.values()))
+        if self.renderer is None and self.fixtures_dir is None:
+            skipped = [spec.name for spec in specs if spec.render]
+            if skipped:
+                logging.info(f"Skipping {', '.join(skipped)}: the headless browser is disabled")
+            specs = [spec for spec in specs if not spec.render]
+        if not specs:
+            return pd.DataFrame(columns=LISTING_COLUMNS)
+
+        with ThreadPoolExecutor(max_workers=len(specs), thread_name_prefix="html") as executor:
+            futures = [(spec, executor.submit(propagate(self._scrape_site), query, spec)) for spec in specs]
+            records = []
+            for spec, future in futures:
+                for title, price, currency, rating, reviews, link in future.result():
+                    price_inr = price if currency == "₹" else price * spec.inr_rate
+                    records.append((title, price, price_inr, currency, spec.name, rating, reviews, link))
+        return apply_product_schema(pd.DataFrame.from_records(records, columns=LISTING_COLUMNS))
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {key: {**asdict(s), "pages_per_s": s.pages_per_second, "parse_ms_per_page": s.parse_ms_per_page}
+                    for key, s in self._stats.items()}
+
+    def report(self) -> str:
+        """Per-site throughput as a text table"""
+        snapshot = self.snapshot()
+        if not snapshot:
+            return "No pages scraped yet."
+        table = pd.DataFrame(snapshot).T[["pages", "listings", "errors", "pages_per_s", "parse_ms_per_page"]]
+        return table.astype(float).round(2).to_string()
+
+
+_scraper: Optional[HtmlScraper] = None
+_scraper_lock = threading.Lock()
+
+
+def get_html_scraper() -> HtmlScraper:
+    """Process-wide scraper configured from the environment"""
+    global _scraper
+    with _scraper_lock:
+        if _scraper is None:
+            # Off by default: a server process should not start Chrome unless asked to
+            use_browser = os.getenv("SCRAPER_BROWSER", "0").lower() in ("1", "true", "yes", "on")
+            _scraper = HtmlScraper(
+                max_pages=int(os.getenv("SCRAPER_MAX_PAGES", "1")),
+                fixtures_dir=os.getenv("SCRAPER_FIXTURES_DIR") or None,
+                renderer=BrowserRenderer() if use_browser else None,
+            )
+        return _scraper
+
+
+def _bench(args) -> None:
+    keys = args.sites or [key for key in SITES if fixture_path(args.fixtures, key).exists()]
+    pages = [(key, fixture_path(args.fixtures, key).read_bytes()) for key in keys]
+    if not pages:
+        raise SystemExit(f"No fixtures in {args.fixtures}")
+    work = [pages[i % len(pages)] for i in range(args.pages)]
+
+    rows = []
+    for key, body in pages:
+        parse_listing_page(key, body)
+        timings = [parse_listing_page(key, body)[1] for _ in range(args.repeat)]
+        listings = len(parse_listing_page(key, body)[0])
+        rows.append({"site": key, "kb": len(body) // 1024, "listings": listings,
+                     "parse_ms_per_page": round(min(timings) * 1000, 2)})
+    print(pd.DataFrame(rows).to_string(index=False))
+
+    started = time.perf_counter()
+    for key, body in work:
+        parse_listing_page(key, body)
+    inline = time.perf_counter() - started
+    print(f"\nin-process: {len(work) / inline:,.0f} pages/s")
+
+    with new_parse_pool(args.workers) as pool:
+        # Start every worker and import lxml before timing
+        list(pool.map(parse_listing_page, [key for key, _ in work[:args.workers * 2]],
+                      [body for _, body in work[:args.workers * 2]]))
+        started = time.perf_counter()
+        list(pool.map(parse_listing_page, [key for key, _ in work], [body for _, body in work], chunksize=4))
+        pooled = time.perf_counter() - started
+    print(f"{args.workers} worker processes: {len(work) / pooled:,.0f} pages/s")
+
+
+def _record(args) -> None:
+    spec = SITES[args.site]
+    renderer = BrowserRenderer() if spec.render else None
+    try:
+        body, url = HtmlScraper(renderer=renderer).fetch(spec, args.query, args.page)
+    finally:
+        if renderer is not None:
+            renderer.close()
+    path = fixture_path(args.fixtures, spec.key, args.page)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(body)
+    rows, seconds = parse_listing_page(spec.key, body, url)
+    print(f"Saved {len(body):,} bytes from {url} to {path}: {len(rows)} listings parsed in {seconds * 1000:.1f} ms")
+
+
+def _scrape(args) -> None:
+    fixtures = args.fixtures if args.offline else None
+    renderer = BrowserRenderer() if args.browser and not fixtures else None
+    scraper = HtmlScraper(max_pages=args.pages, fixtures_dir=fixtures, renderer=renderer)
+    try:
+        df = scraper.scrape(args.query, category=args.category, sites=args.sites)
+    finally:
+        if renderer is not None:
+            renderer.close()
+    print(df.head(20).to_string())
+    print(f"\n{len(df)} listings\n\n{scraper.report()}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="HTML listing scraper: benchmark, record fixtures, scrape")
+    parser.add_argument("--fixtures", type=Path, default=FIXTURES_DIR)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    bench = commands.add_parser("bench", help="parse saved pages and report parse time and pages/s")
+    bench.add_argument("--sites", nargs="+", choices=list(SITES))
+    bench.add_argument("--pages", type=int, default=200, help="pages parsed per throughput run")
+    bench.add_argument("--repeat", type=int, default=20, help="timed parses per site")
+    bench.add_argument("--workers", type=int, default=max(1, PARSE_WORKERS))
+    bench.set_defaults(run=_bench)
+
+    record = commands.add_parser("record", help="save a live search result page as a fixture")
+    record.add_argument("site", choices=list(SITES))
+    record.add_argument("query")
+    record.add_argument("--page", type=int, default=1)
+    record.set_defaults(run=_record)
+
+    scrape = commands.add_parser("scrape", help="scrape listings and print them with throughput stats")
+    scrape.add_argument("query")
+    scrape.add_argument("--category", choices=sorted({spec.category for spec in SITES.values()}))
+    scrape.add_argument("--sites", nargs="+", choices=list(SITES))
+    scrape.add_argument("--pages", type=int, default=1)
+    scrape.add_argument("--offline", action="store_true", help="read pages from --fixtures instead of the network")
+    scrape.add_argument("--browser", action="store_true", help="render JavaScript-built sites in headless Chrome")
+    scrape.set_defaults(run=_scrape)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    args.run(args)
+
+
+if __name__ == "__main__":
+    main()
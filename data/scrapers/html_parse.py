@@ -0,0 +1,77 @@
+"""lxml parsing of search result pages, run inside the parse worker processes.
+
+Imports stay limited to lxml and the site declarations so that spawning a
+worker is cheap. Rows come back as plain tuples, which pickle quickly.
+"""
+import functools
+import re
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin
+
+from lxml import etree, html
+
+from .sites import SITES
+
+# (product_name, price_value, currency_symbol, rating, reviews, url)
+Row = Tuple[str, float, str, Optional[float], Optional[int], str]
+
+# Same rule as the SerpAPI parser: the first number, so ranges resolve to their lower bound
+_PRICE = re.compile(r"(\d[\d,]*(?:\.\d+)?)")
+_RATING = re.compile(r"([0-5](?:\.\d+)?)")
+_COUNT = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*([kKlLmM])?")
+_COUNT_MULTIPLIERS = {"k": 1e3, "l": 1e5, "m": 1e6}
+_CURRENCIES = ["₹", "$", "€", "£"]
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled(site_key: str) -> Dict[str, etree.XPath]:
+    spec = SITES[site_key]
+    fields = {"item": spec.item, "title": spec.title, "price": spec.price,
+              "rating": spec.rating, "reviews": spec.reviews, "link": spec.link}
+    # Plain strings rather than "smart" ones that keep their tree alive, so rows pickle cheaply
+    return {name: etree.XPath(expr, smart_strings=False) for name, expr in fields.items() if expr}
+
+
+def parse_price(text: str, default_currency: str) -> Tuple[Optional[float], str]:
+    currency = next((c for c in _CURRENCIES if c in text), default_currency)
+    match = _PRICE.search(text)
+    if not match:
+        return None, currency
+    return float(match.group(1).replace(",", "")), currency
+
+
+def parse_rating(text: str) -> Optional[float]:
+    match = _RATING.search(text)
+    return float(match.group(1)) if match else None
+
+
+def parse_count(text: str) -> Optional[int]:
+    """Review counts such as "(1,234)", "2.3K ratings" or "1.2L" """
+    match = _COUNT.search(text)
+    if not match:
+        return None
+    value = float(match.group(1).replace(",", ""))
+    return int(value * _COUNT_MULTIPLIERS.get((match.group(2) or "").lower(), 1))
+
+
+def parse_listing_page(site_key: str, page: bytes, url: str = "") -> Tuple[List[Row], float]:
+    """Listings on one search result page, and the seconds spent parsing it"""
+    started = time.perf_counter()
+    spec = SITES[site_key]
+    xpaths = _compiled(site_key)
+    if not page.strip():
+        return [], time.perf_counter() - started
+    doc = html.fromstring(page)
+    rows: List[Row] = []
+    for item in xpaths["item"](doc):
+        title = xpaths["title"](item)
+        price, currency = parse_price(xpaths["price"](item), spec.currency)
+        if not title or price is None or price <= 0:
+            # Ads, placeholders and "see more" tiles
+            continue
+        rating = parse_rating(xpaths["rating"](item)) if "rating" in xpaths else None
+        reviews = parse_count(xpaths["reviews"](item)) if "reviews" in xpaths else None
+        link = xpaths["link"](item) if "link" in xpaths else ""
+        rows.append((title, price, currency, rating, reviews, urljoin(url, link) if link and url else link))
+    return rows, time.perf_counter() - started
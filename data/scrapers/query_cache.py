@@ -0,0 +1,184 @@
+import hashlib
+import logging
+import os
+import pickle
+import re
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+
+def normalize_query(query: str) -> str:
+    """Canonical form of a search query: case-folded, punctuation and extra spaces removed"""
+    query = re.sub(r"[^\w\s]", " ", str(query).casefold())
+    return " ".join(query.split())
+
+
+class QueryCache:
+    """Two-tier (memory LRU + disk) cache of search results with a TTL.
+
+    Entries are keyed by the normalized query and `max_results`. Memory
+    entries are evicted least-recently-used once `max_entries` is reached;
+    disk entries live until their TTL expires. Expired entries are kept for
+    a further `stale_ttl` seconds so `get(..., allow_stale=True)` can serve
+    the last good result while a refresh runs in the background.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl: float = 3600.0,
+                 disk_dir: Optional[str] = ".cache/queries", disk_ttl: Optional[float] = None,
+                 stale_ttl: float = 0.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_ttl = disk_ttl if disk_ttl is not None else ttl
+        self.stale_ttl = stale_ttl
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._memory: "OrderedDict[str, Tuple[float, pd.DataFrame]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "stale_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expired": 0,
+        }
+
+    @staticmethod
+    def make_key(query: str, max_results: int) -> str:
+        return f"{normalize_query(query)}|{max_results}"
+
+    def _disk_path(self, key: str) -> Optional[Path]:
+        if self.disk_dir is None:
+            return None
+        return self.disk_dir / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.pkl"
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _remember(self, key: str, created: float, df: pd.DataFrame) -> None:
+        with self._lock:
+            self._memory[key] = (created, df)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    @staticmethod
+    def _served(df: pd.DataFrame, created: float, stale: bool = False) -> pd.DataFrame:
+        df = df.copy()
+        df.attrs['from_cache'] = True
+        df.attrs['cached_at'] = created
+        if stale:
+            df.attrs['stale'] = True
+        return df
+
+    def get(self, query: str, max_results: int, allow_stale: bool = False) -> Optional[pd.DataFrame]:
+        """Return a copy of the cached frame, or None on a miss
+
+        With `allow_stale`, an expired entry still inside the stale window is
+        returned with `attrs['stale']` set instead of counting as a miss.
+        """
+        key = self.make_key(query, max_results)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, df = entry
+                age = now - created
+                if age <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return self._served(df, created)
+                if age <= self.ttl + self.stale_ttl:
+                    if allow_stale:
+                        self._memory.move_to_end(key)
+                        self.stats["stale_hits"] += 1
+                        return self._served(df, created, stale=True)
+                else:
+                    del self._memory[key]
+                    self.stats["expired"] += 1
+
+        path = self._disk_path(key)
+        if path is not None and path.exists():
+            try:
+                with open(path, "rb") as f:
+                    created, df = pickle.load(f)
+                age = now - created
+                if age <= self.disk_ttl:
+                    self._count("disk_hits")
+                    self._remember(key, created, df)
+                    return self._served(df, created)
+                if age <= self.disk_ttl + self.stale_ttl:
+                    if allow_stale:
+                        self._count("stale_hits")
+                        self._remember(key, created, df)
+                        return self._served(df, created, stale=True)
+                else:
+                    self._count("expired")
+                    path.unlink(missing_ok=True)
+            except Exception as e:
+                logging.warning(f"Discarding unreadable cache entry {path}: {e}")
+                path.unlink(missing_ok=True)
+
+        self._count("misses")
+        return None
+
+    def set(self, query: str, max_results: int, df: pd.DataFrame) -> None:
+        key = self.make_key(query, max_results)
+        created = time.time()
+        df = df.copy()
+        self._remember(key, created, df)
+
+        path = self._disk_path(key)
+        if path is None:
+            return
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as f:
+                pickle.dump((created, df), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"Could not write cache entry {path}: {e}")
+
+    def age(self, query: str, max_results: int) -> Optional[float]:
+        """Seconds since the entry was stored, or None if there is none (stale entries included)"""
+        key = self.make_key(query, max_results)
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is not None:
+            return time.time() - entry[0]
+        path = self._disk_path(key)
+        try:
+            # Entries are written with os.replace, so mtime is the creation time
+            return time.time() - path.stat().st_mtime if path is not None else None
+        except OSError:
+            return None
+
+    def invalidate(self, query: str, max_results: int) -> None:
+        key = self.make_key(query, max_results)
+        with self._lock:
+            self._memory.pop(key, None)
+        path = self._disk_path(key)
+        if path is not None:
+            path.unlink(missing_ok=True)
+
+    def hit_rate(self) -> float:
+        hits = self.stats["memory_hits"] + self.stats["disk_hits"] + self.stats["stale_hits"]
+        total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+
+QUERY_CACHE = QueryCache(
+    max_entries=int(os.getenv("QUERY_CACHE_SIZE", "128")),
+    ttl=float(os.getenv("QUERY_CACHE_TTL", "3600")),
+    disk_dir=os.getenv("QUERY_CACHE_DIR", ".cache/queries"),
+    disk_ttl=float(os.getenv("QUERY_CACHE_DISK_TTL", os.getenv("QUERY_CACHE_TTL", "3600"))),
+    stale_ttl=float(os.getenv("QUERY_CACHE_STALE_TTL", "86400")),
+)
@@ -0,0 +1,322 @@
+"""Keep popular queries warm in the query cache.
+
+Every search is recorded in QUERY_POPULARITY, a decayed request count per
+(query, max_results). The refresh scheduler wakes up periodically and
+re-fetches the hottest queries whose cached result is close to expiry,
+spending at most the configured SerpAPI budget. Requests that find only a
+stale entry are answered from it and queue a revalidation here.
+
+All upstream fetches, background or user-triggered, go through
+SEARCH_FLIGHTS, so concurrent searches for the same query share one fetch.
+
+    QUERY_REFRESH=0             disable background refreshes
+    QUERY_REFRESH_BUDGET=120    SerpAPI page calls per hour for refreshes
+"""
+import heapq
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .query_cache import QUERY_CACHE, QueryCache, normalize_query
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "followers")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+    def wait(self, timeout: Optional[float] = None) -> Any:
+        """Block until the leader finishes; re-raises the leader's error"""
+        if not self.done.wait(timeout):
+            raise TimeoutError("coalesced request did not finish in time")
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one execution
+
+    The first caller for a key becomes the leader and must call `finish`;
+    callers arriving while it runs get the same flight and wait on it.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.stats = {"leaders": 0, "followers": 0}
+
+    def join(self, key: str) -> Tuple[_Flight, bool]:
+        """(flight, is_leader) for `key`"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.followers += 1
+                self.stats["followers"] += 1
+                return flight, False
+            flight = self._flights[key] = _Flight()
+            self.stats["leaders"] += 1
+            return flight, True
+
+    def finish(self, key: str, flight: _Flight, result: Any = None, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+        flight.result = result
+        flight.error = error
+        flight.done.set()
+
+    def in_flight(self, key: str) -> bool:
+        with self._lock:
+            return key in self._flights
+
+    def do(self, key: str, func: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        flight, leader = self.join(key)
+        if not leader:
+            return flight.wait(timeout)
+        try:
+            result = func()
+        except BaseException as e:
+            self.finish(key, flight, error=e)
+            raise
+        self.finish(key, flight, result=result)
+        return result
+
+
+@dataclass
+class _Popularity:
+    query: str
+    max_results: int
+    score: float
+    last_seen: float
+    requests: int
+
+
+class QueryPopularity:
+    """Exponentially decayed request counts per (normalized query, max_results)"""
+
+    def __init__(self, half_life: float = 6 * 3600.0, max_tracked: int = 1000):
+        self.half_life = half_life
+        self.max_tracked = max_tracked
+        self._entries: Dict[str, _Popularity] = {}
+        self._lock = threading.Lock()
+
+    def _decayed(self, entry: _Popularity, now: float) -> float:
+        return entry.score * math.exp2(-(now - entry.last_seen) / self.half_life)
+
+    def record(self, query: str, max_results: int, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        key = QueryCache.make_key(query, max_results)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = self._entries[key] = _Popularity(query, max_results, 0.0, now, 0)
+            entry.score = self._decayed(entry, now) + 1.0
+            entry.last_seen = now
+            entry.requests += 1
+            if len(self._entries) > self.max_tracked:
+                coldest = min(self._entries, key=lambda k: self._decayed(self._entries[k], now))
+                del self._entries[coldest]
+
+    def hottest(self, n: int, min_score: float = 0.0, now: Optional[float] = None) -> List[Tuple[float, str, int]]:
+        """Up to n (score, query, max_results), hottest first"""
+        now = time.time() if now is None else now
+        with self._lock:
+            scored = [(self._decayed(e, now), e.query, e.max_results) for e in self._entries.values()]
+        return heapq.nlargest(n, (s for s in scored if s[0] >= min_score), key=lambda s: s[0])
+
+    def snapshot(self, n: int = 20) -> List[Dict]:
+        now = time.time()
+        with self._lock:
+            entries = list(self._entries.values())
+        entries.sort(key=lambda e: self._decayed(e, now), reverse=True)
+        return [{"query": e.query, "max_results": e.max_results, "score": round(self._decayed(e, now), 2),
+                 "requests": e.requests, "last_seen": e.last_seen} for e in entries[:n]]
+
+
+class ApiBudget:
+    """Token bucket of upstream calls, refilled continuously at `per_hour`"""
+
+    def __init__(self, per_hour: float, burst: Optional[float] = None):
+        self.per_hour = per_hour
+        self.capacity = burst if burst is not None else max(1.0, per_hour / 4)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.spent = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.per_hour / 3600)
+        self._updated = now
+
+    def try_spend(self, calls: float) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens < calls:
+                return False
+            self._tokens -= calls
+            self.spent += int(calls)
+            return True
+
+    @property
+    def available(self) -> float:
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+
+def _page_calls(max_results: int) -> int:
+    from .serpapi_google_shopping import SERPAPI_PAGE_SIZE
+    return max(1, math.ceil(max_results / SERPAPI_PAGE_SIZE))
+
+
+class RefreshScheduler:
+    """Background re-fetching of popular queries before their cache entry expires
+
+    Each tick considers the `top_n` hottest queries with a decayed score of
+    at least `min_score` whose entry is older than `refresh_after` of the
+    cache TTL (or missing), and refreshes them hottest first while the
+    budget allows. `revalidate` queues one query ahead of the next tick.
+    """
+
+    def __init__(self, fetch: Callable[[str, int], Any], popularity: QueryPopularity, budget: ApiBudget,
+                 cache: QueryCache = QUERY_CACHE, interval: float = 60.0, refresh_after: float = 0.8,
+                 top_n: int = 20, min_score: float = 2.0, max_workers: int = 2):
+        self.fetch = fetch
+        self.popularity = popularity
+        self.budget = budget
+        self.cache = cache
+        self.interval = interval
+        self.refresh_after = refresh_after
+        self.top_n = top_n
+        self.min_score = min_score
+        self.stats = {"refreshed": 0, "revalidated": 0, "failed": 0, "over_budget": 0}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="query-refresh")
+        self._pending: Dict[str, Tuple[str, int]] = {}
+        self._running: set = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "RefreshScheduler":
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="query-refresh-scheduler", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._wake.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def revalidate(self, query: str, max_results: int) -> None:
+        """Refresh a query whose stale entry was just served"""
+        with self._lock:
+            self._pending[QueryCache.make_key(query, max_results)] = (query, max_results)
+        self._wake.set()
+
+    def due(self, now: Optional[float] = None) -> List[Tuple[str, int]]:
+        """Popular queries whose cache entry should be refreshed, hottest first"""
+        due = []
+        for _, query, max_results in self.popularity.hottest(self.top_n, self.min_score, now):
+            age = self.cache.age(query, max_results)
+            if age is None or age >= self.refresh_after * self.cache.ttl:
+                due.append((query, max_results))
+        return due
+
+    def tick(self) -> int:
+        """Submit due refreshes within budget; returns how many were started"""
+        with self._lock:
+            pending = list(self._pending.values())
+            self._pending.clear()
+        queue = [(q, m, True) for q, m in pending] + [(q, m, False) for q, m in self.due()]
+
+        started, seen = 0, set()
+        for query, max_results, requested in queue:
+            key = QueryCache.make_key(query, max_results)
+            with self._lock:
+                if key in seen or key in self._running:
+                    continue
+            seen.add(key)
+            if not self.budget.try_spend(_page_calls(max_results)):
+                self.stats["over_budget"] += 1
+                if requested:
+                    # Keep it for the next tick rather than dropping the request
+                    with self._lock:
+                        self._pending.setdefault(key, (query, max_results))
+                continue
+            with self._lock:
+                self._running.add(key)
+            self._executor.submit(self._refresh, key, query, max_results, requested)
+            started += 1
+        return started
+
+    def _refresh(self, key: str, query: str, max_results: int, requested: bool) -> None:
+        try:
+            self.fetch(query, max_results)
+            self.stats["revalidated" if requested else "refreshed"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            logging.warning(f"Background refresh of {normalize_query(query)!r} failed: {e}")
+        finally:
+            with self._lock:
+                self._running.discard(key)
+
+    def _loop(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                self.tick()
+            except Exception as e:
+                logging.warning(f"Refresh scheduler tick failed: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+
+SEARCH_FLIGHTS = SingleFlight()
+QUERY_POPULARITY = QueryPopularity(half_life=float(os.getenv("QUERY_POPULARITY_HALF_LIFE", str(6 * 3600))))
+
+REFRESH_ENABLED = os.getenv("QUERY_REFRESH", "1").lower() not in ("0", "false", "no", "off")
+
+_scheduler: Optional[RefreshScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def _refresh_query(query: str, max_results: int) -> None:
+    from data.storage.price_history import get_price_store
+    from .scraper_utils import scrape_multiple_sources
+
+    df = scrape_multiple_sources(query, max_results, refresh=True, track_popularity=False)
+    # Users served from the refreshed cache entry never record it, so record it here
+    if not df.empty and not df.attrs.get('fallback') and not df.attrs.get('coalesced'):
+        get_price_store().append(df, query)
+
+
+def get_refresh_scheduler() -> Optional[RefreshScheduler]:
+    """Process-wide scheduler, started on first use; None when disabled or without an API key"""
+    global _scheduler
+    if not REFRESH_ENABLED:
+        return None
+    with _scheduler_lock:
+        if _scheduler is None:
+            from .serpapi_google_shopping import get_api_key
+            # Without a key every fetch is placeholder data, which is never cached
+            if not get_api_key():
+                return None
+            _scheduler = RefreshScheduler(
+                _refresh_query, QUERY_POPULARITY,
+                ApiBudget(float(os.getenv("QUERY_REFRESH_BUDGET", "120"))),
+                interval=float(os.getenv("QUERY_REFRESH_INTERVAL", "60")),
+            ).start()
+        return _scheduler
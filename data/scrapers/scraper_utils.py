@@ -1,11 +1,80 @@
+from typing import Iterator
+
 import pandas as pd
-from .serpapi_google_shopping import search_google_shopping
-
-def scrape_multiple_sources(query: str) -> pd.DataFrame:
-    """Scrape from multiple sources simultaneously"""
-    df = search_google_shopping(query)
-    
-    if not df.empty:
-        return df.sort_values('price_value')
-    
-    return pd.DataFrame()
+from .serpapi_google_shopping import iter_google_shopping_pages
+from .query_cache import QUERY_CACHE
+from .refresh import QUERY_POPULARITY, SEARCH_FLIGHTS, get_refresh_scheduler
+from data.schema import apply_product_schema
+from telemetry.tracing import span
+
+def iter_multiple_sources(query: str, max_results: int = 20, refresh: bool = False,
+                          max_in_flight: int = 3, track_popularity: bool = True) -> Iterator[pd.DataFrame]:
+    """Yield the growing, price-sorted result set as each page of results arrives
+
+    A cache hit yields the cached frame once; a stale hit does the same and
+    queues a background refresh. A search for a query that is already
+    being fetched waits for that fetch and yields its final result once.
+    The complete result set is cached only if the generator runs to the end.
+    """
+    if track_popularity:
+        QUERY_POPULARITY.record(query, max_results)
+    if not refresh:
+        with span("cache.lookup") as lookup:
+            cached = QUERY_CACHE.get(query, max_results, allow_stale=True)
+            lookup.set(hit=cached is not None, stale=cached is not None and cached.attrs.get('stale', False))
+        if cached is not None:
+            if cached.attrs.get('stale'):
+                scheduler = get_refresh_scheduler()
+                if scheduler is not None:
+                    scheduler.revalidate(query, max_results)
+            yield cached
+            return
+
+    key = QUERY_CACHE.make_key(query, max_results)
+    flight, leader = SEARCH_FLIGHTS.join(key)
+    if not leader:
+        with span("search.coalesced"):
+            try:
+                df = flight.wait()
+            except Exception:
+                df = None
+        # Abandoned or failed upstream fetches fall through to a fetch of our own
+        if df is not None:
+            df = df.copy()
+            # The leading request already recorded these rows in the price history
+            df.attrs.update(from_cache=True, coalesced=True)
+            yield df
+            return
+
+    parts = []
+    df = pd.DataFrame()
+    try:
+        for chunk in iter_google_shopping_pages(query, max_results, max_in_flight=max_in_flight):
+            parts.append(chunk)
+            with span("search.merge", pages=len(parts)):
+                # Pages have different category sets, so concat falls back to object columns
+                df = apply_product_schema(pd.concat(parts, ignore_index=True).sort_values('price_value'))
+            df.attrs = dict(chunk.attrs)
+            yield df
+    except BaseException as e:
+        if leader:
+            SEARCH_FLIGHTS.finish(key, flight, error=e)
+        raise
+
+    # Never cache placeholder data generated when the API is unavailable
+    if not df.empty and not df.attrs.get('fallback'):
+        QUERY_CACHE.set(query, max_results, df)
+    if leader:
+        SEARCH_FLIGHTS.finish(key, flight, result=df)
+
+def scrape_multiple_sources(query: str, max_results: int = 20, refresh: bool = False,
+                            track_popularity: bool = True) -> pd.DataFrame:
+    """Scrape from multiple sources simultaneously
+
+    Results are served from the query cache when possible; pass
+    `refresh=True` to bypass it and fetch fresh data.
+    """
+    df = pd.DataFrame()
+    for df in iter_multiple_sources(query, max_results, refresh=refresh, track_popularity=track_popularity):
+        pass
+    return df
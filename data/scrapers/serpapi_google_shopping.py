@@ -1,13 +1,23 @@
 import os
 import pandas as pd
-from serpapi.google_search import GoogleSearch
 from dotenv import load_dotenv
 import re
 import random
+import numpy as np
 import streamlit as st
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator
+from clients.http_client import get_client
+from data.schema import apply_product_schema
+from data.synthetic import generate_catalog
+from telemetry.tracing import propagate, span, traced
 
 load_dotenv()
 
+SERPAPI_PAGE_SIZE = 20
+SERPAPI_IN_FLIGHT = threading.BoundedSemaphore(int(os.getenv("SERPAPI_MAX_IN_FLIGHT", "4")))
+
 def get_api_key():
     """Get API key from environment or Streamlit secrets"""
   
@@ -19,11 +29,17 @@ def get_api_key():
     if not api_key:
         try:
             api_key = st.secrets["SERPAPI_API_KEY"]
-        except (KeyError, AttributeError):
+        except (KeyError, AttributeError, FileNotFoundError):
             pass
     
     return api_key
 
+# First number in the string, keeping thousands separators and decimals, so
+# ranges like "₹1,299.00 – ₹1,499" resolve to their lower bound.
+PRICE_PATTERN = r'(\d[\d,]*(?:\.\d+)?)'
+PRICE_REPLACE_PATTERN = r'(?s)^\D*?(\d[\d,]*(?:\.\d+)?).*$|^\D*$'
+CURRENCY_SYMBOLS = ["₹", "$", "€", "£"]
+
 def extract_price_and_currency(price_str: str) -> tuple[float, str]:
     """Extracts price and currency symbol from a price string."""
     if price_str is None:
@@ -42,43 +58,217 @@ def extract_price_and_currency(price_str: str) -> tuple[float, str]:
         currency_symbol = "£"
     
     try:
-        cleaned = re.sub(r'[^\d.]', '', price_str)
-        if not cleaned:
+        match = re.search(PRICE_PATTERN, price_str)
+        if not match:
             return 0.0, currency_symbol
-        return float(cleaned), currency_symbol
+        return float(match.group(1).replace(',', '')), currency_symbol
     except ValueError:
         return 0.0, currency_symbol
     except Exception as e:
         print(f"Unexpected error in extract_price_and_currency: {e}")
         return 0.0, currency_symbol
 
+def extract_prices_and_currencies(price_strings: pd.Series) -> pd.DataFrame:
+    """Vectorized extract_price_and_currency over a whole column"""
+    price_strings = price_strings.fillna("0").astype(str)
+    # Keep only the first number; strings without digits collapse to ""
+    amounts = (price_strings.str.replace(PRICE_REPLACE_PATTERN, r'\1', regex=True)
+               .str.replace(',', '', regex=False))
+    amounts = amounts.where(amounts != "", "0")
+    try:
+        prices = amounts.astype(float)
+    except ValueError:
+        prices = pd.to_numeric(amounts, errors='coerce').fillna(0.0).astype(float)
+
+    # Same precedence as extract_price_and_currency: ₹, then $, €, £
+    currencies = np.select(
+        [price_strings.str.contains(symbol, regex=False).to_numpy(dtype=bool) for symbol in CURRENCY_SYMBOLS],
+        CURRENCY_SYMBOLS,
+        "₹",
+    )
+    return pd.DataFrame({"price_value": prices, "currency_symbol": currencies}, index=price_strings.index)
+
 def generate_fallback_data(query: str, max_results: int = 20) -> pd.DataFrame:
-    """Generate sample data when API fails"""
-    products = [
-        f"{query} Pro Model",
-        f"{query} Standard Edition",
-        f"{query} Premium Series",
-        f"{query} Basic Version",
-        f"{query} Advanced Model",
-        f"{query} Lite Edition",
-        f"{query} Professional",
-        f"{query} Ultimate",
-        f"{query} Entry Level",
-        f"{query} Flagship"
-    ]
-    
-    data = []
-    for i in range(min(max_results, len(products))):
-        data.append({
-            "product_name": products[i],
-            "price_value": random.randint(5000, 80000),
-            "currency_symbol": "₹", 
-            "source": random.choice(["Amazon", "Flipkart", "Myntra", "Snapdeal"]),
-            "rating": round(random.uniform(3.5, 5.0), 1),
-            "reviews": random.randint(50, 2000)
+    """Generate sample data when API fails
+
+    Seeded from the query, so the same search shows the same sample listings.
+    """
+    df = generate_catalog(query, max_results)
+    df.attrs['fallback'] = True
+    return df
+
+def parse_shopping_results_rowwise(shopping_results: list) -> pd.DataFrame:
+    """Parse shopping_results one item at a time; faster than the columnar pass on small pages"""
+    processed_results = []
+    for item in shopping_results:
+        original_price = item.get("price")
+
+        price_value, currency_sym = extract_price_and_currency(original_price or "0")
+
+        if not (10 <= price_value <= 1000000): 
+            print(f"Warning: Price {price_value} for {item.get('title')} seems implausible. Skipping or adjusting.")
+            price_value = 0.0 
+
+        rating_val = item.get("rating")
+        if rating_val is None:
+            rating = random.uniform(3.5, 5.0)
+        else:
+            try:
+                rating = float(rating_val)
+                if not (0 <= rating <= 5):
+                    print(f"Warning: Rating {rating} for {item.get('title')} is out of range. Adjusting to average.")
+                    rating = random.uniform(3.5, 5.0)
+            except (ValueError, TypeError):
+                rating = random.uniform(3.5, 5.0)
+
+        reviews_val = item.get("reviews")
+        if reviews_val is None:
+            reviews = random.randint(50, 1000)
+        else:
+            try:
+                reviews = int(reviews_val)
+            except (ValueError, TypeError):
+                reviews = random.randint(50, 1000)
+
+        processed_results.append({
+            "product_name": item.get("title", "Unknown"),
+            "price_value": price_value, 
+            "currency_symbol": currency_sym, 
+            "source": item.get("source", "Google Shopping"),
+            "rating": rating,
+            "reviews": reviews
         })
-    
-    return pd.DataFrame(data)
+
+    df = pd.DataFrame(processed_results)
+    return df[df['price_value'] > 0] 
+
+SHOPPING_RESULT_FIELDS = ["title", "price", "source", "rating", "reviews"]
+
+# The columnar pass has a fixed pandas overhead of several milliseconds, so it
+# only beats the row loop on large batches; a SerpAPI page is about 20 items
+COLUMNAR_MIN_ITEMS = int(os.getenv("SERPAPI_COLUMNAR_MIN_ITEMS", "5000"))
+
+@traced("serpapi.parse")
+def parse_shopping_results(shopping_results: list) -> pd.DataFrame:
+    """Parse SerpAPI shopping_results into a DataFrame, row by row or columnar by size"""
+    if 0 < len(shopping_results) < COLUMNAR_MIN_ITEMS:
+        return apply_product_schema(parse_shopping_results_rowwise(shopping_results))
+    return parse_shopping_results_columnar(shopping_results)
+
+def parse_shopping_results_columnar(shopping_results: list) -> pd.DataFrame:
+    """Parse SerpAPI shopping_results into a DataFrame in one columnar pass"""
+    raw = {field: pd.Series([item.get(field) for item in shopping_results], dtype=object)
+           for field in SHOPPING_RESULT_FIELDS}
+    n = len(shopping_results)
+
+    df = extract_prices_and_currencies(raw["price"])
+    implausible = (df["price_value"] < 10) | (df["price_value"] > 1000000)
+    if implausible.any():
+        print(f"Warning: {int(implausible.sum())} of {n} prices seem implausible. Skipping them.")
+        df.loc[implausible, "price_value"] = 0.0
+
+    # float64 even when every value is an integer, so the masked fills below fit the dtype
+    rating = pd.to_numeric(raw["rating"], errors='coerce').astype('float64')
+    bad_rating = rating.isna() | (rating < 0) | (rating > 5)
+    rating[bad_rating] = np.random.uniform(3.5, 5.0, size=n)[bad_rating.to_numpy()]
+
+    reviews = pd.to_numeric(raw["reviews"], errors='coerce').astype('float64')
+    bad_reviews = reviews.isna()
+    reviews[bad_reviews] = np.random.randint(50, 1000, size=n)[bad_reviews.to_numpy()]
+
+    df.insert(0, "product_name", raw["title"].fillna("Unknown"))
+    df["source"] = raw["source"].fillna("Google Shopping")
+    df["rating"] = rating.astype(float)
+    df["reviews"] = reviews.astype(int)
+    return apply_product_schema(df[df['price_value'] > 0])
+
+def fetch_shopping_results(query: str, api_key: str, num: int, start: int = 0) -> list:
+    """Fetch one page of raw shopping_results from SerpAPI"""
+    params = {
+        "engine": "google_shopping",
+        "q": query,
+        "api_key": api_key,
+        "num": num
+    }
+    if start:
+        params["start"] = start
+
+    # Process-wide cap on concurrent SerpAPI calls, shared by every session
+    with span("serpapi.queue"):
+        SERPAPI_IN_FLIGHT.acquire()
+    try:
+        with span("serpapi.fetch", start=start):
+            response = get_client("serpapi").get("/search.json", params=params)
+    finally:
+        SERPAPI_IN_FLIGHT.release()
+    response.raise_for_status()
+    return response.json().get("shopping_results", [])
+
+def _listing_key(item: dict) -> tuple:
+    if item.get("product_id"):
+        return ("id", item["product_id"])
+    return ("listing", item.get("title"), item.get("source"), item.get("price"))
+
+def iter_google_shopping_pages(query: str, max_results: int = 100, page_size: int = SERPAPI_PAGE_SIZE,
+                               max_in_flight: int = 3) -> Iterator[pd.DataFrame]:
+    """Fetch result pages concurrently and yield each one as a DataFrame as it arrives.
+
+    Listings already seen on an earlier page are dropped. At most
+    `max_in_flight` pages are requested at once by this call, and the
+    process-wide SERPAPI_MAX_IN_FLIGHT limit applies on top of that.
+    """
+    api_key = get_api_key()
+    if not api_key:
+        print("SERPAPI_API_KEY not found - using fallback data")
+        yield generate_fallback_data(query, max_results)
+        return
+
+    offsets = list(range(0, max_results, page_size))
+    seen = set()
+    yielded = False
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_in_flight, len(offsets))), thread_name_prefix="serpapi")
+    try:
+        futures = {executor.submit(propagate(fetch_shopping_results), query, api_key, min(page_size, max_results - start), start): start
+                   for start in offsets}
+        for future in as_completed(futures):
+            start = futures[future]
+            if future.cancelled():
+                continue
+            try:
+                items = future.result()
+            except Exception as e:
+                print(f"Error fetching Google Shopping page at offset {start}: {str(e)}")
+                continue
+
+            if len(items) < min(page_size, max_results - start):
+                # A short page means later offsets will come back empty
+                for other, other_start in futures.items():
+                    if other_start > start:
+                        other.cancel()
+
+            fresh = []
+            for item in items:
+                key = _listing_key(item)
+                if key not in seen:
+                    seen.add(key)
+                    fresh.append(item)
+            if not fresh:
+                continue
+            try:
+                df = parse_shopping_results(fresh)
+            except Exception as e:
+                # One malformed page should not cost the others
+                print(f"Error parsing Google Shopping page at offset {start}: {str(e)}")
+                continue
+            if not df.empty:
+                yielded = True
+                yield df
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if not yielded:
+        print("No shopping results found - using fallback data")
+        yield generate_fallback_data(query, max_results)
 
 def search_google_shopping(query="laptop", max_results=20):
     """Enhanced Google Shopping search with error handling and data validation"""
@@ -88,64 +278,13 @@ def search_google_shopping(query="laptop", max_results=20):
             print("SERPAPI_API_KEY not found - using fallback data")
             return generate_fallback_data(query, max_results)
 
-        params = {
-            "engine": "google_shopping",
-            "q": query,
-            "api_key": api_key,
-            "num": max_results
-        }
-
-        search = GoogleSearch(params)
-        results = search.get_dict()
-        
-        shopping_results = results.get("shopping_results", [])
+        shopping_results = fetch_shopping_results(query, api_key, max_results)
         
         if not shopping_results:
             print("No shopping results found - using fallback data")
             return generate_fallback_data(query, max_results)
         
-        processed_results = []
-        for item in shopping_results:
-            original_price = item.get("price")
-            
-            price_value, currency_sym = extract_price_and_currency(original_price or "0")
-
-            if not (10 <= price_value <= 1000000): 
-                print(f"Warning: Price {price_value} for {item.get('title')} seems implausible. Skipping or adjusting.")
-                price_value = 0.0 
-
-            rating_val = item.get("rating")
-            if rating_val is None:
-                rating = random.uniform(3.5, 5.0)
-            else:
-                try:
-                    rating = float(rating_val)
-                    if not (0 <= rating <= 5):
-                        print(f"Warning: Rating {rating} for {item.get('title')} is out of range. Adjusting to average.")
-                        rating = random.uniform(3.5, 5.0)
-                except (ValueError, TypeError):
-                    rating = random.uniform(3.5, 5.0)
-            
-            reviews_val = item.get("reviews")
-            if reviews_val is None:
-                reviews = random.randint(50, 1000)
-            else:
-                try:
-                    reviews = int(reviews_val)
-                except (ValueError, TypeError):
-                    reviews = random.randint(50, 1000)
-
-            processed_results.append({
-                "product_name": item.get("title", "Unknown"),
-                "price_value": price_value, 
-                "currency_symbol": currency_sym, 
-                "source": item.get("source", "Google Shopping"),
-                "rating": rating,
-                "reviews": reviews
-            })
-        
-        df = pd.DataFrame(processed_results)
-        return df[df['price_value'] > 0] 
+        return parse_shopping_results(shopping_results)
         
     except Exception as e:
         print(f"Error in Google Shopping search: {str(e)}")
@@ -0,0 +1,110 @@
+"""Listing-page layouts of the sites behind the HTML scraping engine.
+
+Each SiteSpec says where a site's search results live and how to read one
+listing with XPath. `item` selects one element per listing; the field
+expressions are evaluated against that element and should return a string
+(normalize-space(...) or string(...)). Markup drifts, so when a site stops
+yielding rows, re-record its fixture and adjust the expressions here:
+
+    python -m data.scrapers.html_engine record amazon_in "wireless earbuds"
+    python -m data.scrapers.html_engine bench --sites amazon_in
+
+This module only declares data, so parse workers can import it cheaply.
+"""
+import os
+from dataclasses import dataclass
+from typing import Dict, List
+
+
+@dataclass(frozen=True)
+class SiteSpec:
+    # Short id, also the fixture file name
+    key: str
+    # Shown as the listing's source
+    name: str
+    domain: str
+    # direct, price_comparison, social or international
+    category: str
+    # Search results URL with {query} and {page} placeholders
+    search_url: str
+    item: str
+    title: str
+    price: str
+    rating: str = ""
+    reviews: str = ""
+    link: str = ""
+    # Assumed when the price text carries no symbol
+    currency: str = "₹"
+    # Multiplier from the site's currency to rupees
+    inr_rate: float = 1.0
+    # Results are built by JavaScript, so the page must be rendered in a headless browser
+    render: bool = False
+
+
+def _has_class(name: str) -> str:
+    """XPath predicate for an exact class token, unlike contains(@class, ...)"""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+
+SITES: Dict[str, SiteSpec] = {spec.key: spec for spec in [
+    SiteSpec(
+        key="amazon_in", name="Amazon.in", domain="www.amazon.in", category="direct",
+        search_url="https://www.amazon.in/s?k={query}&page={page}",
+        item='//div[@data-component-type="s-search-result"]',
+        title="normalize-space(.//h2)",
+        price='normalize-space(.//span[contains(@class, "a-price")][not(contains(@class, "a-text-price"))]'
+              '/span[@class="a-offscreen"])',
+        rating='normalize-space(.//span[@class="a-icon-alt"])',
+        reviews='normalize-space(.//a[contains(@href, "customerReviews")]//span)',
+        link='string(.//h2/ancestor::a[1]/@href | .//h2//a/@href)',
+    ),
+    SiteSpec(
+        key="croma", name="Croma", domain="www.croma.com", category="direct",
+        search_url="https://www.croma.com/searchB?q={query}&page={page}",
+        item=f'//li[{_has_class("product-item")}]',
+        title='normalize-space(.//h3[contains(@class, "product-title")])',
+        price='normalize-space(.//span[@data-testid="new-price"])',
+        rating='normalize-space(.//span[contains(@class, "rating-text")])',
+        reviews='normalize-space(.//span[contains(@class, "rating-count")])',
+        link='string(.//h3[contains(@class, "product-title")]//a/@href)',
+        render=True,
+    ),
+    SiteSpec(
+        key="smartprix", name="Smartprix", domain="www.smartprix.com", category="price_comparison",
+        search_url="https://www.smartprix.com/products/?q={query}&page={page}",
+        item=f'//div[{_has_class("sm-product")}]',
+        title="normalize-space(.//h2)",
+        price=f'normalize-space(.//span[{_has_class("price")}])',
+        rating=f'normalize-space(.//span[{_has_class("sm-rating")}])',
+        reviews=f'normalize-space(.//span[{_has_class("sm-rating-count")}])',
+        link='string(.//a[h2]/@href | .//h2/a/@href)',
+    ),
+    SiteSpec(
+        key="meesho", name="Meesho", domain="www.meesho.com", category="social",
+        search_url="https://www.meesho.com/search?q={query}&page={page}",
+        item='//div[contains(@class, "ProductList")]//a[contains(@href, "/p/")]',
+        title='normalize-space(.//p[contains(@class, "ProductTitle")])',
+        price='normalize-space(.//h5)',
+        rating='normalize-space(.//span[contains(@class, "RatingValue")])',
+        reviews='normalize-space(.//span[contains(@class, "RatingCount")])',
+        link="string(@href)",
+        render=True,
+    ),
+    SiteSpec(
+        key="ebay", name="eBay", domain="www.ebay.com", category="international",
+        search_url="https://www.ebay.com/sch/i.html?_nkw={query}&_pgn={page}",
+        # The first tile is a "Shop on eBay" placeholder, not a listing
+        item=f'//li[{_has_class("s-item")}][not(.//div[contains(@class, "s-item__title")]//span[. = "Shop on eBay"])]',
+        title='normalize-space(.//div[contains(@class, "s-item__title")])',
+        price='normalize-space(.//span[contains(@class, "s-item__price")])',
+        rating='normalize-space(.//div[contains(@class, "x-star-rating")]//span[@class="clipped"])',
+        reviews='normalize-space(.//span[contains(@class, "s-item__reviews-count")]/span[1])',
+        link='string(.//a[contains(@class, "s-item__link")]/@href)',
+        currency="$",
+        inr_rate=float(os.getenv("USD_INR_RATE", "83.0")),
+    ),
+]}
+
+
+def sites_for(category: str) -> List[SiteSpec]:
+    return [spec for spec in SITES.values() if spec.category == category]
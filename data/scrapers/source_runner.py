@@ -0,0 +1,141 @@
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+
+class DomainRateLimiter:
+    """Enforce a minimum interval between requests to the same domain.
+
+    Slots are reserved under a lock and slept outside it, so waiting on one
+    domain never delays requests to another.
+    """
+
+    def __init__(self, min_interval: float = 1.0, per_domain: Optional[Dict[str, float]] = None):
+        self.min_interval = min_interval
+        self.per_domain = dict(per_domain or {})
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def interval_for(self, domain: str) -> float:
+        return self.per_domain.get(domain, self.min_interval)
+
+    def reserve(self, domain: str) -> float:
+        """Reserve the next free slot for `domain` and return the delay until it"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(domain, now))
+            self._next_slot[domain] = slot + self.interval_for(domain)
+        return slot - now
+
+    def acquire(self, domain: str) -> None:
+        delay = self.reserve(domain)
+        if delay > 0:
+            time.sleep(delay)
+
+
+@dataclass
+class ScraperSource:
+    """A registered scraping source"""
+    func: Callable[[str], pd.DataFrame]
+    name: str
+    domain: str
+
+
+@dataclass
+class SourceRunResult:
+    """Outcome of a concurrent run over several sources"""
+    frames: Dict[str, pd.DataFrame] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+    failed: Dict[str, str] = field(default_factory=dict)
+    timed_out: List[str] = field(default_factory=list)
+    elapsed: float = 0.0
+
+    @property
+    def partial(self) -> bool:
+        return bool(self.timed_out)
+
+
+DEFAULT_RATE_LIMITER = DomainRateLimiter(min_interval=1.0)
+
+
+def run_sources(query: str,
+                sources: List[ScraperSource],
+                per_source_timeout: float = 8.0,
+                deadline: float = 15.0,
+                rate_limiter: Optional[DomainRateLimiter] = None,
+                max_workers: Optional[int] = None) -> SourceRunResult:
+    """Run all sources concurrently and return whatever finished in time.
+
+    Each source gets `per_source_timeout` seconds from the moment it starts
+    running; the whole run is cut off after `deadline` seconds. Sources that
+    miss either limit are reported in `timed_out` and their results dropped.
+    """
+    rate_limiter = rate_limiter or DEFAULT_RATE_LIMITER
+    result = SourceRunResult()
+    if not sources:
+        return result
+
+    started_at: Dict[str, float] = {}
+
+    def run_one(source: ScraperSource) -> pd.DataFrame:
+        rate_limiter.acquire(source.domain)
+        started_at[source.name] = time.monotonic()
+        return source.func(query)
+
+    t0 = time.monotonic()
+    overall_end = t0 + deadline
+    executor = ThreadPoolExecutor(max_workers=max_workers or len(sources),
+                                  thread_name_prefix="scraper")
+    try:
+        pending: Dict[Future, ScraperSource] = {executor.submit(run_one, s): s for s in sources}
+
+        while pending:
+            now = time.monotonic()
+            expired = [f for f, s in pending.items()
+                       if s.name in started_at and now - started_at[s.name] >= per_source_timeout]
+            for future in expired:
+                source = pending.pop(future)
+                future.cancel()
+                result.timed_out.append(source.name)
+                logging.warning(f"Source {source.name} exceeded {per_source_timeout:.1f}s timeout")
+            if not pending:
+                break
+
+            remaining = overall_end - now
+            if remaining <= 0:
+                for future, source in pending.items():
+                    future.cancel()
+                    result.timed_out.append(source.name)
+                    logging.warning(f"Source {source.name} missed the {deadline:.1f}s deadline")
+                break
+
+            source_deadlines = [started_at[s.name] + per_source_timeout - now
+                                for s in pending.values() if s.name in started_at]
+            # Sources still waiting on the rate limiter have no start time yet,
+            # so poll periodically to pick up their per-source clock.
+            timeout = min([remaining, 0.25] + source_deadlines)
+            done, _ = wait(list(pending), timeout=max(timeout, 0), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                source = pending.pop(future)
+                end = time.monotonic()
+                result.timings[source.name] = end - started_at.get(source.name, end)
+                try:
+                    df = future.result()
+                except Exception as e:
+                    result.failed[source.name] = str(e)
+                    logging.error(f"Error scraping {source.name}: {str(e)}")
+                    continue
+                if df is not None and not df.empty:
+                    result.frames[source.name] = df
+    finally:
+        # Never block on stragglers; they finish in the background and are discarded.
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    result.elapsed = time.monotonic() - t0
+    return result
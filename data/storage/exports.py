@@ -0,0 +1,310 @@
+"""Chunked file exports of product frames, run inline or as background jobs.
+
+Every format is written `chunk_rows` rows at a time to a `.part` file that
+is renamed into place once complete, so memory stays bounded by one chunk
+(plus the writer's own buffers) and readers never see half a file.
+
+    path = write_export(df, "parquet", "exports/downloads/laptop.parquet")
+    job = EXPORT_JOBS.submit(df, "arrow", name="laptop")   # poll job.progress
+"""
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import pandas as pd
+
+DEFAULT_CHUNK_ROWS = 50_000
+EXCEL_MAX_ROWS = 1_048_575  # one row is the header
+
+# format -> (file extension, MIME type)
+EXPORT_FORMATS: Dict[str, tuple] = {
+    "csv": ("csv", "text/csv"),
+    "json": ("json", "application/json"),
+    "excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "parquet": ("parquet", "application/vnd.apache.parquet"),
+    "arrow": ("arrow", "application/vnd.apache.arrow.file"),
+}
+
+ProgressCallback = Callable[[int], None]
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+def _chunks(df: pd.DataFrame, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def _write_csv(chunks, path, on_chunk):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for i, chunk in enumerate(chunks):
+            chunk.to_csv(f, index=False, header=i == 0)
+            on_chunk(len(chunk))
+
+
+def _write_json(chunks, path, on_chunk):
+    # A single records array, as df.to_json(orient='records') would produce
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        first = True
+        for chunk in chunks:
+            body = chunk.to_json(orient="records")[1:-1]
+            if body:
+                f.write(body if first else "," + body)
+                first = False
+            on_chunk(len(chunk))
+        f.write("]")
+
+
+def _write_excel(chunks, path, on_chunk):
+    from openpyxl import Workbook
+
+    # write_only streams rows to disk instead of building every cell in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("products")
+    rows = 0
+    try:
+        for i, chunk in enumerate(chunks):
+            rows += len(chunk)
+            if rows > EXCEL_MAX_ROWS:
+                raise ValueError(f"Excel sheets hold at most {EXCEL_MAX_ROWS:,} rows; use parquet or csv")
+            if i == 0:
+                sheet.append([str(c) for c in chunk.columns])
+            values = chunk.astype(object).where(chunk.notna(), None)
+            for row in values.itertuples(index=False, name=None):
+                sheet.append(row)
+            on_chunk(len(chunk))
+    except BaseException:
+        # Finish the sheet's temporary stream, or openpyxl complains when it is collected
+        sheet.close()
+        raise
+    workbook.save(path)
+
+
+def _arrow_table(chunk: pd.DataFrame, schema=None):
+    import pyarrow as pa
+
+    # Category dictionaries differ between chunks, which Arrow IPC files cannot
+    # express; plain columns still compress well and Parquet re-encodes them
+    chunk = chunk.assign(**{c: chunk[c].astype(chunk[c].cat.categories.dtype)
+                            for c in chunk.columns if isinstance(chunk[c].dtype, pd.CategoricalDtype)})
+    if schema is None:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        # An all-null first chunk would otherwise fix a column's type to null
+        schema = pa.schema([f.with_type(pa.string()) if pa.types.is_null(f.type) else f for f in table.schema])
+    return pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+
+
+def _write_parquet(chunks, path, on_chunk):
+    import pyarrow.parquet as pq
+
+    writer, schema = None, None
+    try:
+        for chunk in chunks:
+            table = _arrow_table(chunk, schema)
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(path, table.schema, compression="zstd")
+            # One row group per chunk
+            writer.write_table(table)
+            on_chunk(len(chunk))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _write_arrow(chunks, path, on_chunk):
+    import pyarrow as pa
+
+    writer, schema = None, None
+    try:
+        for chunk in chunks:
+            table = _arrow_table(chunk, schema)
+            if writer is None:
+                schema = table.schema
+                writer = pa.ipc.new_file(path, table.schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+            writer.write_table(table)
+            on_chunk(len(chunk))
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+_WRITERS = {
+    "csv": _write_csv,
+    "json": _write_json,
+    "excel": _write_excel,
+    "parquet": _write_parquet,
+    "arrow": _write_arrow,
+}
+
+
+def write_export(df: pd.DataFrame, format: str, path, chunk_rows: int = DEFAULT_CHUNK_ROWS,
+                 progress: Optional[ProgressCallback] = None,
+                 cancelled: Optional[threading.Event] = None) -> str:
+    """Write `df` to `path` in `format`, chunk by chunk, and return the path
+
+    `progress` is called with the number of rows written so far after each
+    chunk; setting `cancelled` stops the export and removes the partial file.
+    """
+    return write_frames(_chunks(df, max(1, chunk_rows)), format, path, progress, cancelled)
+
+
+def write_frames(frames: Iterable[pd.DataFrame], format: str, path,
+                 progress: Optional[ProgressCallback] = None,
+                 cancelled: Optional[threading.Event] = None) -> str:
+    """Like `write_export`, for frames produced one at a time, e.g. by a generator
+
+    All frames must have the same columns.
+    """
+    if format not in _WRITERS:
+        raise ValueError(f"Unsupported format: {format}")
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    part = path.with_name(path.name + ".part")
+    written = 0
+
+    def on_chunk(rows: int) -> None:
+        nonlocal written
+        written += rows
+        if progress is not None:
+            progress(written)
+        if cancelled is not None and cancelled.is_set():
+            raise ExportCancelled(str(path))
+
+    try:
+        _WRITERS[format](frames, part, on_chunk)
+        os.replace(part, path)
+    except BaseException:
+        part.unlink(missing_ok=True)
+        raise
+    return str(path)
+
+
+def export_filename(name: str, format: str) -> str:
+    slug = re.sub(r"[^\w]+", "_", str(name).strip().casefold()).strip("_") or "product_data"
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    return f"{slug}_{timestamp}_{uuid.uuid4().hex[:6]}.{EXPORT_FORMATS[format][0]}"
+
+
+@dataclass
+class ExportJob:
+    id: str
+    format: str
+    path: str
+    total_rows: int
+    rows_done: int = 0
+    status: str = "queued"  # queued, running, done, failed, cancelled
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    size_bytes: Optional[int] = None
+    _cancel: threading.Event = field(default_factory=threading.Event, repr=False)
+
+    @property
+    def progress(self) -> float:
+        return self.rows_done / self.total_rows if self.total_rows else 1.0
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed", "cancelled")
+
+    @property
+    def filename(self) -> str:
+        return Path(self.path).name
+
+    @property
+    def mime(self) -> str:
+        return EXPORT_FORMATS[self.format][1]
+
+    @property
+    def elapsed(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+
+class ExportJobs:
+    """Runs exports on a small worker pool and keeps the most recent jobs for polling"""
+
+    def __init__(self, output_dir: str = "exports", max_workers: int = 2, keep: int = 100,
+                 chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        self.output_dir = Path(output_dir)
+        self.chunk_rows = chunk_rows
+        self.keep = keep
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export")
+        self._jobs: Dict[str, ExportJob] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, df: pd.DataFrame, format: str, name: str = "product_data",
+               output_dir: Optional[str] = None) -> ExportJob:
+        """Queue an export of `df`; the frame must not be modified in place until the job finishes"""
+        if format not in _WRITERS:
+            raise ValueError(f"Unsupported format: {format}")
+        if df.empty:
+            raise ValueError("No data to export")
+        path = Path(output_dir or self.output_dir) / export_filename(name, format)
+        job = ExportJob(id=uuid.uuid4().hex[:12], format=format, path=str(path), total_rows=len(df))
+        with self._lock:
+            self._jobs[job.id] = job
+            finished = [j.id for j in self._jobs.values() if j.finished]
+            for job_id in finished[:max(0, len(self._jobs) - self.keep)]:
+                del self._jobs[job_id]
+        self._executor.submit(self._run, job, df)
+        return job
+
+    def _run(self, job: ExportJob, df: pd.DataFrame) -> None:
+        if job._cancel.is_set():
+            job.status = "cancelled"
+            return
+        job.status = "running"
+        job.started_at = time.time()
+
+        def progress(rows: int) -> None:
+            job.rows_done = rows
+
+        try:
+            write_export(df, job.format, job.path, self.chunk_rows, progress, job._cancel)
+            job.size_bytes = Path(job.path).stat().st_size
+            job.status = "done"
+        except ExportCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            logging.error(f"Export {job.id} to {job.path} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def jobs(self, ids: Optional[List[str]] = None) -> List[ExportJob]:
+        with self._lock:
+            if ids is None:
+                return list(self._jobs.values())
+            return [self._jobs[i] for i in ids if i in self._jobs]
+
+    def cancel(self, job_id: str) -> None:
+        job = self.get(job_id)
+        if job is not None:
+            job._cancel.set()
+
+
+EXPORT_JOBS = ExportJobs(
+    output_dir=os.getenv("EXPORT_DIR", "exports/downloads"),
+    max_workers=int(os.getenv("EXPORT_WORKERS", "2")),
+    chunk_rows=int(os.getenv("EXPORT_CHUNK_ROWS", str(DEFAULT_CHUNK_ROWS))),
+)
@@ -0,0 +1,235 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from ..scrapers.query_cache import normalize_query
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS price_history (
+    id INTEGER PRIMARY KEY,
+    scraped_at REAL NOT NULL,
+    query TEXT NOT NULL,
+    raw_query TEXT,
+    product_name TEXT,
+    source TEXT,
+    price REAL NOT NULL,
+    currency TEXT,
+    rating REAL,
+    reviews INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_price_history_query_time ON price_history (query, scraped_at);
+CREATE INDEX IF NOT EXISTS idx_price_history_time ON price_history (scraped_at);
+"""
+
+INSERT_SQL = """
+INSERT INTO price_history
+    (scraped_at, query, raw_query, product_name, source, price, currency, rating, reviews)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+# Scrapers disagree on the price column name; the first one present wins.
+PRICE_COLUMNS = [('price_value', None), ('price_inr', '₹'), ('price_usd', '$')]
+
+_STOP = object()
+
+
+def _nullable(values, cast) -> list:
+    return [cast(v) if pd.notna(v) else None for v in values]
+
+
+def _rows_from_frame(df: pd.DataFrame, query: str, scraped_at: float) -> List[tuple]:
+    price_col, default_currency = next(((c, cur) for c, cur in PRICE_COLUMNS if c in df.columns), (None, None))
+    if price_col is None:
+        raise ValueError("DataFrame has no price column")
+
+    prices = pd.to_numeric(df[price_col], errors='coerce')
+    df, prices = df[prices > 0], prices[prices > 0]
+    n = len(df)
+    if n == 0:
+        return []
+
+    def column(name, cast, default=None):
+        if name not in df.columns:
+            return [default] * n
+        return _nullable(df[name], cast)
+
+    return list(zip(
+        [scraped_at] * n,
+        [normalize_query(query)] * n,
+        [query] * n,
+        column('product_name', str),
+        column('source', str),
+        # float32 frames would otherwise store 499.989990234375 for 499.99
+        prices.astype(float).round(2).tolist(),
+        column('currency_symbol', str, default_currency or '₹'),
+        _nullable(pd.to_numeric(df['rating'], errors='coerce').astype(float).round(2), float) if 'rating' in df.columns else [None] * n,
+        _nullable(pd.to_numeric(df['reviews'], errors='coerce'), int) if 'reviews' in df.columns else [None] * n,
+    ))
+
+
+class PriceHistoryStore:
+    """Append-only SQLite store of every scraped price, indexed by query and time.
+
+    `append` only converts the frame to rows and queues them; a background
+    writer thread drains the queue and commits in batches, so callers on the
+    request path never wait on disk I/O.
+    """
+
+    def __init__(self, path: str, batch_size: int = 1000, flush_interval: float = 0.5):
+        self.path = str(path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._writer = threading.Thread(target=self._write_loop, name="price-history-writer", daemon=True)
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def append(self, df: pd.DataFrame, query: str, scraped_at: Optional[float] = None) -> int:
+        """Queue a scrape for writing and return the number of rows queued"""
+        if df is None or df.empty:
+            return 0
+        rows = _rows_from_frame(df, query, scraped_at if scraped_at is not None else time.time())
+        for row in rows:
+            self._queue.put(row)
+        return len(rows)
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                batch, done = [], item is _STOP
+                if not done:
+                    batch.append(item)
+                deadline = time.monotonic() + self.flush_interval
+                while not done and len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                    except queue.Empty:
+                        break
+                    if item is _STOP:
+                        done = True
+                    else:
+                        batch.append(item)
+
+                if batch:
+                    try:
+                        with conn:
+                            conn.executemany(INSERT_SQL, batch)
+                    except sqlite3.Error as e:
+                        logging.error(f"Failed to write {len(batch)} price history rows: {e}")
+                for _ in range(len(batch) + (1 if done else 0)):
+                    self._queue.task_done()
+                if done:
+                    return
+        finally:
+            conn.close()
+
+    def flush(self) -> None:
+        """Block until every queued row has been committed"""
+        self._queue.join()
+
+    def close(self) -> None:
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+
+    def _read(self, sql: str, params: tuple) -> pd.DataFrame:
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def history(self, query: str, days: Optional[float] = None, source: Optional[str] = None) -> pd.DataFrame:
+        """All recorded listings for a query, oldest first"""
+        since = time.time() - days * 86400 if days is not None else 0.0
+        sql = ("SELECT scraped_at, product_name, source, price, currency, rating, reviews "
+               "FROM price_history WHERE query = ? AND scraped_at >= ?")
+        params = [normalize_query(query), since]
+        if source is not None:
+            sql += " AND source = ?"
+            params.append(source)
+        df = self._read(sql + " ORDER BY scraped_at", tuple(params))
+        df['scraped_at'] = pd.to_datetime(df['scraped_at'], unit='s')
+        return df
+
+    def lowest_price(self, query: str, days: float = 30, current: Optional[pd.DataFrame] = None) -> Optional[Dict]:
+        """Cheapest listing recorded for a query within the last `days` days
+
+        `current` is a scrape just passed to `append`, whose rows may still be
+        queued; it is compared in memory instead of waiting for the writer.
+        """
+        df = self._read(
+            "SELECT scraped_at, product_name, source, price, currency FROM price_history "
+            "WHERE query = ? AND scraped_at >= ? ORDER BY price LIMIT 1",
+            (normalize_query(query), time.time() - days * 86400),
+        )
+        if current is not None and not current.empty:
+            rows = _rows_from_frame(current, query, time.time())
+            if rows:
+                cheapest = min(rows, key=lambda row: row[5])
+                if df.empty or cheapest[5] < df['price'].iloc[0]:
+                    df = pd.DataFrame([{'scraped_at': cheapest[0], 'product_name': cheapest[3], 'source': cheapest[4],
+                                        'price': cheapest[5], 'currency': cheapest[6]}])
+        if df.empty:
+            return None
+        record = df.iloc[0].to_dict()
+        record['scraped_at'] = pd.to_datetime(record['scraped_at'], unit='s')
+        return record
+
+    def daily_lowest(self, query: str, days: float = 30) -> pd.DataFrame:
+        """Lowest price per day for a query, suitable for a trend chart"""
+        df = self._read(
+            "SELECT date(scraped_at, 'unixepoch') AS day, MIN(price) AS lowest_price, COUNT(*) AS listings "
+            "FROM price_history WHERE query = ? AND scraped_at >= ? GROUP BY day ORDER BY day",
+            (normalize_query(query), time.time() - days * 86400),
+        )
+        return df
+
+    def tracked_queries(self) -> pd.DataFrame:
+        return self._read(
+            "SELECT query, COUNT(*) AS listings, MAX(scraped_at) AS last_scraped "
+            "FROM price_history GROUP BY query ORDER BY last_scraped DESC",
+            (),
+        )
+
+    def import_csv_exports(self, export_dir: str = "exports") -> int:
+        """One-off import of legacy `exports/{query}_products.csv` files"""
+        imported = 0
+        for csv_path in sorted(Path(export_dir).glob("*_products.csv")):
+            query = csv_path.name[:-len("_products.csv")]
+            try:
+                df = pd.read_csv(csv_path)
+                imported += self.append(df, query, scraped_at=csv_path.stat().st_mtime)
+            except Exception as e:
+                logging.warning(f"Skipping {csv_path}: {e}")
+        return imported
+
+
+_store: Optional[PriceHistoryStore] = None
+_store_lock = threading.Lock()
+
+
+def get_price_store() -> PriceHistoryStore:
+    """Process-wide store, created on first use"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = PriceHistoryStore(os.getenv("PRICE_HISTORY_DB", "exports/price_history.sqlite3"))
+        return _store
@@ -0,0 +1,204 @@
+"""Seeded synthetic product catalogs for fallback data and scale testing.
+
+A catalog is a set of products, and each product is listed by several
+sources under the same or a slightly reformatted title. The generator is
+built to look like real shopping results:
+
+- Listings per product follow a Zipf-like popularity curve.
+- Each source prices a product around its own markup, on a log-normal
+  base price, and prices end in 9 like retail prices.
+- Review counts are heavily skewed towards popular products.
+
+Everything is drawn with NumPy from a seeded generator, so the same
+arguments always give the same rows, and millions of rows take seconds:
+
+    df = generate_catalog("smartphone", 1_000_000, seed=42)
+    for chunk in iter_catalog("laptop", 20_000_000, chunk_rows=500_000):
+        ...
+
+    python -m data.synthetic smartphone --rows 5000000 --out catalog.parquet
+"""
+import argparse
+import zlib
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from data.schema import apply_product_schema
+
+
+@dataclass(frozen=True)
+class SourceProfile:
+    name: str
+    # Share of all listings
+    weight: float
+    # Typical price relative to the product's base price, and the spread around it
+    markup: float
+    price_sigma: float
+    # Added to the product's rating before rounding
+    rating_bias: float = 0.0
+
+
+DEFAULT_SOURCES = [
+    SourceProfile("Amazon.in", 0.30, 0.97, 0.05, 0.05),
+    SourceProfile("Flipkart", 0.27, 0.95, 0.06, 0.0),
+    SourceProfile("Croma", 0.12, 1.03, 0.04, 0.1),
+    SourceProfile("Reliance Digital", 0.11, 1.01, 0.04, 0.05),
+    SourceProfile("Vijay Sales", 0.08, 0.99, 0.05, 0.0),
+    SourceProfile("Tata CLiQ", 0.07, 1.02, 0.06, -0.05),
+    SourceProfile("Meesho", 0.05, 0.85, 0.12, -0.4),
+]
+
+TIERS = ["", "Pro", "Lite", "Plus", "Max", "Ultra", "Neo", "Prime", "Edge", "Air", "Mini", "Turbo"]
+BRANDS = ["Nova", "Zenith", "Orbit", "Pulse", "Vertex", "Aero", "Lumen", "Titan", "Quartz", "Helix",
+          "Nimbus", "Atlas", "Vega", "Kairo", "Solis", "Ember"]
+VARIANTS = ["64GB", "128GB", "256GB", "512GB", "1TB"]
+COLOURS = ["Black", "Blue", "Silver", "Green", "White", "Grey", "Purple", "Gold"]
+
+DEFAULT_PRICE_SCALE = 20_000.0
+DEFAULT_CHUNK_ROWS = 250_000
+MAX_PRODUCTS = 100_000
+
+
+def query_seed(query: str) -> int:
+    """Stable seed for a query, so the same search always yields the same placeholder data"""
+    return zlib.crc32(" ".join(str(query).casefold().split()).encode("utf-8"))
+
+
+class CatalogGenerator:
+    """Products for one query, and listings drawn from them chunk by chunk
+
+    `n_products` defaults to a quarter of the expected rows, capped at
+    MAX_PRODUCTS, so titles repeat across sources at every size.
+    """
+
+    def __init__(self, query: str, n_products: int, seed: Optional[int] = None,
+                 sources: Sequence[SourceProfile] = DEFAULT_SOURCES, price_scale: float = DEFAULT_PRICE_SCALE,
+                 zipf_exponent: float = 1.1, currency_symbol: str = "₹"):
+        self.query = str(query).strip() or "Product"
+        self.seed = query_seed(self.query) if seed is None else seed
+        self.sources = list(sources)
+        self.currency_symbol = currency_symbol
+        rng = np.random.default_rng([self.seed, 0])
+        n = max(1, n_products)
+
+        # Popularity by rank; the order is shuffled so product ids carry no meaning
+        popularity = 1.0 / np.arange(1, n + 1) ** zipf_exponent
+        self.popularity = rng.permutation(popularity / popularity.sum())
+        self.base_price = rng.lognormal(np.log(price_scale), 0.6, n)
+        # Mean around 4.1 with a long tail of poorly rated products
+        self.base_rating = 1.0 + 4.0 * rng.beta(8.0, 2.4, n)
+        self.titles = self._titles(rng, n)
+
+        weights = np.array([s.weight for s in self.sources], dtype=np.float64)
+        self._source_p = weights / weights.sum()
+        self._markup = np.array([s.markup for s in self.sources])
+        self._price_sigma = np.array([s.price_sigma for s in self.sources])
+        self._rating_bias = np.array([s.rating_bias for s in self.sources])
+        self._source_dtype = pd.CategoricalDtype([s.name for s in self.sources])
+        self._currency_dtype = pd.CategoricalDtype([currency_symbol])
+
+    def _titles(self, rng: np.random.Generator, n: int) -> np.ndarray:
+        """Two spellings per product: canonical (even ids) and a seller's reformatting (odd ids)"""
+        brand = rng.integers(0, len(BRANDS), n)
+        tier = rng.integers(0, len(TIERS), n)
+        model = rng.integers(2, 99, n)
+        variant = rng.integers(0, len(VARIANTS), n)
+        colour = rng.integers(0, len(COLOURS), n)
+        titles = np.empty(2 * n, dtype=object)
+        for i, (b, t, m, v, c) in enumerate(zip(brand.tolist(), tier.tolist(), model.tolist(),
+                                                variant.tolist(), colour.tolist())):
+            name = f"{BRANDS[b]} {self.query} {m} {TIERS[t]}".replace("  ", " ").strip()
+            titles[2 * i] = f"{name} ({VARIANTS[v][:-2]} {VARIANTS[v][-2:]}) - {COLOURS[c]}"
+            titles[2 * i + 1] = f"{name} {VARIANTS[v]} {COLOURS[c]}"
+        return titles
+
+    def listings(self, n: int, chunk_index: int = 0, price_col: str = "price_value") -> pd.DataFrame:
+        """n listings in the compact product schema; chunk_index selects an independent random stream"""
+        rng = np.random.default_rng([self.seed, chunk_index + 1])
+        product = rng.choice(len(self.popularity), size=n, p=self.popularity)
+        source = rng.choice(len(self.sources), size=n, p=self._source_p)
+
+        price = self.base_price[product] * self._markup[source] * np.exp(rng.normal(0.0, self._price_sigma[source]))
+        # Retail-style prices ending in 9, e.g. 18,499 or 1,299
+        price = np.maximum(np.floor(price / 10.0) * 10.0 - 1.0, 9.0)
+
+        rating = self.base_rating[product] + self._rating_bias[source] + rng.normal(0.0, 0.1, n)
+        rating = np.round(np.clip(rating, 1.0, 5.0), 1)
+
+        # Popular products collect far more reviews; the Pareto factor adds a heavy tail
+        expected = 60.0 * (self.popularity[product] * len(self.popularity)) ** 0.6
+        reviews = np.minimum(expected * (rng.pareto(1.5, n) + 0.2), 2_000_000).astype(np.int64)
+
+        style = (rng.random(n) < 0.35).astype(np.int64)
+        df = pd.DataFrame({
+            "product_name": self.titles[2 * product + style],
+            price_col: price,
+            "currency_symbol": pd.Categorical.from_codes(np.zeros(n, dtype=np.int8), dtype=self._currency_dtype),
+            "source": pd.Categorical.from_codes(source.astype(np.int16), dtype=self._source_dtype),
+            "rating": rating,
+            "reviews": reviews,
+        })
+        return apply_product_schema(df)
+
+
+def _generator(query: str, n_rows: int, seed: Optional[int], n_products: Optional[int], **kwargs) -> CatalogGenerator:
+    if n_products is None:
+        n_products = min(MAX_PRODUCTS, max(10, n_rows // 4))
+    return CatalogGenerator(query, n_products, seed=seed, **kwargs)
+
+
+def iter_catalog(query: str, n_rows: int, chunk_rows: int = DEFAULT_CHUNK_ROWS, seed: Optional[int] = None,
+                 n_products: Optional[int] = None, price_col: str = "price_value", **kwargs) -> Iterator[pd.DataFrame]:
+    """Yield n_rows synthetic listings in frames of at most chunk_rows
+
+    The same arguments, including chunk_rows, always produce the same rows.
+    Extra keyword arguments go to CatalogGenerator.
+    """
+    generator = _generator(query, n_rows, seed, n_products, **kwargs)
+    for index, start in enumerate(range(0, n_rows, chunk_rows)):
+        yield generator.listings(min(chunk_rows, n_rows - start), chunk_index=index, price_col=price_col)
+
+
+def generate_catalog(query: str, n_rows: int, seed: Optional[int] = None, n_products: Optional[int] = None,
+                     price_col: str = "price_value", chunk_rows: int = DEFAULT_CHUNK_ROWS, **kwargs) -> pd.DataFrame:
+    """n_rows synthetic listings for `query` as one frame (see iter_catalog)"""
+    if n_rows <= 0:
+        return pd.DataFrame()
+    chunks = list(iter_catalog(query, n_rows, chunk_rows, seed, n_products, price_col, **kwargs))
+    if len(chunks) == 1:
+        return chunks[0]
+    # Every chunk shares the category sets, so concat keeps the compact dtypes
+    return pd.concat(chunks, ignore_index=True)
+
+
+def source_profiles(names: List[str], markup: float = 1.0, price_sigma: float = 0.08) -> List[SourceProfile]:
+    """Evenly weighted profiles for ad-hoc source names"""
+    return [SourceProfile(name, 1.0, markup, price_sigma) for name in names]
+
+
+def main() -> None:
+    from data.storage.exports import EXPORT_FORMATS, write_frames
+
+    parser = argparse.ArgumentParser(description="Write a seeded synthetic product catalog")
+    parser.add_argument("query")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--products", type=int, help="distinct products (default rows / 4, at most 100k)")
+    parser.add_argument("--seed", type=int, help="defaults to a hash of the query")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS)
+    parser.add_argument("--price-scale", type=float, default=DEFAULT_PRICE_SCALE, help="median base price")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="parquet")
+    parser.add_argument("--out", required=True)
+    args = parser.parse_args()
+
+    chunks = iter_catalog(args.query, args.rows, args.chunk_rows, args.seed, args.products,
+                          price_scale=args.price_scale)
+    path = write_frames(chunks, args.format, args.out,
+                        progress=lambda rows: print(f"\r{rows:,}/{args.rows:,} rows", end="", flush=True))
+    print(f"\nWrote {path}")
+
+
+if __name__ == "__main__":
+    main()
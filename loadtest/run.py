@@ -0,0 +1,238 @@
+"""Drive simulated users through the Product Analysis -> Chat flow against local stubs.
+
+Starts the SerpAPI and Ollama stand-ins from loadtest.stubs, points the
+app's clients at them, then runs N concurrent users. Each user repeats the
+steps app.py performs for a search followed by a chat question:
+
+    search   iter_multiple_sources (paged SerpAPI fetch, parse, schema)
+    history  price history append and 30-day lowest price
+    chart    build_price_chart
+    context  build_data_context
+    chat     one OllamaChatSession turn, read to the end. chat_ttft is its
+             first token, chat_queue the wait for a scheduler slot and
+             chat_prompt the prompt evaluation Ollama reports
+
+and reports p50/p95/p99 latency, throughput and error rate per stage.
+Each user keeps one chat session, so later turns show the prompt-prefix
+reuse in chat_prompt.
+Streamlit's own per-rerun cost is covered by scripts/profile_startup.py.
+
+    python -m loadtest.run --users 50 --iterations 5 --serp-latency-ms 600 --error-rate 0.01
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from loadtest.stubs import add_stub_arguments, start_ollama_stub, start_serpapi_stub, stub_configs
+
+STAGES = ["search", "history", "chart", "context", "chat_queue", "chat_prompt", "chat_ttft", "chat", "flow"]
+
+DEFAULT_QUERIES = ["smartphone", "laptop", "wireless earbuds", "smart watch", "air fryer",
+                   "led tv 55 inch", "running shoes", "power bank", "mixer grinder", "diwali lights"]
+
+
+class StageRecorder:
+    """Latency and outcome of every stage execution, safe to share between user threads"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self.samples[stage].append(seconds)
+            if not ok:
+                self.errors[stage] += 1
+
+    def summary(self, wall_seconds: float) -> Dict[str, Dict]:
+        report = {}
+        for stage in STAGES:
+            samples = self.samples.get(stage)
+            if not samples:
+                continue
+            p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+            report[stage] = {
+                "count": len(samples),
+                "p50_ms": p50 * 1000,
+                "p95_ms": p95 * 1000,
+                "p99_ms": p99 * 1000,
+                "max_ms": max(samples) * 1000,
+                "throughput_per_s": len(samples) / wall_seconds,
+                "error_rate": self.errors.get(stage, 0) / len(samples),
+            }
+        return report
+
+
+def run_user(user_id: int, args, queries: List[str], recorder: StageRecorder, start_at: float) -> None:
+    # Imported after main() has pointed the clients and stores at the stubs
+    from chat.data_context import build_data_context
+    from chat.ollama_chat import OllamaChatSession
+    from data.frames import dataframe_fingerprint
+    from chat.streaming import StreamStats
+    from data.scrapers.scraper_utils import iter_multiple_sources
+    from data.storage.price_history import get_price_store
+    from visualizations.chart_templates import build_price_chart
+
+    rng = random.Random(user_id)
+    session = OllamaChatSession(f"user-{user_id}")
+    time.sleep(max(0.0, start_at - time.perf_counter()))
+    for i in range(args.iterations):
+        query = queries[(user_id + i) % len(queries)]
+        flow_start = time.perf_counter()
+        flow_ok = True
+
+        start = time.perf_counter()
+        df = None
+        try:
+            for df in iter_multiple_sources(query, max_results=args.max_results, refresh=not args.use_cache):
+                pass
+            # With a key configured, fallback data means every page request failed
+            ok = df is not None and not df.empty and not df.attrs.get('fallback')
+        except Exception:
+            ok = False
+        recorder.record("search", time.perf_counter() - start, ok)
+        flow_ok &= ok
+        if df is None or df.empty:
+            recorder.record("flow", time.perf_counter() - flow_start, False)
+            continue
+
+        start = time.perf_counter()
+        try:
+            store = get_price_store()
+            if not df.attrs.get('from_cache') and not df.attrs.get('fallback'):
+                store.append(df, query)
+            store.lowest_price(query, days=30)
+            ok = True
+        except Exception:
+            ok = False
+        recorder.record("history", time.perf_counter() - start, ok)
+        flow_ok &= ok
+
+        outputs = {}
+        for stage, step in (("chart", lambda: build_price_chart(df, price_col='price_value')),
+                            ("context", lambda: build_data_context(df))):
+            start = time.perf_counter()
+            try:
+                outputs[stage] = step()
+                ok = True
+            except Exception:
+                ok = False
+            recorder.record(stage, time.perf_counter() - start, ok)
+            flow_ok &= ok
+        context = outputs.get("context", "")
+
+        session.ensure_dataset(context, dataframe_fingerprint(df))
+        for _ in range(args.turns):
+            stats = StreamStats()
+            prompt = rng.choice(["Which listing is the best deal?", "What is the price range?",
+                                 "Which store is cheapest for this?", "Summarize the ratings."])
+            for _ in session.stream(args.model, prompt, stats=stats):
+                pass
+            # Error replies are yielded as text without marking a chunk
+            ok = stats.first_token_at is not None
+            if stats.queue_seconds is not None:
+                recorder.record("chat_queue", stats.queue_seconds, True)
+            if stats.prompt_eval_seconds is not None:
+                recorder.record("chat_prompt", stats.prompt_eval_seconds, True)
+            if ok:
+                recorder.record("chat_ttft", stats.time_to_first_token, True)
+            recorder.record("chat", stats.finished_at - stats.started_at, ok)
+            flow_ok &= ok
+
+        recorder.record("flow", time.perf_counter() - flow_start, flow_ok)
+        if args.think_time:
+            time.sleep(rng.uniform(0, 2 * args.think_time))
+
+
+def print_report(report: Dict[str, Dict], wall: float, users: int, stub_counters: Dict) -> None:
+    print(f"\n{users} users, wall time {wall:.1f}s")
+    print(f"{'stage':<11} {'count':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'ops/s':>8} {'errors':>8}")
+    for stage, s in report.items():
+        print(f"{stage:<11} {s['count']:>7} {s['p50_ms']:>9.1f} {s['p95_ms']:>9.1f} {s['p99_ms']:>9.1f} "
+              f"{s['max_ms']:>9.1f} {s['throughput_per_s']:>8.2f} {s['error_rate']:>8.1%}")
+    for name, counters in stub_counters.items():
+        print(f"{name} stub: {counters.requests} requests, {counters.errors} injected errors")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10, help="concurrent simulated users")
+    parser.add_argument("--iterations", type=int, default=3, help="search -> chat flows per user")
+    parser.add_argument("--ramp-up", type=float, default=2.0, help="seconds over which users start")
+    parser.add_argument("--think-time", type=float, default=0.0, help="mean pause between a user's flows, seconds")
+    parser.add_argument("--max-results", type=int, default=60)
+    parser.add_argument("--use-cache", action="store_true", help="let repeated queries hit the query cache")
+    parser.add_argument("--model", default="qwen2.5-coder:7b")
+    parser.add_argument("--turns", type=int, default=2, help="chat questions per flow")
+    parser.add_argument("--ollama-concurrency", type=int,
+                        help="app-side Ollama slots (OLLAMA_MAX_CONCURRENCY); defaults to --ollama-parallel")
+    parser.add_argument("--queries", help="file with one query per line (defaults to a built-in list)")
+    parser.add_argument("--json", help="also write the report to this file")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    serp_config, ollama_config = stub_configs(args)
+    serp_server, serp_url, serp_counters = start_serpapi_stub(serp_config)
+    ollama_server, ollama_url, ollama_counters = start_ollama_stub(ollama_config)
+
+    # The clients, query cache and price store read these on first use, so
+    # they must be set before any app module is imported
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    os.environ.update({
+        "SERPAPI_ENDPOINT": serp_url,
+        "SERPAPI_API_KEY": "stub",
+        "OLLAMA_HOST": ollama_url,
+        "PRICE_HISTORY_DB": str(Path(workdir) / "price_history.sqlite3"),
+        "QUERY_CACHE_DIR": str(Path(workdir) / "queries"),
+        "OLLAMA_MAX_CONCURRENCY": str(args.ollama_concurrency or args.ollama_parallel),
+        "OLLAMA_MAX_WAITING": str(max(64, args.users)),
+    })
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        queries = [q.strip() for q in Path(args.queries).read_text(encoding="utf-8").splitlines() if q.strip()]
+
+    # Pay the one-off imports (pandas, plotly, ...) before the clock starts
+    import chat.data_context, chat.ollama_chat, data.scrapers.scraper_utils, visualizations.chart_templates  # noqa: F401
+
+    recorder = StageRecorder()
+    started = time.perf_counter()
+    users = []
+    for user_id in range(args.users):
+        start_at = started + (args.ramp_up * user_id / max(1, args.users - 1) if args.users > 1 else 0.0)
+        thread = threading.Thread(target=run_user, args=(user_id, args, queries, recorder, start_at),
+                                  name=f"user-{user_id}", daemon=True)
+        thread.start()
+        users.append(thread)
+    try:
+        for thread in users:
+            thread.join()
+    except KeyboardInterrupt:
+        print("Interrupted; reporting what finished.", file=sys.stderr)
+    wall = time.perf_counter() - started
+
+    from data.storage.price_history import get_price_store
+    get_price_store().close()
+    serp_server.shutdown()
+    ollama_server.shutdown()
+
+    report = recorder.summary(wall)
+    print_report(report, wall, args.users, {"serpapi": serp_counters, "ollama": ollama_counters})
+    if args.json:
+        Path(args.json).write_text(json.dumps({"args": vars(args), "wall_s": wall, "stages": report}, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,288 @@
+"""Local stand-ins for SerpAPI and Ollama that replay recorded responses.
+
+Both servers add configurable latency and inject errors at a configurable
+rate, so the app can be load-tested without network access or API quota.
+Point the app at them with SERPAPI_ENDPOINT and OLLAMA_HOST:
+
+    python -m loadtest.stubs --serp-latency-ms 400 --ollama-token-ms 20 --error-rate 0.02
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Tuple
+from urllib.parse import parse_qs, urlparse
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+SERPAPI_FIXTURES = REPO_ROOT / "benchmarks" / "fixtures"
+OLLAMA_FIXTURES = Path(__file__).resolve().parent / "fixtures"
+
+
+@dataclass
+class StubConfig:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    # Ollama only: delay between streamed tokens
+    token_ms: float = 0.0
+    # Ollama only: cost per prompt token not covered by a cached prefix, and requests served at once
+    prompt_token_ms: float = 0.0
+    parallel: int = 1
+    # SerpAPI only: listings available per query before pages come back empty
+    total_results: int = 100
+
+
+class StubCounters:
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, error: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            self.errors += int(error)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # Keep-alive, so the app's pooled sessions reuse connections as they would in production
+    protocol_version = "HTTP/1.1"
+    config: StubConfig
+    counters: StubCounters
+
+    def log_message(self, format, *args):
+        pass
+
+    def _delay(self) -> None:
+        cfg = self.config
+        delay = max(0.0, random.gauss(cfg.latency_ms, cfg.jitter_ms)) if cfg.jitter_ms else cfg.latency_ms
+        if delay:
+            time.sleep(delay / 1000)
+
+    def _inject_error(self) -> bool:
+        failed = random.random() < self.config.error_rate
+        self.counters.record(failed)
+        if failed:
+            self._send_json({"error": "injected failure"}, status=self.config.error_status)
+        return failed
+
+    def _send_json(self, payload: Dict, status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Pooled clients drop idle keep-alive connections; that is not a server error
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+def load_shopping_results() -> List[dict]:
+    items = []
+    for path in sorted(SERPAPI_FIXTURES.glob("serpapi_*.json")):
+        items.extend(json.loads(path.read_text(encoding="utf-8")).get("shopping_results", []))
+    return items
+
+
+def load_ollama_responses() -> List[str]:
+    path = OLLAMA_FIXTURES / "ollama_generate.json"
+    return [r["response"] for r in json.loads(path.read_text(encoding="utf-8"))["responses"]]
+
+
+class SerpApiHandler(_StubHandler):
+    """GET /search.json, paged by `start` and `num` like the google_shopping engine"""
+    items: List[dict] = []
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path != "/search.json":
+            self._send_json({"error": "not found"}, status=404)
+            return
+        self._delay()
+        if self._inject_error():
+            return
+
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        query = params.get("q", "")
+        start = int(params.get("start", 0))
+        num = int(params.get("num", 20))
+        end = min(start + num, self.config.total_results)
+        results = []
+        for position in range(start, end):
+            item = dict(self.items[position % len(self.items)])
+            item["position"] = position + 1
+            item["product_id"] = f"{query}-{position}"
+            results.append(item)
+        self._send_json({"search_parameters": {"engine": "google_shopping", "q": query, "start": start},
+                         "shopping_results": results})
+
+
+class OllamaHandler(_StubHandler):
+    """POST /api/generate and /api/chat, streaming NDJSON chunks token by token when asked to
+
+    Like Ollama, at most `parallel` requests are processed at once and the
+    rest wait inside the server. Each slot remembers the last prompt it
+    evaluated, and only the part of a new prompt beyond the longest cached
+    prefix is charged `prompt_token_ms` per token.
+    """
+    responses: List[str] = []
+    slots: threading.BoundedSemaphore
+    prefix_cache: deque
+    cache_lock = threading.Lock()
+
+    def _evaluate_prompt(self, prompt: str) -> Tuple[int, float]:
+        with self.cache_lock:
+            reused = max((len(os.path.commonprefix([prompt, cached])) for cached in self.prefix_cache), default=0)
+        count = (len(prompt) - reused) // 4 + 1
+        started = time.perf_counter()
+        if self.config.prompt_token_ms:
+            time.sleep(count * self.config.prompt_token_ms / 1000)
+        return count, time.perf_counter() - started
+
+    def _remember(self, prompt: str) -> None:
+        with self.cache_lock:
+            self.prefix_cache.append(prompt)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        if path not in ("/api/generate", "/api/chat"):
+            self._send_json({"error": "not found"}, status=404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+        chat = path == "/api/chat"
+        if chat:
+            prompt = "\n".join(m.get("content", "") for m in payload.get("messages", []))
+        else:
+            prompt = payload.get("prompt", "")
+
+        with self.slots:
+            self._delay()
+            if self._inject_error():
+                return
+            prompt_count, prompt_seconds = self._evaluate_prompt(prompt)
+            text = random.choice(self.responses)
+            self._respond(payload, chat, text, prompt_count, prompt_seconds)
+            # The slot's KV cache now holds the prompt and the reply
+            self._remember(prompt + ("\n" if chat else "") + text)
+
+    def _respond(self, payload: Dict, chat: bool, text: str, prompt_count: int, prompt_seconds: float) -> None:
+        model = payload.get("model")
+        tokens = [t + " " for t in text.split(" ")]
+        timings = {"load_duration": 0, "prompt_eval_count": prompt_count,
+                   "prompt_eval_duration": int(prompt_seconds * 1e9), "eval_count": len(tokens)}
+
+        def body(piece: str) -> Dict:
+            return {"message": {"role": "assistant", "content": piece}} if chat else {"response": piece}
+
+        if not payload.get("stream", True):
+            time.sleep(self.config.token_ms * len(tokens) / 1000)
+            self._send_json({"model": model, **body(text), "done": True, **timings})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        started = time.perf_counter()
+        try:
+            for token in tokens:
+                if self.config.token_ms:
+                    time.sleep(self.config.token_ms / 1000)
+                self._write_chunk({"model": model, **body(token), "done": False})
+            self._write_chunk({"model": model, **body(""), "done": True, **timings,
+                               "eval_duration": int((time.perf_counter() - started) * 1e9)})
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, e.g. a cancelled stream
+            self.close_connection = True
+
+    def _write_chunk(self, chunk: Dict) -> None:
+        data = (json.dumps(chunk) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+def start_server(handler: type, config: StubConfig, host: str = "127.0.0.1",
+                 port: int = 0) -> Tuple[StubServer, str, StubCounters]:
+    """Serve `handler` on a daemon thread; port 0 picks a free port"""
+    counters = StubCounters()
+    bound = type(handler.__name__, (handler,), {"config": config, "counters": counters})
+    server = StubServer((host, port), bound)
+    threading.Thread(target=server.serve_forever, name=f"stub-{handler.__name__}", daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}", counters
+
+
+def start_serpapi_stub(config: StubConfig, **kwargs) -> Tuple[StubServer, str, StubCounters]:
+    SerpApiHandler.items = load_shopping_results()
+    return start_server(SerpApiHandler, config, **kwargs)
+
+
+def start_ollama_stub(config: StubConfig, **kwargs) -> Tuple[StubServer, str, StubCounters]:
+    OllamaHandler.responses = load_ollama_responses()
+    OllamaHandler.slots = threading.BoundedSemaphore(max(1, config.parallel))
+    OllamaHandler.prefix_cache = deque(maxlen=max(1, config.parallel))
+    return start_server(OllamaHandler, config, **kwargs)
+
+
+def add_stub_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--serp-latency-ms", type=float, default=300.0)
+    parser.add_argument("--serp-jitter-ms", type=float, default=100.0)
+    parser.add_argument("--serp-total-results", type=int, default=100,
+                        help="listings per query before pages come back empty")
+    parser.add_argument("--ollama-latency-ms", type=float, default=200.0, help="delay before the first token")
+    parser.add_argument("--ollama-jitter-ms", type=float, default=50.0)
+    parser.add_argument("--ollama-token-ms", type=float, default=15.0, help="delay between streamed tokens")
+    parser.add_argument("--ollama-prompt-token-ms", type=float, default=1.0,
+                        help="prompt evaluation cost per token not covered by a cached prefix")
+    parser.add_argument("--ollama-parallel", type=int, default=1, help="requests the Ollama stub serves at once")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with an error")
+    parser.add_argument("--error-status", type=int, default=500)
+
+
+def stub_configs(args) -> Tuple[StubConfig, StubConfig]:
+    serp = StubConfig(latency_ms=args.serp_latency_ms, jitter_ms=args.serp_jitter_ms, error_rate=args.error_rate,
+                      error_status=args.error_status, total_results=args.serp_total_results)
+    ollama = StubConfig(latency_ms=args.ollama_latency_ms, jitter_ms=args.ollama_jitter_ms, error_rate=args.error_rate,
+                        error_status=args.error_status, token_ms=args.ollama_token_ms,
+                        prompt_token_ms=args.ollama_prompt_token_ms, parallel=args.ollama_parallel)
+    return serp, ollama
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--serp-port", type=int, default=8765)
+    parser.add_argument("--ollama-port", type=int, default=11435)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+
+    serp_config, ollama_config = stub_configs(args)
+    _, serp_url, _ = start_serpapi_stub(serp_config, port=args.serp_port)
+    _, ollama_url, _ = start_ollama_stub(ollama_config, port=args.ollama_port)
+    print("Stub servers running. Start the app against them with:")
+    print(f"  SERPAPI_ENDPOINT={serp_url} SERPAPI_API_KEY=stub OLLAMA_HOST={ollama_url} streamlit run app.py")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
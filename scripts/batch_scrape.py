@@ -0,0 +1,151 @@
+"""Refresh prices for a list of queries without the Streamlit UI.
+
+Reads one query per line from a file (or stdin with "-"), runs each through
+the same scraping pipeline as the Product Analysis page on a bounded worker
+pool, and appends the results to the price history store. Completed queries
+are checkpointed, so an interrupted run picks up where it stopped:
+
+    python -m scripts.batch_scrape tracked_queries.txt --workers 4 --qps 2
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, List, Set
+
+import numpy as np
+
+from data.scrapers.query_cache import normalize_query
+from data.scrapers.scraper_utils import scrape_multiple_sources
+from data.scrapers.source_runner import DomainRateLimiter
+from data.storage.price_history import get_price_store
+
+
+def read_queries(source: str) -> List[str]:
+    """Queries from a file or stdin, skipping blanks, comments and duplicates"""
+    lines = sys.stdin.read().splitlines() if source == "-" else Path(source).read_text(encoding="utf-8").splitlines()
+    queries, seen = [], set()
+    for line in lines:
+        query = line.strip()
+        if not query or query.startswith("#"):
+            continue
+        key = normalize_query(query)
+        if key and key not in seen:
+            seen.add(key)
+            queries.append(query)
+    return queries
+
+
+def load_checkpoint(path: Path) -> Set[str]:
+    if not path.exists():
+        return set()
+    done = set()
+    for line in path.read_text(encoding="utf-8").splitlines():
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue  # a torn last line from an interrupted write
+        if record.get("status") == "ok":
+            done.add(record["query"])
+    return done
+
+
+def scrape_one(query: str, max_results: int, refresh: bool, limiter: DomainRateLimiter) -> Dict:
+    limiter.acquire("serpapi")
+    start = time.perf_counter()
+    try:
+        df = scrape_multiple_sources(query, max_results=max_results, refresh=refresh, track_popularity=False)
+    except Exception as e:
+        return {"query": query, "status": "error", "error": str(e), "rows": 0,
+                "latency_s": time.perf_counter() - start, "df": None}
+    status = "fallback" if df.attrs.get("fallback") else "ok"
+    return {"query": query, "status": status, "rows": len(df),
+            "latency_s": time.perf_counter() - start, "df": df}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("queries", help="file with one query per line, or - for stdin")
+    parser.add_argument("--workers", type=int, default=4, help="queries scraped in parallel")
+    parser.add_argument("--qps", type=float, default=1.0, help="maximum queries started per second")
+    parser.add_argument("--max-results", type=int, default=20)
+    parser.add_argument("--use-cache", action="store_true", help="serve queries from the query cache when fresh")
+    parser.add_argument("--checkpoint", default=".cache/batch_checkpoint.jsonl")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and scrape everything")
+    parser.add_argument("--checkpoint-every", type=int, default=20,
+                        help="commit results and checkpoint after this many completed queries")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+
+    checkpoint_path = Path(args.checkpoint)
+    checkpoint_path.parent.mkdir(parents=True, exist_ok=True)
+    if args.restart and checkpoint_path.exists():
+        checkpoint_path.unlink()
+
+    queries = read_queries(args.queries)
+    done = load_checkpoint(checkpoint_path)
+    todo = [q for q in queries if normalize_query(q) not in done]
+    print(f"{len(queries)} queries, {len(queries) - len(todo)} already done, {len(todo)} to scrape")
+
+    store = get_price_store()
+    limiter = DomainRateLimiter(min_interval=1.0 / args.qps if args.qps > 0 else 0.0)
+    pending: List[Dict] = []
+    latencies: List[float] = []
+    counts = {"ok": 0, "fallback": 0, "error": 0}
+    rows_written = 0
+
+    def commit_checkpoint() -> None:
+        # Rows must be durable before their queries are marked done
+        store.flush()
+        with open(checkpoint_path, "a", encoding="utf-8") as f:
+            for record in pending:
+                f.write(json.dumps(record) + "\n")
+        pending.clear()
+
+    started = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="batch")
+    interrupted = False
+    try:
+        futures = [executor.submit(scrape_one, q, args.max_results, not args.use_cache, limiter) for q in todo]
+        for i, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            df = result.pop("df")
+            if result["status"] == "ok" and df is not None and not df.attrs.get("from_cache"):
+                rows_written += store.append(df, result["query"])
+            counts[result["status"]] += 1
+            latencies.append(result["latency_s"])
+            print(f"[{i}/{len(todo)}] {result['query']!r}: {result['status']}, "
+                  f"{result['rows']} rows in {result['latency_s'] * 1000:.0f} ms", flush=True)
+
+            result["query"] = normalize_query(result["query"])
+            pending.append(result)
+            if len(pending) >= args.checkpoint_every:
+                commit_checkpoint()
+    except KeyboardInterrupt:
+        interrupted = True
+        print("Interrupted; saving progress...", file=sys.stderr)
+        executor.shutdown(wait=False, cancel_futures=True)
+    finally:
+        commit_checkpoint()
+        store.close()
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    elapsed = time.perf_counter() - started
+    completed = len(latencies)
+    print()
+    print(f"completed:  {completed}/{len(todo)} ({counts['ok']} ok, {counts['fallback']} fallback, {counts['error']} errors)")
+    print(f"rows:       {rows_written:,} written to {store.path}")
+    print(f"wall time:  {elapsed:.1f}s")
+    if completed:
+        print(f"throughput: {completed / elapsed:.2f} queries/s")
+        print(f"latency:    p50 {np.percentile(latencies, 50) * 1000:.0f} ms, "
+              f"p95 {np.percentile(latencies, 95) * 1000:.0f} ms, max {max(latencies) * 1000:.0f} ms")
+    return 130 if interrupted else (1 if counts["error"] else 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""Profile cold-start import cost and per-interaction rerun cost of app.py.
+
+Import times come from `python -X importtime` in a fresh interpreter per
+backend. Rerun times come from Streamlit's AppTest harness, which executes
+app.py the same way the server does on every widget interaction.
+
+    python -m scripts.profile_startup
+    python -m scripts.profile_startup --budget cold_ms=2500 rerun_ms=150 --json startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+# Module each page or backend pulls in, in the order the app touches them
+BACKENDS = {
+    "streamlit": "streamlit",
+    "pandas": "pandas",
+    "app core (scrapers, cache, history)": "data.scrapers.scraper_utils, data.storage.price_history, chat.data_context",
+    "plotly (Product Analysis chart)": "plotly.express",
+    "ollama chat": "chat.ollama_chat",
+    "gemini chat": "chat.gemini_chat",
+}
+
+PAGES = ["Product Analysis", "Chat with Data (Ollama)", "Gemini Buddy"]
+
+
+def import_profile(modules: str, top: int = 5) -> Dict:
+    """Wall time and heaviest imports for `import <modules>` in a fresh interpreter"""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modules}"],
+                          cwd=REPO_ROOT, capture_output=True, text=True)
+    wall = time.perf_counter() - start
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        entries.append((int(cumulative_us), int(self_us), name.rstrip()))
+    # Top-level imports are the ones without leading indentation in the name column
+    top_level = [e for e in entries if not e[2][1:].startswith(" ")]
+    return {
+        "wall_ms": wall * 1000,
+        "import_ms": sum(e[0] for e in top_level) / 1000,
+        "heaviest": [{"module": name.strip(), "self_ms": s / 1000}
+                     for _, s, name in sorted(entries, key=lambda e: e[1], reverse=True)[:top]],
+        "ok": proc.returncode == 0,
+    }
+
+
+RERUN_CHILD = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+pages, repeat = json.loads(sys.argv[1]), int(sys.argv[2])
+at = AppTest.from_file("app.py", default_timeout=120)
+start = time.perf_counter()
+at.run()
+result = {"first_run_ms": (time.perf_counter() - start) * 1000, "pages": {}}
+for page in pages:
+    at.sidebar.radio[0].set_value(page)
+    start = time.perf_counter()
+    at.run()
+    first = (time.perf_counter() - start) * 1000
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        at.run()
+        timings.append((time.perf_counter() - start) * 1000)
+    result["pages"][page] = {"first_visit_ms": first, "rerun_ms": timings,
+                             "errors": [str(e.value) for e in at.exception]}
+print("RESULT" + json.dumps(result))
+"""
+
+
+def rerun_profile(pages: List[str], repeat: int) -> Dict:
+    """Time the first script run and repeated reruns of each page in a fresh process"""
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-c", RERUN_CHILD, json.dumps(pages), str(repeat)],
+                          cwd=REPO_ROOT, capture_output=True, text=True, env=dict(os.environ))
+    wall = time.perf_counter() - start
+    for line in proc.stdout.splitlines():
+        if line.startswith("RESULT"):
+            result = json.loads(line[len("RESULT"):])
+            result["process_ms"] = wall * 1000
+            return result
+    raise RuntimeError(f"rerun profile failed:\n{proc.stderr[-2000:]}")
+
+
+def parse_budget(items: List[str]) -> Dict[str, float]:
+    budget = {}
+    for item in items:
+        key, _, value = item.partition("=")
+        budget[key] = float(value)
+    return budget
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="reruns timed per page")
+    parser.add_argument("--budget", nargs="*", default=[],
+                        help="limits to enforce: cold_ms=<first app run> rerun_ms=<median rerun of any page>")
+    parser.add_argument("--json", help="also write the full report to this file")
+    args = parser.parse_args()
+
+    report = {"imports": {}, "reruns": None}
+    print("Cold-start import cost (fresh interpreter each)")
+    for label, modules in BACKENDS.items():
+        profile = import_profile(modules)
+        report["imports"][label] = profile
+        heaviest = ", ".join(f"{h['module']} {h['self_ms']:.0f}ms" for h in profile["heaviest"][:3])
+        status = "" if profile["ok"] else "  (import failed)"
+        print(f"  {label:<38} {profile['import_ms']:8.0f} ms   [{heaviest}]{status}")
+
+    reruns = rerun_profile(PAGES, args.repeat)
+    report["reruns"] = reruns
+    print()
+    print(f"First script run (cold app start): {reruns['first_run_ms']:.0f} ms")
+    print("Per-interaction rerun cost")
+    worst_median = 0.0
+    for page, timing in reruns["pages"].items():
+        median = statistics.median(timing["rerun_ms"])
+        worst_median = max(worst_median, median)
+        errors = f"  errors: {timing['errors']}" if timing["errors"] else ""
+        print(f"  {page:<28} first visit {timing['first_visit_ms']:7.0f} ms   "
+              f"rerun median {median:6.1f} ms   max {max(timing['rerun_ms']):6.1f} ms{errors}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+    budget = parse_budget(args.budget)
+    measured = {"cold_ms": reruns["first_run_ms"], "rerun_ms": worst_median}
+    over = [f"{key} {measured[key]:.0f} > {limit:.0f}" for key, limit in budget.items()
+            if key in measured and measured[key] > limit]
+    if over:
+        print("\nOVER BUDGET: " + "; ".join(over))
+        return 1
+    if budget:
+        print("\nWithin budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+"""Export the stage histograms as Prometheus text or JSON lines.
+
+    write_exports("exports/metrics")   # stage_metrics.prom + stage_metrics.jsonl
+"""
+import json
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from .tracing import STAGE_METRICS, StageMetrics
+
+METRIC_NAME = "dataweaver_stage_seconds"
+ERRORS_METRIC_NAME = "dataweaver_stage_errors_total"
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text(metrics: StageMetrics = STAGE_METRICS) -> str:
+    """Histograms in the Prometheus text exposition format"""
+    snapshot = metrics.snapshot()
+    lines = [
+        f"# HELP {METRIC_NAME} Time spent in each search and chat pipeline stage.",
+        f"# TYPE {METRIC_NAME} histogram",
+    ]
+    for stage, h in snapshot.items():
+        label = _label(stage)
+        for le, count in h["buckets"]:
+            lines.append(f'{METRIC_NAME}_bucket{{stage="{label}",le="{le}"}} {count}')
+        lines.append(f'{METRIC_NAME}_sum{{stage="{label}"}} {h["sum"]:.6f}')
+        lines.append(f'{METRIC_NAME}_count{{stage="{label}"}} {h["count"]}')
+    lines.append(f"# HELP {ERRORS_METRIC_NAME} Stage executions that raised.")
+    lines.append(f"# TYPE {ERRORS_METRIC_NAME} counter")
+    for stage, h in snapshot.items():
+        lines.append(f'{ERRORS_METRIC_NAME}{{stage="{_label(stage)}"}} {h["errors"]}')
+    return "\n".join(lines) + "\n"
+
+
+def jsonl_lines(metrics: StageMetrics = STAGE_METRICS, timestamp: Optional[float] = None) -> str:
+    """One JSON object per stage, suitable for appending to a log"""
+    timestamp = time.time() if timestamp is None else timestamp
+    out = []
+    for stage, h in metrics.snapshot().items():
+        out.append(json.dumps({
+            "ts": timestamp,
+            "stage": stage,
+            "count": h["count"],
+            "sum_s": round(h["sum"], 6),
+            "mean_s": round(h["sum"] / h["count"], 6) if h["count"] else None,
+            "errors": h["errors"],
+            "buckets": dict(h["buckets"]),
+        }))
+    return "\n".join(out) + ("\n" if out else "")
+
+
+def write_exports(directory: str, metrics: StageMetrics = STAGE_METRICS) -> Tuple[Path, Path]:
+    """Overwrite stage_metrics.prom and append a snapshot to stage_metrics.jsonl"""
+    path = Path(directory)
+    path.mkdir(parents=True, exist_ok=True)
+    prom = path / "stage_metrics.prom"
+    prom.write_text(prometheus_text(metrics), encoding="utf-8")
+    jsonl = path / "stage_metrics.jsonl"
+    with open(jsonl, "a", encoding="utf-8") as f:
+        f.write(jsonl_lines(metrics))
+    return prom, jsonl
+
+
+def summary(metrics: StageMetrics = STAGE_METRICS) -> Dict[str, Dict]:
+    """count and mean per stage, for display"""
+    return {stage: {"count": h["count"], "mean_ms": h["sum"] / h["count"] * 1000 if h["count"] else 0.0}
+            for stage, h in metrics.snapshot().items()}
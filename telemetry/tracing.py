@@ -0,0 +1,267 @@
+"""Nested timing spans for the search and chat pipelines.
+
+A trace is active only inside `start_trace(...)`, either because
+APP_TRACING=1 or because the caller forces it (the sidebar Performance
+panel). Outside an active trace `span()` returns a shared no-op, so
+instrumented code pays one ContextVar lookup per span.
+
+    with start_trace("search", query=query) as trace:
+        with span("serpapi.fetch"):
+            ...
+
+Every finished span is also folded into STAGE_METRICS, the process-wide
+histograms exported by telemetry.export.
+"""
+import contextvars
+import functools
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+TRACING_ENABLED = os.getenv("APP_TRACING", "0").lower() in ("1", "true", "yes", "on")
+
+# Upper bounds in seconds, Prometheus style (an implicit +Inf bucket follows)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+_current_span: contextvars.ContextVar = contextvars.ContextVar("span", default=None)
+
+
+@dataclass
+class SpanRecord:
+    id: int
+    parent: Optional[int]
+    name: str
+    # Seconds since the trace started
+    offset: float
+    duration: float
+    thread: str
+    attrs: Dict = field(default_factory=dict)
+    error: bool = False
+
+
+class Trace:
+    """Spans collected for one request, e.g. one search or one chat turn"""
+
+    def __init__(self, name: str, attrs: Optional[Dict] = None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.started_at = time.time()
+        self.started = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.spans: List[SpanRecord] = []
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    def add(self, record: SpanRecord) -> None:
+        with self._lock:
+            self.spans.append(record)
+
+    def finish(self) -> None:
+        self.duration = time.perf_counter() - self.started
+
+    def rows(self) -> List[Tuple[int, SpanRecord]]:
+        """(depth, span) pairs in start order, for display"""
+        with self._lock:
+            spans = sorted(self.spans, key=lambda s: s.offset)
+        by_id = {s.id: s for s in spans}
+
+        def depth(s: SpanRecord) -> int:
+            d = 0
+            while s.parent is not None and s.parent in by_id:
+                s = by_id[s.parent]
+                d += 1
+            return d
+
+        return [(depth(s), s) for s in spans]
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        total, out = 0, []
+        for bound, n in zip(list(self.buckets) + [float("inf")], self.counts):
+            total += n
+            out.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return out
+
+
+class StageMetrics:
+    """Process-wide latency histograms keyed by span name"""
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self._histograms: Dict[str, Histogram] = {}
+        self._errors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, error: bool = False) -> None:
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+            if error:
+                self._errors[stage] = self._errors.get(stage, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                stage: {"count": h.count, "sum": h.sum, "buckets": h.cumulative(),
+                        "errors": self._errors.get(stage, 0)}
+                for stage, h in sorted(self._histograms.items())
+            }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+            self._errors.clear()
+
+
+STAGE_METRICS = StageMetrics()
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def set(self, **attrs) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("trace", "name", "attrs", "id", "parent", "start", "_token")
+
+    def __init__(self, trace: Trace, name: str, attrs: Dict):
+        self.trace = trace
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.parent = _current_span.get()
+        self.id = self.trace.next_id()
+        self._token = _current_span.set(self.id)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _current_span.reset(self._token)
+        error = exc_type is not None
+        self.trace.add(SpanRecord(self.id, self.parent, self.name, self.start - self.trace.started, duration,
+                                  threading.current_thread().name, self.attrs, error))
+        STAGE_METRICS.observe(self.name, duration, error)
+        return False
+
+    def set(self, **attrs) -> None:
+        """Attach attributes discovered while the span runs, e.g. a row count"""
+        self.attrs.update(attrs)
+
+
+def span(name: str, **attrs):
+    """Time the enclosed block as a child of the current span, if a trace is active"""
+    trace = _current_trace.get()
+    if trace is None:
+        return _NOOP_SPAN
+    return _Span(trace, name, attrs)
+
+
+def traced(name: str):
+    """Decorator form of `span` for whole functions"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            trace = _current_trace.get()
+            if trace is None:
+                return func(*args, **kwargs)
+            with _Span(trace, name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(name: str, seconds: Optional[float], start: Optional[float] = None, **attrs) -> None:
+    """Add an already-measured stage under the current span, e.g. a streamed LLM reply
+
+    `start` is the stage's time.perf_counter() start; by default the stage
+    is taken to have just ended.
+    """
+    trace = _current_trace.get()
+    if trace is None or seconds is None:
+        return
+    if start is None:
+        start = time.perf_counter() - seconds
+    trace.add(SpanRecord(trace.next_id(), _current_span.get(), name, max(0.0, start - trace.started), seconds,
+                         threading.current_thread().name, attrs))
+    STAGE_METRICS.observe(name, seconds)
+
+
+def observe(name: str, seconds: Optional[float], start: Optional[float] = None, **attrs) -> None:
+    """`record` inside a trace; outside one, still count the stage in STAGE_METRICS
+
+    For stages whose histograms are wanted from every request, e.g. queue
+    waits used for capacity planning.
+    """
+    if seconds is None:
+        return
+    if _current_trace.get() is None:
+        STAGE_METRICS.observe(name, seconds)
+        return
+    record(name, seconds, start, **attrs)
+
+
+def propagate(func):
+    """Run `func` in a worker thread as part of the caller's trace
+
+    Thread pools do not inherit context variables, so spans opened inside a
+    submitted task would otherwise be dropped. Call this once per submit.
+    """
+    if _current_trace.get() is None:
+        return func
+    return functools.partial(contextvars.copy_context().run, func)
+
+
+@contextmanager
+def start_trace(name: str, force: bool = False, **attrs) -> Iterator[Optional[Trace]]:
+    """Collect spans for the enclosed block; yields None when tracing is off"""
+    if not (force or TRACING_ENABLED) or _current_trace.get() is not None:
+        yield _current_trace.get()
+        return
+    trace = Trace(name, attrs)
+    token = _current_trace.set(trace)
+    try:
+        with _Span(trace, name, dict(attrs)):
+            yield trace
+    finally:
+        _current_trace.reset(token)
+        trace.finish()
@@ -0,0 +1,69 @@
+import pytest
+
+from data.scrapers.html_engine import FIXTURES_DIR, LISTING_COLUMNS, HtmlScraper
+from data.scrapers.html_parse import parse_count, parse_listing_page, parse_price
+from data.scrapers.sites import SITES
+
+# Listings on each saved page, and the first one's (title, price, currency, rating, reviews, link)
+FIXTURES = {
+    "amazon_in": (48, ("Orbit Wireless Earbuds 76 Edge (128 GB) - Silver", 1969.0, "₹", 4.6, 60,
+                       "https://www.amazon.in/Orbit-Wireless-Earbuds-76-Edge-(128-GB)---Silver/dp/B000000000/ref=sr_1_0")),
+    "croma": (24, ("Orbit Smartphone 92 Pro 1TB Silver", 32289.0, "₹", 4.2, 25,
+                   "https://www.croma.com/orbit-smartphone-92-pro-1tb-silver/p/300000")),
+    "smartprix": (30, ("Lumen Laptop 18 Air 512GB Blue", 35979.0, "₹", 3.5, 27,
+                       "https://www.smartprix.com/laptops/lumen-laptop-18-air-512gb-blue-ppd0")),
+    "meesho": (40, ("Kairo Kurti 5 Lite (1 TB) - Grey", 819.0, "₹", 4.0, 54,
+                    "https://www.meesho.com/kairo-kurti-5-lite-(1-tb)---grey/p/7000")),
+    "ebay": (60, ("Solis Mechanical Keyboard 12 Lite (128 GB) - Purple", 8.89, "$", 3.8, 150,
+                  "https://www.ebay.com/itm/1000000?hash=item0")),
+}
+
+
+@pytest.mark.parametrize("site", sorted(FIXTURES))
+def test_parse_fixture(site):
+    count, first = FIXTURES[site]
+    url = SITES[site].search_url.format(query="test", page=1)
+    rows, seconds = parse_listing_page(site, (FIXTURES_DIR / f"{site}.html").read_bytes(), url)
+    assert len(rows) == count
+    assert rows[0] == first
+    assert seconds > 0
+    # Ads and placeholder tiles never come through as listings
+    assert all(title and price > 0 for title, price, *_ in rows)
+    assert {currency for _, _, currency, *_ in rows} == {SITES[site].currency}
+
+
+def test_every_site_has_a_fixture():
+    assert set(FIXTURES) == set(SITES)
+
+
+def test_price_and_count_text():
+    assert parse_price("₹1,299.00 – ₹1,499", "₹") == (1299.0, "₹")
+    assert parse_price("$12.50 to $20.00", "₹") == (12.5, "$")
+    assert parse_price("Sold out", "$") == (None, "$")
+    assert parse_count("(1,234)") == 1234
+    assert parse_count("2.3K ratings") == 2300
+    assert parse_count("1.2L") == 120000
+
+
+def test_scrape_from_fixtures():
+    scraper = HtmlScraper(fixtures_dir=FIXTURES_DIR, parse_inline=True)
+    df = scraper.scrape("anything")
+
+    assert list(df.columns) == LISTING_COLUMNS
+    assert len(df) == sum(count for count, _ in FIXTURES.values())
+    counts = df["source"].astype(str).value_counts()
+    assert {SITES[site].name: count for site, (count, _) in FIXTURES.items()} == counts.to_dict()
+
+    ebay = df[df["source"] == "eBay"].iloc[0]
+    assert ebay["price_inr"] == pytest.approx(ebay["price_value"] * SITES["ebay"].inr_rate, rel=1e-6)
+    rupees = df[df["currency_symbol"] == "₹"]
+    assert (rupees["price_inr"] == rupees["price_value"]).all()
+
+    stats = scraper.snapshot()
+    assert set(stats) == set(SITES)
+    assert all(s["pages"] == 1 and s["errors"] == 0 for s in stats.values())
+
+
+def test_category_limits_sites():
+    df = HtmlScraper(fixtures_dir=FIXTURES_DIR, parse_inline=True).scrape("anything", category="direct")
+    assert set(df["source"].astype(str)) == {SITES["amazon_in"].name, SITES["croma"].name}
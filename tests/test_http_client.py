@@ -0,0 +1,61 @@
+import time
+from unittest import mock
+
+import pytest
+import requests
+
+from clients.http_client import CircuitBreaker, CircuitOpenError, PooledClient, RetryPolicy
+
+
+def _response(status: int) -> requests.Response:
+    response = requests.Response()
+    response.status_code = status
+    return response
+
+
+def _client(reset_timeout: float = 0.05) -> PooledClient:
+    return PooledClient("test", base_url="http://shop.test",
+                        retry=RetryPolicy(max_attempts=1),
+                        breaker=CircuitBreaker(failure_threshold=1, reset_timeout=reset_timeout))
+
+
+def test_half_open_probe_answered_with_429_does_not_wedge_the_breaker():
+    client = _client()
+    with mock.patch.object(client.session, "request", side_effect=[_response(500), _response(429), _response(200)]):
+        assert client.get("/").status_code == 500
+        assert client.breaker.state == "open"
+        with pytest.raises(CircuitOpenError):
+            client.get("/")
+
+        time.sleep(0.06)
+        assert client.get("/").status_code == 429
+        assert client.breaker.state == "open"
+
+        time.sleep(0.06)
+        assert client.get("/").status_code == 200
+        assert client.breaker.state == "closed"
+
+
+def test_repeated_429_opens_the_breaker():
+    client = _client(reset_timeout=60.0)
+    with mock.patch.object(client.session, "request", return_value=_response(429)):
+        assert client.get("/").status_code == 429
+        with pytest.raises(CircuitOpenError):
+            client.get("/")
+
+
+@pytest.mark.parametrize("error", [requests.exceptions.ChunkedEncodingError, requests.exceptions.ContentDecodingError,
+                                   requests.exceptions.TooManyRedirects])
+def test_half_open_probe_that_raises_other_request_errors_does_not_wedge_the_breaker(error):
+    client = _client()
+    with mock.patch.object(client.session, "request", side_effect=[_response(500), error("boom"), _response(200)]):
+        assert client.get("/").status_code == 500
+
+        time.sleep(0.06)
+        with pytest.raises(error):
+            client.get("/")
+        assert client.breaker.state == "open"
+
+        time.sleep(0.06)
+        assert client.get("/").status_code == 200
+        assert client.breaker.state == "closed"
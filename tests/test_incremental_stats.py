@@ -0,0 +1,44 @@
+import math
+
+import pandas as pd
+
+from data.incremental_stats import IncrementalAnalytics
+from data.synthetic import generate_catalog
+
+
+def _scrape() -> pd.DataFrame:
+    df = generate_catalog("phone", 20, seed=7)
+    df["price_inr"] = df["price_value"]
+    return df
+
+
+def test_repeated_scrapes_are_not_recounted():
+    once, thrice = IncrementalAnalytics(), IncrementalAnalytics()
+    once.update("phone", _scrape())
+    for _ in range(3):
+        thrice.update("phone", _scrape())
+
+    assert thrice.insights("phone") == once.insights("phone")
+    assert thrice.insights("phone")["total_products"] == len(_scrape().drop_duplicates(["source", "product_name"]))
+
+    trending = thrice.trending("phone", n=5)
+    keys = [(t["source"], t["product_name"]) for t in trending]
+    assert len(keys) == len(set(keys)) == 5
+    assert all(t["rating"] == round(t["rating"], 2) for t in trending)
+
+
+def test_rescraped_listing_refreshes_its_trending_entry():
+    stats = IncrementalAnalytics()
+    df = _scrape()
+    stats.update("phone", df)
+    best = stats.trending("phone", n=1)[0]
+
+    row = (df["source"] == best["source"]) & (df["product_name"] == best["product_name"])
+    again = df[row].copy()
+    again["price_inr"] = again["price_value"] = best["price"] * 2
+    stats.update("phone", again)
+
+    entries = [t for t in stats.trending("phone", n=50)
+               if (t["source"], t["product_name"]) == (best["source"], best["product_name"])]
+    assert len(entries) == 1 and math.isclose(entries[0]["price"], best["price"] * 2)
+    assert stats.insights("phone")["total_products"] == len(df.drop_duplicates(["source", "product_name"]))
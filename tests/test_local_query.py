@@ -0,0 +1,46 @@
+import pandas as pd
+import pytest
+
+from chat.local_query import LocalQueryEngine
+
+DF = pd.DataFrame({
+    "product_name": ["Nova Phone 5 Black", "Nova Phone 5 Blue", "Orbit Phone X Black",
+                     "Zenith Phone 12 Silver", "Pulse Phone Lite Blue", "Orbit Phone X Black"],
+    "price_value": [18_499.0, 18_999.0, 24_999.0, 31_999.0, 9_999.0, 23_499.0],
+    "currency_symbol": ["₹"] * 6,
+    "source": ["Amazon.in", "Flipkart", "Croma", "Amazon.in", "Meesho", "Flipkart"],
+    "rating": [4.3, 4.1, 4.5, 4.6, 3.8, 4.4],
+    "reviews": [1200, 800, 300, 2500, 90, 450],
+})
+
+# Question, then a phrase the answer must contain, or None when the model should answer
+QUESTIONS = [
+    ("cheapest phone", "Pulse Phone Lite Blue"),
+    ("most expensive phone", "Zenith Phone 12 Silver"),
+    ("how many listings", "There are 6 listings"),
+    ("how many phones under 20k", "There are 3 listings"),
+    ("how many stores", "4 sources list 6 listings"),
+    ("how many sources are there", "4 sources list 6 listings"),
+    ("how many different sellers have black phones", "3 sources list 3 listings matching 'black'"),
+    ("average price on flipkart", "The average price of 2 listings on Flipkart is ₹21,249"),
+    ("cheapest black phone", "Nova Phone 5 Black"),
+    ("phones rated 4.4 or more", "Found 3 listings"),
+    ("phones with 5 or more reviews", "Found 6 listings"),
+    ("top 2 rated", "The 2 best-rated listings"),
+    ("median price per store", "median price"),
+    ("cheapest in black or blue", None),
+    ("where can I buy it cheapest", None),
+    ("sort them by price", None),
+    ("which of those is cheapest", None),
+    ("which phone should I buy", None),
+]
+
+
+@pytest.mark.parametrize("question, expected", QUESTIONS)
+def test_questions(question, expected):
+    answer = LocalQueryEngine().answer(DF, question, query="phone")
+    if expected is None:
+        assert answer is None
+    else:
+        assert answer is not None
+        assert expected in answer.as_markdown()
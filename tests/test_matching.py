@@ -0,0 +1,53 @@
+import pandas as pd
+
+from benchmarks.suite import load_recorded_results
+from data.matching import match_listings, normalize_title, product_price_summary, storage_variant
+from data.scrapers.serpapi_google_shopping import parse_shopping_results
+
+
+def _reformat(title: str, style: int) -> str:
+    """The same title as another seller might list it"""
+    if style == 1:
+        return title.upper().replace(" (", " ").replace(")", "").replace(" - ", " ")
+    if style == 2:
+        return title.replace(" GB", "GB").replace(",", " |") + " - Buy Online"
+    return title
+
+
+def _recorded() -> pd.DataFrame:
+    df = parse_shopping_results(load_recorded_results()).reset_index(drop=True)
+    df["original"] = df["product_name"].astype(str)
+    df["product_name"] = [_reformat(title, i % 3) for i, title in enumerate(df["original"])]
+    return df
+
+
+def test_reformatted_titles_group_with_their_product():
+    df = _recorded()
+    groups = match_listings(df)
+
+    # One group per distinct recorded product, and every group holds one product
+    assert groups.nunique() == df["original"].nunique()
+    assert (df.groupby(groups)["original"].nunique() == 1).all()
+
+
+def test_storage_variants_stay_apart():
+    df = pd.DataFrame({
+        "product_name": ["Apple iPhone 15 (128 GB) - Black", "APPLE IPHONE 15 128GB BLACK",
+                         "Apple iPhone 15 (256 GB) - Black"],
+        "price_value": [69_900.0, 68_900.0, 79_900.0],
+        "source": ["Croma", "Flipkart", "Croma"],
+    })
+    assert storage_variant(normalize_title(df["product_name"][0])) == 128
+    assert list(match_listings(df)) == [0, 0, 1]
+
+
+def test_summary_on_recorded_listings():
+    df = _recorded()
+    summary = product_price_summary(df)
+
+    assert len(summary) == df["original"].nunique()
+    assert summary["listings"].sum() == len(df)
+    assert (summary["min_price"] <= summary["median_price"]).all()
+    assert (summary["median_price"] <= summary["max_price"]).all()
+    iphone = summary[summary["product"].str.contains("iphone", case=False)].iloc[0]
+    assert iphone["listings"] == 4 and iphone["min_price"] == 68_900.0 and iphone["cheapest_source"] == "Vijay Sales"
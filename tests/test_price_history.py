@@ -0,0 +1,60 @@
+import time
+
+import pandas as pd
+import pytest
+
+from data.storage.price_history import PriceHistoryStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PriceHistoryStore(tmp_path / "history.sqlite3")
+    yield store
+    store.close()
+
+
+def _scrape(*prices, source="Amazon.in") -> pd.DataFrame:
+    return pd.DataFrame({
+        "product_name": [f"Phone {i}" for i in range(len(prices))],
+        "price_value": list(prices),
+        "currency_symbol": ["₹"] * len(prices),
+        "source": [source] * len(prices),
+        "rating": [4.2] * len(prices),
+        "reviews": [100] * len(prices),
+    })
+
+
+def test_append_then_lowest_price(store):
+    assert store.append(_scrape(18_999.0, 0.0, 21_499.0), "Smart Phone") == 2
+    store.flush()
+
+    lowest = store.lowest_price("smart  phone!", days=30)
+    assert lowest["price"] == 18_999.0 and lowest["source"] == "Amazon.in" and lowest["currency"] == "₹"
+    assert len(store.history("smart phone")) == 2
+
+
+def test_lowest_price_includes_the_current_scrape_before_it_is_written(store):
+    store.append(_scrape(18_999.0), "phone")
+    store.flush()
+
+    current = _scrape(15_499.0, 17_000.0, source="Flipkart")
+    store.append(current, "phone")
+    lowest = store.lowest_price("phone", days=30, current=current)
+    assert lowest["price"] == 15_499.0 and lowest["source"] == "Flipkart"
+
+
+def test_first_search_of_a_query_has_a_lowest_price(store):
+    current = _scrape(9_999.0)
+    store.append(current, "tablet")
+    assert store.lowest_price("tablet", days=30, current=current)["price"] == 9_999.0
+
+
+def test_older_history_and_current_scrape_compared(store):
+    store.append(_scrape(12_000.0), "phone", scraped_at=time.time() - 40 * 86400)
+    store.append(_scrape(14_000.0), "phone", scraped_at=time.time() - 2 * 86400)
+    store.flush()
+
+    assert store.lowest_price("phone", days=30)["price"] == 14_000.0
+    assert store.lowest_price("phone", days=30, current=_scrape(16_000.0))["price"] == 14_000.0
+    assert store.lowest_price("phone", days=60)["price"] == 12_000.0
+    assert list(store.daily_lowest("phone", days=60)["lowest_price"]) == [12_000.0, 14_000.0]
@@ -0,0 +1,80 @@
+import pandas as pd
+import pytest
+
+from data.scrapers import query_cache
+from data.scrapers.query_cache import QueryCache, normalize_query
+
+
+class Clock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(query_cache.time, "time", clock)
+    return clock
+
+
+def _frame() -> pd.DataFrame:
+    return pd.DataFrame({"product_name": ["a", "b"], "price_value": [100.0, 200.0]})
+
+
+def test_normalized_queries_share_an_entry(tmp_path, clock):
+    cache = QueryCache(ttl=60, disk_dir=str(tmp_path))
+    cache.set("Wireless  Earbuds!", 20, _frame())
+
+    hit = cache.get("wireless earbuds", 20)
+    assert normalize_query("Wireless  Earbuds!") == "wireless earbuds"
+    assert hit is not None and hit.attrs["from_cache"]
+    pd.testing.assert_frame_equal(hit, _frame())
+    assert cache.get("wireless earbuds", 10) is None
+    assert cache.stats["memory_hits"] == 1 and cache.stats["misses"] == 1
+
+
+def test_disk_tier_survives_a_new_process(tmp_path, clock):
+    QueryCache(ttl=60, disk_dir=str(tmp_path)).set("laptop", 20, _frame())
+
+    cache = QueryCache(ttl=60, disk_dir=str(tmp_path))
+    assert cache.get("laptop", 20) is not None
+    assert cache.get("laptop", 20) is not None
+    assert cache.stats["disk_hits"] == 1 and cache.stats["memory_hits"] == 1
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = QueryCache(ttl=60, disk_dir=str(tmp_path))
+    cache.set("laptop", 20, _frame())
+
+    clock.now += 59
+    assert cache.get("laptop", 20) is not None
+    clock.now += 2
+    assert cache.get("laptop", 20) is None
+    assert cache.stats["expired"] >= 1
+    assert not list(tmp_path.glob("*.pkl"))
+
+
+def test_lru_eviction(clock):
+    cache = QueryCache(max_entries=2, disk_dir=None)
+    for query in ("a", "b"):
+        cache.set(query, 20, _frame())
+    cache.get("a", 20)
+    cache.set("c", 20, _frame())
+
+    assert cache.get("b", 20) is None
+    assert cache.get("a", 20) is not None and cache.get("c", 20) is not None
+    assert cache.stats["evictions"] == 1
+
+
+def test_cached_frames_are_copies(clock):
+    cache = QueryCache(disk_dir=None)
+    df = _frame()
+    cache.set("phone", 20, df)
+    df.loc[0, "price_value"] = 1.0
+    served = cache.get("phone", 20)
+    served.loc[1, "price_value"] = 2.0
+
+    assert list(cache.get("phone", 20)["price_value"]) == [100.0, 200.0]
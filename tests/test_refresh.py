@@ -0,0 +1,103 @@
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from data.scrapers import query_cache
+from data.scrapers.query_cache import QueryCache
+from data.scrapers.refresh import ApiBudget, QueryPopularity, RefreshScheduler, SingleFlight
+
+
+def test_single_flight_runs_concurrent_calls_once():
+    flights = SingleFlight()
+    calls, release = [], threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do("phone|20", fetch))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while flights.stats["followers"] < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [1]
+    assert results == ["result"] * 5
+    assert flights.stats == {"leaders": 1, "followers": 4}
+    assert not flights.in_flight("phone|20")
+
+
+def test_single_flight_shares_the_leaders_error():
+    flights = SingleFlight()
+    flight, leader = flights.join("phone|20")
+    follower, follower_leads = flights.join("phone|20")
+    assert leader and not follower_leads and follower is flight
+
+    flights.finish("phone|20", flight, error=RuntimeError("upstream down"))
+    with pytest.raises(RuntimeError, match="upstream down"):
+        follower.wait(1)
+    # A later call starts a new flight
+    assert flights.join("phone|20")[1]
+
+
+def test_api_budget_refuses_once_spent():
+    budget = ApiBudget(per_hour=0.0, burst=3)
+    assert budget.try_spend(2)
+    assert not budget.try_spend(2)
+    assert budget.try_spend(1)
+    assert not budget.try_spend(1)
+    assert budget.spent == 3
+
+
+def test_scheduler_stops_refreshing_when_the_budget_is_spent():
+    cache = QueryCache(disk_dir=None)
+    popularity = QueryPopularity()
+    for query in ("phone", "laptop", "earbuds"):
+        for _ in range(3):
+            popularity.record(query, 20)
+
+    def fetch(query, max_results):
+        cache.set(query, max_results, pd.DataFrame({"price_value": [100.0]}))
+
+    scheduler = RefreshScheduler(fetch, popularity, ApiBudget(per_hour=0.0, burst=2), cache=cache)
+    try:
+        assert scheduler.tick() == 2
+        deadline = time.monotonic() + 5
+        while (scheduler.stats["refreshed"] < 2 or scheduler._running) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        due = scheduler.due()
+        assert len(due) == 1
+
+        scheduler.revalidate("phone", 20)
+        assert scheduler.tick() == 0
+        # One refusal on the first tick, then one per distinct query asked for
+        assert scheduler.stats["over_budget"] == 1 + len(set(due) | {("phone", 20)})
+    finally:
+        scheduler.stop()
+    # A revalidation refused for budget waits for the next tick
+    assert ("phone", 20) in scheduler._pending.values()
+
+
+def test_stale_entries_are_served_only_when_allowed(tmp_path, monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(query_cache.time, "time", lambda: now[0])
+    cache = QueryCache(ttl=60, stale_ttl=600, disk_dir=str(tmp_path))
+    cache.set("phone", 20, pd.DataFrame({"price_value": [100.0]}))
+
+    now[0] += 120
+    assert cache.get("phone", 20) is None
+    stale = cache.get("phone", 20, allow_stale=True)
+    assert stale is not None and stale.attrs["stale"] and stale.attrs["from_cache"]
+    assert cache.stats["stale_hits"] == 1
+
+    # Past the stale window the entry is gone, from disk too
+    now[0] += 600
+    assert cache.get("phone", 20, allow_stale=True) is None
+    assert not list(tmp_path.glob("*.pkl"))
@@ -0,0 +1,45 @@
+import pandas as pd
+
+from data.scrapers import serpapi_google_shopping as serpapi
+
+
+def _item(title, price, rating=None, reviews=None):
+    return {"title": title, "price": price, "source": "Shop", "rating": rating, "reviews": reviews}
+
+
+def test_out_of_range_integer_ratings_and_reviews_are_filled():
+    df = serpapi.parse_shopping_results([_item("a", "₹1,299", 4, 12), _item("b", "₹2,000", 7, "many")])
+    assert list(df["product_name"]) == ["a", "b"]
+    assert df["rating"].iloc[0] == 4.0
+    assert 3.5 <= df["rating"].iloc[1] <= 5.0
+    assert df["reviews"].iloc[0] == 12
+    assert 50 <= df["reviews"].iloc[1] < 1000
+
+
+def test_a_page_that_fails_to_parse_does_not_stop_the_others(monkeypatch):
+    pages = {0: [_item("good", "₹1,000", 4.5, 10)], 1: [_item("bad", "₹2,000", 4.0, 20)]}
+    parse = serpapi.parse_shopping_results
+
+    def flaky_parse(items):
+        if items[0]["title"] == "bad":
+            raise ValueError("malformed page")
+        return parse(items)
+
+    monkeypatch.setattr(serpapi, "get_api_key", lambda: "key")
+    monkeypatch.setattr(serpapi, "fetch_shopping_results", lambda query, key, num, start=0: pages[start])
+    monkeypatch.setattr(serpapi, "parse_shopping_results", flaky_parse)
+    frames = list(serpapi.iter_google_shopping_pages("phone", max_results=2, page_size=1))
+    assert [list(df["product_name"]) for df in frames] == [["good"]]
+
+
+def test_row_and_columnar_paths_agree():
+    from benchmarks.bench_parse_shopping import make_shopping_results
+
+    items = make_shopping_results(200)
+    rowwise = serpapi.parse_shopping_results(items)
+    columnar = serpapi.parse_shopping_results_columnar(items)
+    assert len(items) < serpapi.COLUMNAR_MIN_ITEMS
+    assert list(rowwise.columns) == list(columnar.columns)
+    assert rowwise.dtypes.equals(columnar.dtypes)
+    pd.testing.assert_series_equal(rowwise["price_value"], columnar["price_value"])
+    assert (rowwise["currency_symbol"].astype(str) == columnar["currency_symbol"].astype(str)).all()
@@ -1,25 +1,33 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
-def create_price_comparison_chart(df):
-    """Create a smooth animated price comparison chart"""
-    fig = px.bar(
-        df,
-        x='product_name',
-        y='price_inr',
-        color='source',
-        title="Price Comparison",
-        labels={'price_inr': 'Price (₹)', 'product_name': 'Product'},
-        animation_frame=None,  
-        range_y=[0, df['price_inr'].max() * 1.1]  
-    )
-    
+from data.frames import dataframe_fingerprint
+from telemetry.tracing import span
+
+# Up to BAR_LIMIT listings get one bar each. Up to WEBGL_LIMIT every listing
+# is still drawn, but as a WebGL scatter. Beyond that only per-source
+# aggregates are sent to the browser.
+BAR_LIMIT = 200
+WEBGL_LIMIT = 50000
+TOP_N = 10
+
+_figure_cache: "OrderedDict[tuple, go.Figure]" = OrderedDict()
+_figure_cache_lock = threading.Lock()
+_FIGURE_CACHE_SIZE = 32
+
+
+def _apply_layout(fig, height: int = 400):
     fig.update_layout(
         xaxis_tickangle=-45,
         template="plotly_dark",
-        height=400,
-        transition_duration=500,  
-        margin=dict(t=50, b=100), 
+        height=height,
+        transition_duration=500,
+        margin=dict(t=50, b=100),
         showlegend=True,
         legend=dict(
             yanchor="top",
@@ -28,5 +36,116 @@ def create_price_comparison_chart(df):
             x=0.99
         )
     )
-    
-    return fig
\ No newline at end of file
+    return fig
+
+
+def _bar_chart(df, price_col, title, currency):
+    """One bar per listing"""
+    fig = px.bar(
+        df,
+        x='product_name',
+        y=price_col,
+        color='source',
+        title=title,
+        labels={price_col: f'Price ({currency})', 'product_name': 'Product'},
+        range_y=[0, df[price_col].max() * 1.1]
+    )
+    return _apply_layout(fig)
+
+
+def _webgl_chart(df, price_col, title, currency):
+    """Every listing as a WebGL point, ordered by price"""
+    df = df.sort_values(price_col)
+    rank = np.arange(len(df))
+    fig = go.Figure()
+    for source, group in df.groupby('source', observed=True, sort=True):
+        positions = rank[df['source'].to_numpy() == source]
+        fig.add_trace(go.Scattergl(
+            x=positions,
+            y=group[price_col].to_numpy(),
+            mode='markers',
+            name=str(source),
+            text=group['product_name'].astype(str).to_numpy(),
+            hovertemplate=f'%{{text}}<br>{currency}%{{y:,.2f}}<extra>{source}</extra>',
+            marker=dict(size=4),
+        ))
+    fig.update_layout(title=title, xaxis_title=f'Listings ranked by price ({len(df):,})',
+                      yaxis_title=f'Price ({currency})')
+    return _apply_layout(fig)
+
+
+def _top_n_chart(df, price_col, title, currency, top_n=TOP_N):
+    """The `top_n` cheapest listings per source plus one "Others" bar per source at the median of the rest"""
+    df = df.sort_values(price_col)
+    rank = df.groupby('source', observed=True).cumcount()
+    top = df[rank < top_n]
+    rest = df[rank >= top_n]
+    others = rest.groupby('source', observed=True).agg(**{price_col: (price_col, 'median'), 'count': (price_col, 'size')}).reset_index()
+    others['product_name'] = 'Others (' + others['count'].astype(str) + ' listings, median)'
+    bars = pd.concat([top[['product_name', price_col, 'source']], others[['product_name', price_col, 'source']]], ignore_index=True)
+    return _bar_chart(bars, price_col, title, currency)
+
+
+def _quantile_chart(df, price_col, title, currency):
+    """Per-source box plots from precomputed quantiles, so the payload is O(sources)"""
+    grouped = df.groupby('source', observed=True)[price_col]
+    q = grouped.quantile([0.05, 0.25, 0.5, 0.75, 0.95]).unstack()
+    counts = grouped.size()
+    fig = go.Figure()
+    for source, row in q.iterrows():
+        fig.add_trace(go.Box(
+            name=f'{source} ({counts[source]:,})',
+            q1=[row[0.25]], median=[row[0.5]], q3=[row[0.75]],
+            lowerfence=[row[0.05]], upperfence=[row[0.95]],
+            boxpoints=False,
+        ))
+    fig.update_layout(title=title, yaxis_title=f'Price ({currency}), 5th-95th percentile whiskers')
+    return _apply_layout(fig)
+
+
+CHART_MODES = {
+    'bars': _bar_chart,
+    'webgl': _webgl_chart,
+    'topn': _top_n_chart,
+    'quantiles': _quantile_chart,
+}
+
+
+def choose_chart_mode(n_rows: int) -> str:
+    if n_rows <= BAR_LIMIT:
+        return 'bars'
+    if n_rows <= WEBGL_LIMIT:
+        return 'webgl'
+    return 'quantiles'
+
+
+def build_price_chart(df, price_col='price_value', title="Price Comparison", currency='₹', mode='auto'):
+    """Price comparison chart that stays responsive for large result sets
+
+    `mode='auto'` picks per-listing bars, a WebGL scatter or per-source
+    quantile summaries depending on the row count. Figures are memoized by
+    the DataFrame's content hash, so reruns with the same data reuse them.
+    """
+    if mode == 'auto':
+        mode = choose_chart_mode(len(df))
+    if mode not in CHART_MODES:
+        raise ValueError(f"Unsupported chart mode: {mode}")
+
+    key = (dataframe_fingerprint(df[['product_name', price_col, 'source']]), price_col, title, currency, mode)
+    with _figure_cache_lock:
+        if key in _figure_cache:
+            _figure_cache.move_to_end(key)
+            return _figure_cache[key]
+
+    with span("chart.build", mode=mode, rows=len(df)):
+        fig = CHART_MODES[mode](df, price_col, title, currency)
+    with _figure_cache_lock:
+        _figure_cache[key] = fig
+        while len(_figure_cache) > _FIGURE_CACHE_SIZE:
+            _figure_cache.popitem(last=False)
+    return fig
+
+
+def create_price_comparison_chart(df):
+    """Create a smooth animated price comparison chart"""
+    return build_price_chart(df, price_col='price_inr')